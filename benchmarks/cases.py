@@ -0,0 +1,279 @@
+"""Benchmark cases for indicators, panels and plotting.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from gander import indicators as gi
+from gander import panel as gp
+from gander import plotting
+from gander import screener
+from gander import sweep
+
+CASES = []
+
+
+class Case:
+    """One benchmarked call.
+
+    ``prepare`` is given the input data, and returns the call to time. Work
+    done by ``prepare`` itself, like adding input columns or creating axes,
+    is not timed.
+
+    :param name: Name of case, e.g. "indicators.calc_ema"
+    :param prepare: Function from input data to the call to time
+    :param data: Input data, "ohlcv" for one symbol or "panel" for wide
+     data frames of many symbols, see :mod:`benchmarks.data`
+    :param max_size: Largest number of bars to run the case for. Default is
+     no limit
+    :type name: ``str``
+    :type prepare: ``callable``
+    :type data: ``str``
+    :type max_size: ``int``
+    """
+
+    def __init__(self, name, prepare, data="ohlcv", max_size=None):
+        self.name = name
+        self.prepare = prepare
+        self.data = data
+        self.max_size = max_size
+
+    def runs_at(self, m):
+        """Check whether the case is run for ``m`` bars.
+
+        :type m: ``int``
+        :rtype: ``bool``
+        """
+        return self.max_size is None or m <= self.max_size
+
+
+def case(name, data="ohlcv", max_size=None):
+    """Register a function as the ``prepare`` step of a :class:`Case`."""
+    def register(prepare):
+        CASES.append(Case(name, prepare, data, max_size))
+        return prepare
+    return register
+
+
+def _macd_inputs(df):
+    df = gi.calc_ema(df.copy(), df["close"], "ema12", window=12,
+                     inplace=True)
+    return gi.calc_ema(df, df["close"], "ema26", window=26, inplace=True)
+
+
+def _impulse_inputs(df):
+    df = gi.calc_ema(_macd_inputs(df), df["close"], "ema13", window=13,
+                     inplace=True)
+    return gi.calc_macd(df, df["ema12"], df["ema26"], inplace=True)
+
+
+def _axes():
+    """Create axes drawn by the Agg backend, without ``pyplot``."""
+    figure = Figure(figsize=(12, 4), dpi=100)
+    FigureCanvasAgg(figure)
+    return figure.add_subplot()
+
+
+def _drawn(ax, plot, *args, **kwargs):
+    """Time a plotting function together with drawing the figure."""
+    def run():
+        plot(*args, **kwargs)
+        ax.figure.canvas.draw()
+    return run
+
+
+# Indicators
+
+@case("indicators.calc_sma")
+def _calc_sma(df):
+    df = df.copy()
+    return lambda: gi.calc_sma(df, 20, "close", "sma20")
+
+
+@case("indicators.calc_ema")
+def _calc_ema(df):
+    return lambda: gi.calc_ema(df, df["close"], "ema13", window=13)
+
+
+@case("indicators.calc_ema.inplace")
+def _calc_ema_inplace(df):
+    df = df.copy()
+    return lambda: gi.calc_ema(df, df["close"], "ema13", window=13,
+                               inplace=True)
+
+
+@case("indicators.calc_macd")
+def _calc_macd(df):
+    df = _macd_inputs(df)
+    return lambda: gi.calc_macd(df, df["ema12"], df["ema26"])
+
+
+@case("indicators.calc_stoch")
+def _calc_stoch(df):
+    return lambda: gi.calc_stoch(df)
+
+
+@case("indicators.calc_impulse")
+def _calc_impulse(df):
+    df = _impulse_inputs(df)
+    return lambda: gi.calc_impulse(df, "ema13", "macd-h")
+
+
+@case("indicators.calc_force")
+def _calc_force(df):
+    df = df.copy()
+    return lambda: gi.calc_force(df, "close", "volume")
+
+
+@case("indicators.calc_tr")
+def _calc_tr(df):
+    df = df.copy()
+    return lambda: gi.calc_tr(df, "high", "low", "close")
+
+
+# Multi symbol panels
+
+@case("panel.panel_sma", data="panel")
+def _panel_sma(fields):
+    return lambda: gp.panel_sma(fields["close"], 20)
+
+
+@case("panel.panel_ema", data="panel")
+def _panel_ema(fields):
+    return lambda: gp.panel_ema(fields["close"], 13)
+
+
+@case("panel.panel_macd", data="panel")
+def _panel_macd(fields):
+    ema12 = gp.panel_ema(fields["close"], 12)
+    ema26 = gp.panel_ema(fields["close"], 26)
+    return lambda: gp.panel_macd(ema12, ema26)
+
+
+@case("panel.panel_stoch", data="panel")
+def _panel_stoch(fields):
+    return lambda: gp.panel_stoch(fields["open"], fields["high"],
+                                  fields["low"], fields["close"])
+
+
+@case("panel.panel_impulse", data="panel")
+def _panel_impulse(fields):
+    ema13 = gp.panel_ema(fields["close"], 13)
+    macd = gp.panel_macd(gp.panel_ema(fields["close"], 12),
+                         gp.panel_ema(fields["close"], 26))
+    return lambda: gp.panel_impulse(ema13, macd["macd-h"])
+
+
+@case("panel.panel_force", data="panel")
+def _panel_force(fields):
+    return lambda: gp.panel_force(fields["close"], fields["volume"])
+
+
+@case("panel.panel_tr", data="panel")
+def _panel_tr(fields):
+    return lambda: gp.panel_tr(fields["high"], fields["low"],
+                               fields["close"])
+
+
+@case("screener.screen", data="panel")
+def _screen(fields):
+    return lambda: screener.screen(fields, bars=5)
+
+
+# Parameter sweeps, with one row of output per window
+
+@case("sweep.sma_sweep", max_size=10**5)
+def _sma_sweep(df):
+    close = df["close"].to_numpy()
+    return lambda: sweep.sma_sweep(close, range(5, 201))
+
+
+@case("sweep.ema_sweep", max_size=10**5)
+def _ema_sweep(df):
+    close = df["close"].to_numpy()
+    return lambda: sweep.ema_sweep(close, range(5, 201))
+
+
+# Plotting. Drawing every bar is only done up to sizes a chart can show,
+# larger sizes are drawn with ``max_bars="auto"``
+
+@case("plotting.candles", max_size=10**5)
+def _candles(df):
+    ax = _axes()
+    return _drawn(ax, plotting.candles, df, ax)
+
+
+@case("plotting.candles.impulse", max_size=10**5)
+def _candles_impulse(df):
+    ax = _axes()
+    impulse = gi.calc_impulse(_impulse_inputs(df), "ema13", "macd-h",
+                              inplace=True)["impulse"].fillna("blue")
+    return _drawn(ax, plotting.candles, df, ax, impulse=impulse)
+
+
+@case("plotting.candles.max_bars")
+def _candles_max_bars(df):
+    ax = _axes()
+    return _drawn(ax, plotting.candles, df, ax, max_bars="auto")
+
+
+@case("plotting.macds", max_size=10**5)
+def _macds(df):
+    ax = _axes()
+    df = _impulse_inputs(df)
+    return _drawn(ax, plotting.macds, df, ax, "fast", "signal", "macd-h")
+
+
+@case("plotting.macds.max_bars")
+def _macds_max_bars(df):
+    ax = _axes()
+    df = _impulse_inputs(df)
+    return _drawn(ax, plotting.macds, df, ax, "fast", "signal", "macd-h",
+                  max_bars="auto")
+
+
+@case("plotting.force", max_size=10**5)
+def _force(df):
+    ax = _axes()
+    df = gi.calc_force(df.copy(), "close", "volume")
+    return _drawn(ax, plotting.force, df, ax, "force")
+
+
+@case("plotting.force.max_bars")
+def _force_max_bars(df):
+    ax = _axes()
+    df = gi.calc_force(df.copy(), "close", "volume")
+    return _drawn(ax, plotting.force, df, ax, "force", max_bars="auto")
+
+
+@case("plotting.stochs", max_size=10**6)
+def _stochs(df):
+    ax = _axes()
+    df = gi.calc_stoch(df)
+    return _drawn(ax, plotting.stochs, df, ax, "%K", "%D")
+
+
+@case("plotting.daily_labels")
+def _daily_labels(df):
+    return lambda: plotting.daily_labels(df, df.index)
+
+
+@case("plotting.weekly_labels")
+def _weekly_labels(df):
+    return lambda: plotting.weekly_labels(df, df.index)
@@ -0,0 +1,80 @@
+"""Synthetic ohlcv data with fixed seeds, for benchmarks.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import numpy as np
+import pandas as pd
+
+SEED = 1234
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+def _walk(rng, m, symbols):
+    """Random walk ohlcv values, one column per symbol."""
+    close = 100 + np.cumsum(rng.normal(0, 0.1, (m, symbols)), axis=0)
+    close = np.abs(close) + 1
+    open_ = close + rng.normal(0, 0.05, (m, symbols))
+    high = np.maximum(open_, close) + rng.uniform(0, 0.1, (m, symbols))
+    low = np.minimum(open_, close) - rng.uniform(0, 0.1, (m, symbols))
+    volume = rng.integers(1000, 10000, (m, symbols)).astype(float)
+    return [open_, high, low, close, volume]
+
+
+def ohlcv(m, seed=SEED, freq="min"):
+    """Construct a random walk of ohlcv bars.
+
+    Unlike ``gander.tests.data_for_tests.random_test_data``, bars are
+    minutes apart by default, so the index stays within the range of
+    pandas timestamps for 1e7 bars and more.
+
+    :param m: Number of bars
+    :param seed: Seed for the random number generator
+    :param freq: Time between bars
+    :type m: ``int``
+    :type seed: ``int``
+    :type freq: ``str``
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    rng = np.random.default_rng(seed)
+    values = [column[:, 0] for column in _walk(rng, m, 1)]
+    index = pd.date_range("2000-01-03", periods=m, freq=freq)
+    return pd.DataFrame(dict(zip(FIELDS, values)), index=index)
+
+
+def panel(m, symbols=100, seed=SEED, freq="min"):
+    """Construct random walks of ohlcv bars for many symbols.
+
+    :param m: Total number of bars, over all symbols
+    :param symbols: Number of symbols
+    :param seed: Seed for the random number generator
+    :param freq: Time between bars
+    :type m: ``int``
+    :type symbols: ``int``
+    :type seed: ``int``
+    :type freq: ``str``
+    :returns: Wide data frame of each field, one column per symbol
+    :rtype: ``dict`` [``pandas.DataFrame()`` [``float``]]
+    """
+    rng = np.random.default_rng(seed)
+    rows = max(m // symbols, 1)
+    index = pd.date_range("2000-01-03", periods=rows, freq=freq)
+    columns = ["S%04d" % i for i in range(symbols)]
+    return {field: pd.DataFrame(values, index=index, columns=columns)
+            for field, values in zip(FIELDS, _walk(rng, rows, symbols))}
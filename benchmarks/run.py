@@ -0,0 +1,252 @@
+"""Run benchmarks, and compare results with a baseline.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import matplotlib
+import numpy as np
+import pandas as pd
+import gander
+from . import data
+from .cases import CASES
+
+SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+
+
+def _time(case, inputs, repeat, min_time):
+    """Get seconds of each timed call of a case.
+
+    The case is called once untimed, to warm up caches, and then at least
+    ``repeat`` times, until the timed calls add up to ``min_time`` seconds.
+    Calls are timed one by one, so the minimum and median are not skewed
+    by the slowest calls, which are the ones hit by noise from the machine.
+    """
+    case.prepare(inputs)()
+    samples = []
+    while len(samples) < repeat or sum(samples) < min_time:
+        run = case.prepare(inputs)
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return samples
+
+
+def _peak_memory(case, inputs):
+    """Get the peak memory allocated by one call of a case, in bytes.
+
+    Allocations by python and numpy are traced, memory held by matplotlib's
+    renderer in C is not.
+    """
+    run = case.prepare(inputs)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def run(sizes=None, names=None, repeat=5, min_time=1.0, seed=data.SEED,
+        symbols=100, log=None):
+    """Run benchmark cases.
+
+    Input data is created once for each size, from a fixed seed, so runs on
+    different commits or machines use the same data.
+
+    :param sizes: Numbers of bars. Default is 1e3 to 1e7
+    :param names: Run cases whose names contain one of these. Default is
+     all cases
+    :param repeat: Smallest number of timed calls of each case
+    :param min_time: Shortest total duration of the timed calls of each
+     case, in seconds
+    :param seed: Seed of synthetic data
+    :param symbols: Number of symbols in multi symbol panels
+    :param log: Stream to print progress to
+    :type sizes: ``list`` [``int``]
+    :type names: ``list`` [``str``]
+    :type repeat: ``int``
+    :type min_time: ``float``
+    :type seed: ``int``
+    :type symbols: ``int``
+    :returns: Results, see :func:`main`
+    :rtype: ``dict``
+    """
+    sizes = SIZES if sizes is None else sizes
+    cases = [case for case in CASES
+             if names is None or any(name in case.name for name in names)]
+    results = []
+    for m in sizes:
+        inputs = {}
+        for case in cases:
+            if not case.runs_at(m):
+                continue
+            if case.data not in inputs:
+                inputs[case.data] = data.ohlcv(m, seed) \
+                    if case.data == "ohlcv" else \
+                    data.panel(m, symbols, seed)
+            samples = _time(case, inputs[case.data], repeat, min_time)
+            result = {"case": case.name,
+                      "bars": m,
+                      "seconds": min(samples),
+                      "median_seconds": float(np.median(samples)),
+                      "bars_per_second": m / min(samples),
+                      "peak_bytes": _peak_memory(case, inputs[case.data])
+                      }
+            results.append(result)
+            if log is not None:
+                print("%-32s %10d %12.6f s %12.1f MB" % (
+                    case.name, m, result["seconds"],
+                    result["peak_bytes"] / 2**20), file=log)
+    return {"machine": _machine(),
+            "settings": {"repeat": repeat, "min_time": min_time,
+                         "seed": seed, "symbols": symbols},
+            "results": results
+            }
+
+
+def _machine():
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "gander": gander.__version__,
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "matplotlib": matplotlib.__version__,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+            }
+
+
+def compare(results, baseline, threshold=1.2):
+    """Compare results with a baseline run.
+
+    The time ratio is the smaller of the ratios of the best and the median
+    seconds, so a case only counts as slower when both got slower, not when
+    one of them was hit by noise. Peak bytes below one float64 column of
+    the case's bars are counted as one column, so cases that allocate
+    almost nothing do not give huge memory ratios.
+
+    :param results: Results of :func:`run`
+    :param baseline: Results of an earlier :func:`run`
+    :param threshold: Ratio of seconds, or peak bytes, above which a case
+     counts as a regression
+    :type results: ``dict``
+    :type baseline: ``dict``
+    :type threshold: ``float``
+    :returns: Case, bars, ratios of seconds and peak bytes to the baseline,
+     and whether it is a regression, for cases found in both runs
+    :rtype: ``list`` [``dict``]
+    """
+    old = {(result["case"], result["bars"]): result
+           for result in baseline["results"]}
+    rows = []
+    for result in results["results"]:
+        key = (result["case"], result["bars"])
+        if key not in old:
+            continue
+        time_ratio = min(
+            result["seconds"] / old[key]["seconds"],
+            result["median_seconds"] / old[key]["median_seconds"])
+        floor = 8 * result["bars"]
+        memory_ratio = max(result["peak_bytes"], floor) / \
+            max(old[key]["peak_bytes"], floor)
+        rows.append({"case": key[0],
+                     "bars": key[1],
+                     "time_ratio": time_ratio,
+                     "memory_ratio": memory_ratio,
+                     "regression": max(time_ratio, memory_ratio) > threshold
+                     })
+    return rows
+
+
+def main(argv=None):
+    """Run benchmarks from the command line.
+
+    .. code-block:: bash
+
+      python -m benchmarks.run --sizes 1e3 1e5 --output new.json \\
+          --baseline old.json
+
+    Results are written as json, with the machine and package versions, and
+    for each case and size the best and median seconds per call, bars per
+    second and peak bytes allocated. With ``--baseline``, the exit status is
+    1 if any case got slower, or used more memory, than ``--threshold``
+    times the baseline.
+
+    :param argv: Command line arguments. Default is ``sys.argv[1:]``
+    :type argv: ``list`` [``str``]
+    :returns: Exit status
+    :rtype: ``int``
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=float,
+                        help="numbers of bars, default 1e3 to 1e7")
+    parser.add_argument("--cases", nargs="+",
+                        help="run cases whose names contain one of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=data.SEED)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--output", help="json file to write results to")
+    parser.add_argument("--baseline", help="json file of earlier results")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--list", action="store_true",
+                        help="list cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for case in CASES:
+            print(case.name)
+        return 0
+
+    sizes = None if args.sizes is None else [int(m) for m in args.sizes]
+    results = run(sizes, args.cases, args.repeat, args.min_time, args.seed,
+                  args.symbols, log=sys.stderr)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    else:
+        json.dump(results, sys.stdout, indent=1)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as f:
+        rows = compare(results, json.load(f), args.threshold)
+    for row in rows:
+        print("%-32s %10d  time x%.2f  memory x%.2f%s" % (
+            row["case"], row["bars"], row["time_ratio"], row["memory_ratio"],
+            "  REGRESSION" if row["regression"] else ""), file=sys.stderr)
+    return int(any(row["regression"] for row in rows))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Streaming indicators over asyncio bar feeds, for many symbols.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import asyncio
+from collections import namedtuple
+import copy
+from .streaming import update_all
+
+Update = namedtuple("Update", ["symbol", "time", "values"])
+Update.__doc__ = """Indicator values of one symbol after one bar.
+
+``values`` maps each indicator output name to its value.
+"""
+
+_DONE = object()
+
+
+class _Failed:
+    """Error raised by the feed or by an indicator, passed downstream."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class AsyncIndicators:
+    """Streaming indicators of many symbols, fed from an async iterator.
+
+    Each symbol gets its own copy of ``indicators``, see
+    :mod:`gander.streaming`, created on its first bar. Bars are taken from
+    the feed into a bounded queue, and updated in batches in ``executor``,
+    so the event loop is free while indicators are updated. Updates are
+    yielded through another bounded queue. When the consumer of updates
+    falls behind, both queues fill up and the feed is no longer read, so
+    memory use stays bounded.
+
+    .. code-block:: python
+
+      stream = AsyncIndicators({"ema13": (Ema(13), ["close"]),
+                                ("fast", "signal", "macd-h"):
+                                (Macd(12, 26, 9), ["close"])})
+      async for update in stream.stream(gateway.bars()):
+          print(update.symbol, update.time, update.values["macd-h"])
+
+    :param indicators: Output name, or tuple of names for indicators with
+     several values, mapped to a streaming indicator and the names of its
+     inputs, like in :class:`gander.resample.HigherTimeframe`
+    :param maxsize: Maximum number of bars, and of updates, waiting in each
+     queue
+    :param batch: Maximum number of bars updated in one executor call
+    :param executor: Executor to update indicators in. Default is the
+     event loop's default thread pool. Indicator states are kept in the
+     current process, so process pools can not be used
+    :type indicators: ``dict``
+    :type maxsize: ``int``
+    :type batch: ``int``
+    :type executor: ``concurrent.futures.ThreadPoolExecutor``
+    """
+
+    def __init__(self, indicators, maxsize=1024, batch=256, executor=None):
+        self.indicators = indicators
+        self.maxsize = maxsize
+        self.batch = batch
+        self.executor = executor
+        self._outputs = []
+        for names in indicators:
+            self._outputs += [names] if isinstance(names, str) else \
+                list(names)
+        self._states = {}
+
+    @property
+    def symbols(self):
+        """Symbols seen so far.
+
+        :rtype: ``list`` [``str``]
+        """
+        return list(self._states)
+
+    def update(self, symbol, time, bar):
+        """Update the indicators of one symbol with a new bar.
+
+        :param symbol: Symbol name
+        :param time: Time of bar, passed on to the update
+        :param bar: Values of the bar, e.g. "open", "high", "low", "close"
+         and "volume"
+        :type symbol: ``str``
+        :type bar: ``dict`` [``float``]
+        :returns: Indicator values after the bar
+        :rtype: :class:`Update`
+        """
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = copy.deepcopy(self.indicators)
+        values = update_all(state, bar)
+        return Update(symbol, time,
+                      {name: values[name] for name in self._outputs})
+
+    def _update_batch(self, bars):
+        """Update bars in order, stopping at the first error.
+
+        :returns: Updates of the bars before the error, and the error, or
+         ``None``
+        :rtype: ``tuple``
+        """
+        updates = []
+        for symbol, time, bar in bars:
+            try:
+                updates.append(self.update(symbol, time, bar))
+            except Exception as error:
+                return updates, _Failed(error)
+        return updates, None
+
+    async def stream(self, bars):
+        """Update indicators with bars from a feed, yielding updates.
+
+        Updates come in the order of the bars. An error raised by the feed,
+        or by an indicator, is raised here, after the updates of the bars
+        before it.
+
+        :param bars: Async iterator of ``(symbol, time, bar)`` tuples, see
+         :meth:`update`
+        :type bars: ``async iterator`` [``tuple``]
+        :returns: Indicator values after each bar
+        :rtype: ``async iterator`` [:class:`Update`]
+        """
+        inbox = asyncio.Queue(self.maxsize)
+        outbox = asyncio.Queue(self.maxsize)
+        tasks = [asyncio.ensure_future(self._read(bars, inbox)),
+                 asyncio.ensure_future(self._work(inbox, outbox))]
+        try:
+            while True:
+                item = await outbox.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failed):
+                    raise item.error
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _read(self, bars, inbox):
+        """Move bars from the feed into the bounded inbox."""
+        try:
+            async for bar in bars:
+                await inbox.put(bar)
+        except Exception as error:
+            await inbox.put(_Failed(error))
+            return
+        await inbox.put(_DONE)
+
+    async def _work(self, inbox, outbox):
+        """Update indicators with batches of bars, off the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            bars = [await inbox.get()]
+            while len(bars) < self.batch and not inbox.empty():
+                bars.append(inbox.get_nowait())
+            end = None
+            if bars[-1] is _DONE or isinstance(bars[-1], _Failed):
+                end = bars.pop()
+
+            updates = []
+            if bars:
+                try:
+                    updates, failed = await loop.run_in_executor(
+                        self.executor, self._update_batch, bars)
+                except Exception as error:
+                    failed = _Failed(error)
+                end = failed or end
+            for update in updates:
+                await outbox.put(update)
+            if end is not None:
+                await outbox.put(end)
+                return
+
+
+def stream_indicators(bars, indicators, maxsize=1024, batch=256,
+                      executor=None):
+    """Update streaming indicators of many symbols from an async feed.
+
+    Shorthand for ``AsyncIndicators(indicators, ...).stream(bars)``, see
+    :class:`AsyncIndicators`.
+
+    .. code-block:: python
+
+      async for update in stream_indicators(feed, {"ema13": (Ema(13),
+                                                             ["close"])}):
+          ...
+
+    :param bars: Async iterator of ``(symbol, time, bar)`` tuples
+    :param indicators: Indicators to keep for each symbol
+    :param maxsize: Maximum number of bars, and of updates, waiting in each
+     queue
+    :param batch: Maximum number of bars updated in one executor call
+    :param executor: Executor to update indicators in
+    :type bars: ``async iterator`` [``tuple``]
+    :type indicators: ``dict``
+    :type maxsize: ``int``
+    :type batch: ``int``
+    :type executor: ``concurrent.futures.ThreadPoolExecutor``
+    :returns: Indicator values after each bar
+    :rtype: ``async iterator`` [:class:`Update`]
+    """
+    return AsyncIndicators(indicators, maxsize, batch, executor).stream(bars)
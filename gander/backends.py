@@ -0,0 +1,354 @@
+"""Pluggable backends of the indicator kernels, chosen by input size.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import math
+import numpy as np
+from . import kernels
+from .kernels import _ema_loop, _output
+
+KERNELS = ["sma", "ema", "macd", "stoch", "force", "tr", "impulse"]
+
+_IMPULSE_COLORS = np.array([np.nan, "green", "red", "blue"], dtype=object)
+
+
+# Loops over single data points. They are the pure python reference
+# backend, and are compiled as they are by the numba backend, so they only
+# use what numba supports in nopython mode. The ema loop is shared with
+# ``gander.kernels`` and ``gander.panel``.
+
+def _sma_loop(values, window, out):
+    for i in range(len(values)):
+        if i < window - 1:
+            out[i] = np.nan
+            continue
+        total = 0.0
+        for j in range(i - window + 1, i + 1):
+            total += values[j]
+        out[i] = total / window
+
+
+def _stoch_loop(close, prices, window, out):
+    m, n = prices.shape
+    for i in range(m):
+        if i < window - 1:
+            out[i] = np.nan
+            continue
+        # The highest close, and lowest of all prices, NaN if a price is
+        # missing, like numpy's max and min of each price column
+        high = -np.inf
+        for j in range(i - window + 1, i + 1):
+            if np.isnan(close[j]):
+                high = np.nan
+                break
+            high = max(high, close[j])
+        low = np.nan
+        for c in range(n):
+            column_low = np.inf
+            for j in range(i - window + 1, i + 1):
+                if np.isnan(prices[j, c]):
+                    column_low = np.nan
+                    break
+                column_low = min(column_low, prices[j, c])
+            if not np.isnan(column_low) and \
+                    (np.isnan(low) or column_low < low):
+                low = column_low
+
+        numerator = close[i] - low
+        denominator = high - low
+        if denominator == 0:
+            if numerator == 0 or np.isnan(numerator):
+                out[i] = np.nan
+            else:
+                out[i] = math.copysign(np.inf, numerator)
+        else:
+            out[i] = numerator / denominator * 100
+
+
+def _force_loop(close, volume, out):
+    for i in range(len(close)):
+        out[i] = np.nan if i == 0 else (close[i] - close[i - 1]) * volume[i]
+
+
+def _tr_loop(high, low, close, out):
+    for i in range(len(close)):
+        if i == 0:
+            out[i] = np.nan
+            continue
+        # Like the builtin max(), NaN only wins if it comes first
+        value = abs(high[i] - low[i])
+        for other in (abs(high[i] - close[i - 1]),
+                      abs(low[i] - close[i - 1])):
+            if other > value:
+                value = other
+        out[i] = value
+
+
+def _impulse_loop(ema, macdh, codes):
+    found = False
+    last_ema = last_macdh = 0.0
+    for i in range(len(ema)):
+        codes[i] = 0
+        if np.isnan(ema[i]) or np.isnan(macdh[i]):
+            continue
+        if found:
+            if ema[i] > last_ema and macdh[i] > last_macdh:
+                codes[i] = 1
+            elif ema[i] < last_ema and macdh[i] < last_macdh:
+                codes[i] = 2
+            else:
+                codes[i] = 3
+        found = True
+        last_ema = ema[i]
+        last_macdh = macdh[i]
+
+
+def _columns(values):
+    """Get the columns of a 1D or 2D array, as views."""
+    return values.reshape(len(values), -1).T
+
+
+def _loop_kernels(loops):
+    """Build kernels, with the signatures of :mod:`gander.kernels`, on loops.
+
+    :param loops: Loop functions by name, a subset of "sma", "ema",
+     "stoch", "force", "tr" and "impulse"
+    :type loops: ``dict`` [``function``]
+    :rtype: ``dict`` [``function``]
+    """
+    def sma(values, window, out=None):
+        values = np.asarray(values, dtype=float)
+        out = _output(out, len(values), shape=values.shape)
+        for column, column_out in zip(_columns(values), _columns(out)):
+            loops["sma"](column, window, column_out)
+        return out
+
+    def ema(values, window=10, custom_a=None, out=None):
+        a = custom_a if custom_a is not None else 2 / (window)
+        values = np.asarray(values, dtype=float)
+        out = _output(out, len(values), shape=values.shape)
+        for column, column_out in zip(_columns(values), _columns(out)):
+            ema_values = loops["ema"](column[~np.isnan(column)], window, a)
+            column_out[:len(column) - len(ema_values)] = np.nan
+            column_out[len(column) - len(ema_values):] = ema_values
+        return out
+
+    def macd(ema_short, ema_long, window=9, out=None):
+        m = len(ema_short)
+        fast, signal, macdh = out if out is not None else (None, None, None)
+        fast = _output(fast, m)
+        np.subtract(ema_short, ema_long, out=fast)
+        signal = ema(fast, window=window, out=_output(signal, m))
+        macdh = _output(macdh, m)
+        np.subtract(fast, signal, out=macdh)
+        return fast, signal, macdh
+
+    def stoch(close, prices, stoch_window=15, ema_window=4, out=None):
+        close = np.asarray(close, dtype=float)
+        prices = np.asarray(prices, dtype=float).reshape(len(close), -1)
+        m = len(close)
+        k, d, dd = out if out is not None else (None, None, None)
+        k = _output(k, m)
+        loops["stoch"](close, prices, stoch_window, k)
+        d = ema(k, window=ema_window, out=_output(d, m))
+        dd = ema(d, window=ema_window, out=_output(dd, m))
+        return k, d, dd
+
+    def force(close, volume, out=None):
+        close = np.asarray(close, dtype=float)
+        out = _output(out, len(close))
+        loops["force"](close, np.asarray(volume, dtype=float), out)
+        return out
+
+    def tr(high, low, close, out=None):
+        close = np.asarray(close, dtype=float)
+        out = _output(out, len(close))
+        loops["tr"](np.asarray(high, dtype=float),
+                    np.asarray(low, dtype=float), close, out)
+        return out
+
+    def impulse(ema, macdh, out=None):
+        ema = np.asarray(ema, dtype=float)
+        codes = np.empty(len(ema), dtype=np.int64)
+        loops["impulse"](ema, np.asarray(macdh, dtype=float), codes)
+        out = _output(out, len(ema), dtype=object)
+        out[:] = _IMPULSE_COLORS[codes]
+        return out
+
+    funcs = {"sma": sma, "ema": ema, "macd": macd, "stoch": stoch,
+             "force": force, "tr": tr, "impulse": impulse}
+    names = set(loops) | ({"macd"} if "ema" in loops else set())
+    if "ema" not in loops:
+        names.discard("stoch")
+    return {name: func for name, func in funcs.items() if name in names}
+
+
+def _python_kernels():
+    return _loop_kernels({"sma": _sma_loop, "ema": _ema_loop,
+                          "stoch": _stoch_loop, "force": _force_loop,
+                          "tr": _tr_loop, "impulse": _impulse_loop})
+
+
+def _numpy_kernels():
+    return {name: getattr(kernels, name) for name in KERNELS}
+
+
+def _numba_kernels():
+    import numba
+    # Only the recursive kernels gain from compiled loops, the others are
+    # taken from the numpy backend
+    return _loop_kernels({name: numba.njit(cache=True)(loop) for name, loop
+                          in [("ema", _ema_loop), ("tr", _tr_loop),
+                              ("impulse", _impulse_loop)]})
+
+
+class Backend:
+    """Set of kernel functions.
+
+    Kernels are loaded on first use, so backends with optional
+    dependencies, like numba, can be registered whether or not the
+    dependency is installed.
+
+    :param name: Name of backend
+    :param loader: Function that gives the kernels by name, see
+     :mod:`gander.kernels` for their signatures. The "sma" and "ema"
+     kernels also take 2D values, one column per series. It raises
+     ``ImportError`` if the backend is not available
+    :param min_size: Smallest input size the backend is chosen for by
+     "auto". ``None`` means the backend is only used when asked for
+    :type name: ``str``
+    :type loader: ``function``
+    :type min_size: ``int``
+    """
+
+    def __init__(self, name, loader, min_size=None):
+        self.name = name
+        self.loader = loader
+        self.min_size = min_size
+        self._kernels = None
+        self._error = None
+
+    @property
+    def kernels(self):
+        """Kernels of the backend, empty if it is not available.
+
+        :rtype: ``dict`` [``function``]
+        """
+        if self._kernels is None and self._error is None:
+            try:
+                self._kernels = self.loader()
+            except ImportError as error:
+                self._error = error
+        return self._kernels or {}
+
+    @property
+    def available(self):
+        """Whether the backend could be loaded.
+
+        :rtype: ``bool``
+        """
+        return bool(self.kernels)
+
+
+BACKENDS = {}
+
+_backend = "auto"
+
+
+def register_backend(name, loader, min_size=None):
+    """Add a backend, or replace one with the same name.
+
+    Kernels the backend does not have are taken from the "numpy" backend.
+
+    :param name: Name of backend
+    :param loader: Function that gives the kernels by name
+    :param min_size: Smallest input size the backend is chosen for by
+     "auto". ``None`` means the backend is only used when asked for
+    :type name: ``str``
+    :type loader: ``function``
+    :type min_size: ``int``
+    """
+    BACKENDS[name] = Backend(name, loader, min_size)
+
+
+register_backend("python", _python_kernels)
+register_backend("numpy", _numpy_kernels, min_size=0)
+register_backend("numba", _numba_kernels, min_size=10000)
+
+
+def set_backend(name):
+    """Set the backend used by indicators, unless they are given one.
+
+    .. code-block:: python
+
+      set_backend("numba")
+      df = gi.calc_ema(df, df["close"], "ema13", window=13)
+      df = gi.calc_tr(df, "high", "low", "close", backend="python")
+
+    :param name: Name of a registered backend, or "auto" to choose by
+     input size: the available backend with the largest ``min_size`` not
+     above the input size. By default, that is numba from 10000 data
+     points, if it is installed, and numpy otherwise
+    :type name: ``str``
+    """
+    global _backend
+    _check(name)
+    _backend = name
+
+
+def get_backend():
+    """Get the name of the backend set by :func:`set_backend`.
+
+    :rtype: ``str``
+    """
+    return _backend
+
+
+def _check(name):
+    if name != "auto" and name not in BACKENDS:
+        raise ValueError("Unknown backend: %r" % name)
+    if name != "auto" and not BACKENDS[name].available:
+        raise ValueError("Backend %r is not available: %s"
+                         % (name, BACKENDS[name]._error))
+
+
+def kernel(name, size=0, backend=None):
+    """Get a kernel function from a backend.
+
+    :param name: Name of kernel, e.g. "ema", see :mod:`gander.kernels`
+    :param size: Number of data points, for choosing the backend
+    :param backend: Name of backend. Default is the one set by
+     :func:`set_backend`
+    :type name: ``str``
+    :type size: ``int``
+    :type backend: ``str``
+    :returns: Kernel function
+    :rtype: ``function``
+    """
+    backend = _backend if backend is None else backend
+    if backend == "auto":
+        candidates = [b for b in BACKENDS.values()
+                      if b.min_size is not None and b.min_size <= size and
+                      name in b.kernels]
+        chosen = max(candidates, key=lambda b: b.min_size)
+    else:
+        _check(backend)
+        chosen = BACKENDS[backend]
+    funcs = chosen.kernels
+    return funcs[name] if name in funcs else BACKENDS["numpy"].kernels[name]
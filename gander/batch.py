@@ -0,0 +1,314 @@
+"""Render charts for many symbols, headless, over a process pool.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import os
+import time
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from . import plotting
+from .graph import IndicatorGraph
+from .runner import Result, _map_chunks, _pack
+
+_PANEL_SPECS = {"candles": "macd(12, 26, 9), impulse(ema13, macd-h)",
+                "macd": "macd(12, 26, 9)",
+                "force": "force",
+                "stoch": "stoch(15, 4)"
+                }
+
+
+class ChartTemplate:
+    """Figure layout reused for the charts of many symbols.
+
+    The figure and axes are created once, on the first call to
+    :meth:`render`, and cleared of data between symbols. Figures are drawn
+    with the Agg backend directly, without ``matplotlib.pyplot``.
+
+    Panels are drawn from these columns, which are added by ``spec`` if it
+    is given:
+
+    * "candles": ohlc, colored by "impulse" if there is such a column.
+      Bars without an impulse color are drawn "blue"
+    * "macd": "fast", "signal" and "macd-h"
+    * "force": "force"
+    * "stoch": "%K" and "%D"
+
+    :param panels: Panels to draw, top to bottom
+    :param spec: Indicators to add before drawing, see
+     :class:`gander.graph.IndicatorGraph`. Default is the indicators needed
+     by ``panels``. Use "" to draw columns that are already there
+    :param bars: Number of bars to draw, counted from the end. Only the
+     earlier bars needed to warm up the indicators are used, see
+     :meth:`gander.graph.IndicatorGraph.compute_range`. Default is all bars
+    :param labels: "daily", "weekly" or ``None``, see
+     :func:`gander.plotting.daily_labels`
+    :param step: Number of bars between labels
+    :param figsize: Size of figure in inches
+    :param dpi: Resolution of images
+    :param height_ratios: Relative height of each panel. Default is 3 for
+     candles and 1 for other panels
+    :param savefig_kwargs: Keyword arguments to ``savefig``, e.g.
+     ``{"pil_kwargs": {"compress_level": 1}}`` for faster, larger pngs
+    :type panels: ``list`` [``str``]
+    :type spec: ``str``
+    :type bars: ``int``
+    :type labels: ``str``
+    :type step: ``int``
+    :type figsize: ``tuple`` [``float``]
+    :type dpi: ``int``
+    :type height_ratios: ``list`` [``float``]
+    :type savefig_kwargs: ``dict``
+    """
+
+    def __init__(self, panels=("candles", "macd", "force", "stoch"),
+                 spec=None, bars=None, labels="daily", step=5,
+                 figsize=(12, 9), dpi=100, height_ratios=None,
+                 savefig_kwargs=None):
+        for panel in panels:
+            if panel not in _PANEL_SPECS:
+                raise ValueError("Unknown panel: %r" % panel)
+        if spec is None:
+            spec = ", ".join(_PANEL_SPECS[panel] for panel in panels)
+        self.panels = list(panels)
+        self.spec = spec
+        self.bars = bars
+        self.labels = labels
+        self.step = step
+        self.figsize = figsize
+        self.dpi = dpi
+        if height_ratios is None:
+            height_ratios = [3 if panel == "candles" else 1
+                             for panel in panels]
+        self.height_ratios = height_ratios
+        self.savefig_kwargs = savefig_kwargs or {}
+        self._graph = IndicatorGraph(spec) if spec else None
+        self._figure = None
+
+    def __getstate__(self):
+        # The figure is created again in each worker process
+        state = self.__dict__.copy()
+        state["_figure"] = None
+        return state
+
+    @property
+    def figure(self):
+        """Figure of the template, created on first use."""
+        if self._figure is None:
+            self._figure = Figure(figsize=self.figsize, dpi=self.dpi)
+            FigureCanvasAgg(self._figure)
+            self._figure.subplots(
+                len(self.panels), 1, sharex=True, squeeze=False,
+                gridspec_kw={"height_ratios": self.height_ratios})
+        return self._figure
+
+    def render(self, df, path, title=None):
+        """Draw the chart of one symbol and write it to a file.
+
+        :param df: Input data frame
+        :param path: Path of image file. The format is given by the suffix
+        :param title: Title of chart
+        :type df: ``pandas.DataFrame()`` [``float``]
+        :type path: ``str``
+        :type title: ``str``
+        """
+        self.draw(df, title)
+        self.figure.savefig(path, **self.savefig_kwargs)
+
+    def draw(self, df, title=None):
+        """Draw the chart of one symbol, replacing the previous chart.
+
+        :param df: Input data frame
+        :param title: Title of chart
+        :type df: ``pandas.DataFrame()`` [``float``]
+        :type title: ``str``
+        :returns: The figure drawn in
+        :rtype: ``matplotlib.figure.Figure``
+        """
+        if self._graph is not None:
+            start = None if self.bars is None or self.bars >= len(df) \
+                else df.index[len(df) - self.bars]
+            df = self._graph.compute_range(df, start)
+        elif self.bars is not None:
+            df = df.iloc[-self.bars:]
+
+        axes = self.figure.axes
+        for ax in axes:
+            _clear(ax)
+        for panel, ax in zip(self.panels, axes):
+            if panel == "candles":
+                impulse = None
+                if "impulse" in df.columns:
+                    impulse = df["impulse"].fillna("blue")
+                plotting.candles(df, ax, impulse=impulse)
+            elif panel == "macd":
+                plotting.macds(df, ax, "fast", "signal", "macd-h")
+            elif panel == "force":
+                plotting.force(df, ax, "force")
+            elif panel == "stoch":
+                plotting.stochs(df, ax, "%K", "%D")
+        axes[0].set_xlim(-1, len(df))
+        axes[0].set_title("" if title is None else title)
+
+        if self.labels is not None and len(df):
+            if self.labels == "daily":
+                ticks, labels = plotting.daily_labels(df, df.index,
+                                                      step=self.step)
+            else:
+                ticks, labels = plotting.weekly_labels(df, df.index,
+                                                       step=self.step)
+            axes[-1].set_xticks(ticks)
+            axes[-1].set_xticklabels(labels)
+        return self.figure
+
+
+def _clear(ax):
+    """Remove data from axes, but keep the axes themselves."""
+    for artist in ax.lines + ax.collections + ax.patches:
+        artist.remove()
+    ax.ignore_existing_data_limits = True
+    ax.set_autoscale_on(True)
+
+
+_worker_template = None
+
+
+def _init_worker(template):
+    """Keep one template per worker process."""
+    global _worker_template
+    _worker_template = template
+
+
+def _render_chunk(chunk, directory, fmt):
+    """Render and write the charts of a chunk of symbols inside a worker."""
+    out = []
+    for symbol, index, columns, values in chunk:
+        if columns is None:
+            out.append((None, values))
+            continue
+        path = os.path.join(directory, "%s.%s" % (symbol, fmt))
+        try:
+            df = pd.DataFrame(values, index=index, columns=columns)
+            _worker_template.render(df, path, title=str(symbol))
+            out.append((path, None))
+        except Exception as error:
+            out.append((None, error))
+    return out
+
+
+class BatchRenderer:
+    """Render charts for many symbols over a process pool.
+
+    Each worker process keeps its own copy of ``template``, and writes each
+    image as soon as it is drawn, so memory use does not grow with the
+    number of symbols.
+
+    .. code-block:: python
+
+      renderer = BatchRenderer(ChartTemplate(bars=150), "charts/daily")
+      for result in renderer.run(frames.items()):
+          if result.error is not None:
+              print(result.symbol, result.error)
+      print(renderer.stats())
+
+    :param template: Chart layout. Default is ``ChartTemplate()``
+    :param directory: Directory to write images to, created if missing
+    :param fmt: Image format, i.e. file suffix
+    :param max_workers: Number of worker processes. Default is the number of
+     cpus, and 0 renders everything in the current process
+    :param chunksize: Number of symbols sent to a worker at a time
+    :type template: :class:`ChartTemplate`
+    :type directory: ``str``
+    :type fmt: ``str``
+    :type max_workers: ``int``
+    :type chunksize: ``int``
+    """
+
+    def __init__(self, template=None, directory=".", fmt="png",
+                 max_workers=None, chunksize=8):
+        self.template = template if template is not None else ChartTemplate()
+        self.directory = directory
+        self.fmt = fmt
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.charts = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def run(self, items):
+        """Render charts, yielding results as images are written.
+
+        :param items: Pairs of symbol name and ohlcv data frame
+        :type items: ``iterable`` [``tuple`` [``str``, ``pandas.DataFrame()``]]
+        :returns: Path of written image, or the error raised, for each symbol
+        :rtype: ``iterator`` [:class:`gander.runner.Result`]
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        start = time.perf_counter() - self.seconds
+        for chunk, results in _map_chunks(
+                _render_chunk, _pack(items, None),
+                (self.directory, self.fmt), self.max_workers, self.chunksize,
+                _init_worker, (self.template,)):
+            for (symbol, _, _, _), (path, error) in zip(chunk, results):
+                if error is None:
+                    self.charts += 1
+                else:
+                    self.errors += 1
+                self.seconds = time.perf_counter() - start
+                yield Result(symbol, path, error)
+
+    def stats(self):
+        """Get throughput statistics.
+
+        :returns: charts written, errors, seconds and charts per second
+        :rtype: ``dict``
+        """
+        return {"charts": self.charts,
+                "errors": self.errors,
+                "seconds": self.seconds,
+                "charts_per_second": (self.charts / self.seconds
+                                      if self.seconds else 0.0)
+                }
+
+
+def render_universe(items, directory, template=None, max_workers=None,
+                    chunksize=8, fmt="png"):
+    """Render and write charts for all symbols, see :class:`BatchRenderer`.
+
+    :param items: Pairs of symbol name and ohlcv data frame
+    :param directory: Directory to write images to, created if missing
+    :param template: Chart layout. Default is ``ChartTemplate()``
+    :param max_workers: Number of worker processes. Default is the number of
+     cpus, and 0 renders everything in the current process
+    :param chunksize: Number of symbols sent to a worker at a time
+    :param fmt: Image format, i.e. file suffix
+    :type items: ``iterable`` [``tuple`` [``str``, ``pandas.DataFrame()``]]
+    :type directory: ``str``
+    :type template: :class:`ChartTemplate`
+    :type max_workers: ``int``
+    :type chunksize: ``int``
+    :type fmt: ``str``
+    :returns: Throughput statistics, see :meth:`BatchRenderer.stats`
+    :rtype: ``dict``
+    """
+    renderer = BatchRenderer(template, directory, fmt, max_workers,
+                             chunksize)
+    for _ in renderer.run(items):
+        pass
+    return renderer.stats()
@@ -0,0 +1,361 @@
+"""Memoization of indicator results, keyed by content fingerprints.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from collections import OrderedDict
+import functools
+import hashlib
+import inspect
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from . import indicators
+from .layers import add_layer, remove_layer
+
+CACHED_FUNCTIONS = ["calc_sma", "calc_ema", "calc_macd", "calc_stoch",
+                    "calc_impulse", "calc_force", "calc_tr"]
+
+# Columns of the input data frame read by each indicator, from the data frame
+# and the arguments by name. Columns passed as arguments are fingerprinted
+# as arguments.
+INPUT_COLUMNS = {
+    "calc_sma": lambda df, args: [args["column"]],
+    "calc_ema": lambda df, args: [],
+    "calc_macd": lambda df, args: [],
+    "calc_stoch": lambda df, args: list(df.loc[:, "open":"close"].columns),
+    "calc_impulse": lambda df, args: [args["ema"], args["macdh"]],
+    "calc_force": lambda df, args: [args["close"], args["volume"]],
+    "calc_tr": lambda df, args: [args["high"], args["low"], args["close"]]
+}
+
+
+# Random odd keys of the checksums of array values, made in blocks from
+# fixed seeds, so that the key of each position never changes
+_KEY_BLOCK = 2**16
+_checksum_keys = np.empty(0, dtype=np.uint64)
+
+
+def _keys(m):
+    """Get the checksum keys of the first ``m`` positions."""
+    global _checksum_keys
+    keys = _checksum_keys
+    if len(keys) < m:
+        blocks = [keys]
+        for block in range(len(keys) // _KEY_BLOCK, -(-m // _KEY_BLOCK)):
+            rng = np.random.default_rng([20200101, block])
+            blocks.append(rng.integers(0, 2**64, _KEY_BLOCK, np.uint64,
+                                       endpoint=False) | np.uint64(1))
+        keys = _checksum_keys = np.concatenate(blocks)
+    return keys[:m]
+
+
+def _update_hash(digest, values):
+    """Feed an array, or a pandas index or column, into a hash.
+
+    The values are reduced to a 64 bit checksum first, a dot product of
+    their hashes with random odd keys, which is much faster than hashing
+    their bytes. The values are hashed one by one, so that changes which
+    cancel in a sum of the raw bits, like flipping two signs, are seen.
+    """
+    values = np.asarray(values)
+    words = pd.util.hash_array(values.reshape(-1))
+    checksum = int(np.dot(words, _keys(len(words))))
+    digest.update(str((values.dtype, values.shape)).encode())
+    digest.update(checksum.to_bytes(8, "little"))
+
+
+_index_fingerprints = {}
+
+
+def _index_fingerprint(index):
+    """Calculate a content fingerprint of an index, once per index object.
+
+    Pandas indexes are immutable, so the fingerprint is kept until the index
+    is garbage collected.
+    """
+    key = id(index)
+    found = _index_fingerprints.get(key)
+    if found is not None and found[0]() is index:
+        return found[1]
+    digest = hashlib.blake2b(b"index", digest_size=16)
+    _update_hash(digest, index)
+    value = digest.hexdigest()
+    try:
+        ref = weakref.ref(index, lambda _: _index_fingerprints.pop(key, None))
+    except TypeError:
+        return value
+    _index_fingerprints[key] = (ref, value)
+    return value
+
+
+def _column_fingerprints(df):
+    """Calculate a content fingerprint of each column in a data frame."""
+    fingerprints = {}
+    for name in df.columns:
+        digest = hashlib.blake2b(repr(name).encode(), digest_size=16)
+        _update_hash(digest, df[name].to_numpy())
+        fingerprints[name] = digest.hexdigest()
+    return fingerprints
+
+
+def fingerprint(obj, column_fingerprints=None):
+    """Calculate a content fingerprint of a data frame, column or value.
+
+    Data frames and columns are hashed from their index, names and values,
+    so equal data gives equal fingerprints no matter where it comes from.
+
+    :param obj: Object to fingerprint
+    :param column_fingerprints: Already calculated column fingerprints of
+     a data frame
+    :type obj: ``pandas.DataFrame()``, ``pandas.Series()`` or any
+    :type column_fingerprints: ``dict`` [``str``]
+    :returns: Fingerprint
+    :rtype: ``str``
+    """
+    if isinstance(obj, pd.DataFrame):
+        if column_fingerprints is None:
+            column_fingerprints = _column_fingerprints(obj)
+        digest = hashlib.blake2b(b"frame", digest_size=16)
+        digest.update(_index_fingerprint(obj.index).encode())
+        for name in obj.columns:
+            digest.update(column_fingerprints[name].encode())
+        return digest.hexdigest()
+    if isinstance(obj, pd.Series):
+        digest = hashlib.blake2b(b"series", digest_size=16)
+        digest.update(_index_fingerprint(obj.index).encode())
+        digest.update(repr(obj.name).encode())
+        _update_hash(digest, obj.to_numpy())
+        return digest.hexdigest()
+    return repr(obj)
+
+
+class IndicatorCache:
+    """Least recently used cache of indicator results.
+
+    Entries are evicted, least recently used first, when there are more than
+    ``max_entries`` of them, or when they take up more than ``max_bytes``.
+    Only the columns an indicator adds or changes are stored, not the whole
+    data frame.
+
+    .. code-block:: python
+
+      cache = IndicatorCache(max_bytes=2**28)
+      calc_ema = cache.wrap(gi.calc_ema)
+      df = calc_ema(df, df["close"], "ema13", window=13)
+      print(cache.stats())
+
+    :param max_entries: Maximum number of cached results
+    :param max_bytes: Maximum total size of cached results
+    :type max_entries: ``int``
+    :type max_bytes: ``int``
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=2**28):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._wrappers = weakref.WeakSet()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Get hit and miss statistics.
+
+        :returns: hits, misses, hit rate, evictions, entries and bytes
+        :rtype: ``dict``
+        """
+        calls = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / calls if calls else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.nbytes
+                }
+
+    def clear(self):
+        """Remove all entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.nbytes = 0
+
+    def get(self, key):
+        """Look up an entry, and mark it as recently used.
+
+        :param key: Cache key
+        :type key: ``tuple``
+        :returns: Cached entry, or ``None``
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Add an entry, evicting old entries if needed.
+
+        Entries larger than ``max_bytes`` are not stored.
+
+        :param key: Cache key
+        :param value: Entry to store
+        :param nbytes: Size of entry
+        :type key: ``tuple``
+        :type nbytes: ``int``
+        """
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while len(self._entries) > self.max_entries or \
+                    self.nbytes > self.max_bytes:
+                _, (_, old_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= old_nbytes
+                self.evictions += 1
+
+    def wrap(self, func, reads=None):
+        """Wrap an indicator function so that its results are cached.
+
+        The wrapped function takes the same arguments and gives the same
+        output as ``func``. Results are keyed by the function name, the
+        fingerprints of all arguments, and of the index and the columns of
+        the input data frame that ``func`` reads. Other columns are not
+        hashed.
+
+        :param func: Indicator function, like ``gander.indicators.calc_ema``
+        :param reads: Function of the input data frame and the arguments of
+         ``func`` by name, that gives the columns ``func`` reads. Default is
+         from ``INPUT_COLUMNS`` for the functions in ``gander.indicators``,
+         and all columns for other functions
+        :type func: ``function``
+        :type reads: ``function``
+        :returns: Cached indicator function
+        :rtype: ``function``
+        """
+        if func in self._wrappers:
+            return func
+        if reads is None and func.__module__ == indicators.__name__:
+            reads = INPUT_COLUMNS.get(func.__name__)
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def cached(df, *args, **kwargs):
+            names = list(df.columns) if reads is None else \
+                reads(df, signature.bind(df, *args, **kwargs).arguments)
+            key = (func.__module__, func.__qualname__,
+                   _index_fingerprint(df.index),
+                   tuple(fingerprint(df[name]) for name in names),
+                   tuple(fingerprint(arg) for arg in args),
+                   tuple(sorted((name, fingerprint(arg))
+                                for name, arg in kwargs.items())))
+            entry = self.get(key)
+            if entry is not None:
+                return _restore(df, *entry)
+
+            before = {name: df[name] for name in df.columns}
+            out = func(df, *args, **kwargs)
+            same_index = out.index.equals(df.index)
+            if not same_index and not df.index.is_unique:
+                # The output can not be rebuilt from another data frame
+                return out
+            # Keep added columns, and input columns that were overwritten
+            changed = [column for column in out.columns
+                       if column not in before or not _same(
+                           before[column] if same_index else
+                           before[column].reindex(out.index), out[column])]
+            # Columns are copied one at a time, since taking them all at
+            # once consolidates ``out`` in place
+            added = pd.DataFrame({column: out[column].copy()
+                                  for column in changed}) if changed else \
+                pd.DataFrame(index=out.index)
+            nbytes = int(added.memory_usage(deep=True).sum())
+            self.put(key, (added, out is df), nbytes)
+            return out
+
+        self._wrappers.add(cached)
+        return cached
+
+
+def _same(old, new):
+    """Check if two columns are equal, without comparing shared memory."""
+    old_values, new_values = old.to_numpy(), new.to_numpy()
+    if old_values.dtype == new_values.dtype and \
+            old_values.__array_interface__ == new_values.__array_interface__:
+        return True
+    return old.equals(new)
+
+
+def _restore(df, added, inplace):
+    """Add cached columns to a data frame, the way the indicator would."""
+    if added.index.equals(df.index):
+        out = df if inplace else df.copy()
+    else:
+        # The indicator reordered the index, like ``calc_ema`` does
+        out = df.reindex(added.index)
+    for column in added.columns:
+        out[column] = added[column].copy()
+    return out
+
+
+_default_cache = None
+
+
+def enable_cache(max_entries=1024, max_bytes=2**28):
+    """Cache results of all indicator functions in ``gander.indicators``.
+
+    Replaces the ``calc_*`` functions in ``gander.indicators`` with cached
+    versions, so that code calling e.g. ``gi.calc_ema`` is cached without
+    changes. Indicators that call each other, like ``calc_macd`` calling
+    ``calc_ema``, share the cache. Names imported from
+    ``gander.indicators`` before enabling the cache are not affected.
+
+    :param max_entries: Maximum number of cached results
+    :param max_bytes: Maximum total size of cached results
+    :type max_entries: ``int``
+    :type max_bytes: ``int``
+    :returns: The cache in use
+    :rtype: :class:`IndicatorCache`
+    """
+    global _default_cache
+    disable_cache()
+    _default_cache = IndicatorCache(max_entries, max_bytes)
+    for name in CACHED_FUNCTIONS:
+        add_layer(indicators, name, "cache", _default_cache.wrap)
+    return _default_cache
+
+
+def disable_cache():
+    """Restore the uncached indicator functions in ``gander.indicators``."""
+    global _default_cache
+    for name in CACHED_FUNCTIONS:
+        remove_layer(indicators, name, "cache")
+    _default_cache = None
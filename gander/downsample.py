@@ -0,0 +1,136 @@
+"""Level-of-detail downsampling of price data for charts.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def axis_bars(ax):
+    """Get the number of bars an axes can show, one bar per pixel column.
+
+    :param ax: Axes instance to draw in
+    :type ax: ``matplotlib.axes.Axes``
+    :returns: Width of axes in pixels
+    :rtype: ``int``
+    """
+    return max(int(ax.get_window_extent().width), 1)
+
+
+def buckets(m, max_bars):
+    """Split ``m`` bars into at most ``max_bars`` buckets of equal size.
+
+    All buckets hold the same number of bars, except the last one, which
+    may hold fewer.
+
+    :param m: Number of bars
+    :param max_bars: Maximum number of buckets
+    :type m: ``int``
+    :type max_bars: ``int``
+    :returns: First bar and number of bars in each bucket
+    :rtype: ``tuple`` [``numpy.ndarray`` [``int``]]
+    """
+    size = max(-(-m // max(max_bars, 1)), 1)
+    starts = np.arange(0, m, size)
+    return starts, np.minimum(size, m - starts)
+
+
+def ohlc_buckets(df, max_bars, columns=None):
+    """Aggregate bars into at most ``max_bars`` buckets of OHLC bars.
+
+    Each bucket keeps the first open, the highest high, the lowest low and
+    the last close of its bars, and the summed volume if there is a volume
+    column, so extremes are never lost. Buckets are labeled with the index
+    of their first bar. Data with no more than ``max_bars`` bars is
+    returned as it is.
+
+    :param df: Input data frame
+    :param max_bars: Maximum number of bars in output
+    :param columns: Dictionary of appropriate column names, like in
+     :func:`gander.plotting.candles`, optionally with a "volume" key
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type max_bars: ``int``
+    :type columns: ``dict`` [``str``]
+    :returns: Aggregated bars
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    if columns is not None:
+        cols = columns
+    else:
+        cols = {"open": "open",
+                "close": "close",
+                "high": "high",
+                "low": "low",
+                "volume": "volume"
+                }
+    cols = {key: name for key, name in cols.items() if name in df.columns}
+    if len(df) <= max_bars:
+        return df[list(cols.values())]
+
+    starts, counts = buckets(len(df), max_bars)
+    out = {}
+    for key, name in cols.items():
+        values = df[name].to_numpy(dtype=float)
+        if key == "open":
+            out[name] = values[starts]
+        elif key == "high":
+            out[name] = np.fmax.reduceat(values, starts)
+        elif key == "low":
+            out[name] = np.fmin.reduceat(values, starts)
+        elif key == "close":
+            out[name] = values[starts + counts - 1]
+        elif key == "volume":
+            out[name] = np.add.reduceat(values, starts)
+    return pd.DataFrame(out, index=df.index[starts])
+
+
+def minmax_decimate(values, max_points):
+    """Decimate a line to at most ``max_points`` points, keeping extremes.
+
+    The line is split into ``max_points // 2`` buckets, and the lowest and
+    the highest point of each bucket are kept, in their original order.
+    Drawn at one bucket per pixel column, the decimated line looks the same
+    as the full line.
+
+    :param values: Line to decimate
+    :param max_points: Maximum number of points in output
+    :type values: ``numpy.ndarray`` [``float``]
+    :type max_points: ``int``
+    :returns: Positions of kept points in ``values``, and their values
+    :rtype: ``tuple`` [``numpy.ndarray``]
+    """
+    values = np.asarray(values, dtype=float)
+    m = len(values)
+    if m <= max_points:
+        return np.arange(m), values
+
+    starts, counts = buckets(m, max_points // 2)
+    size = counts[0]
+    grid = np.full(len(starts) * size, np.nan)
+    grid[:m] = values
+    grid = grid.reshape(-1, size)
+
+    # Buckets where all values are NaN keep their first point, which is NaN
+    missing = np.isnan(grid)
+    lows = np.where(missing, np.inf, grid).argmin(axis=1)
+    highs = np.where(missing, -np.inf, grid).argmax(axis=1)
+    positions = (np.sort(np.column_stack([lows, highs]), axis=1) +
+                 starts[:, None]).ravel()
+    positions = positions[np.r_[True, positions[1:] != positions[:-1]]]
+    return positions, values[positions]
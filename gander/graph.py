@@ -0,0 +1,405 @@
+"""Declarative indicator specs, resolved into a graph of indicator calls.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import math
+import re
+from . import indicators
+from .runner import Column, apply_calls
+
+_TERM = re.compile(r"^([a-z]+)(\d+)?(?:\((.*)\))?$")
+_KINDS = ["sma", "ema", "macd", "stoch", "impulse", "force", "tr"]
+# Terms with arguments that name columns of other terms
+_REFERRING = ["impulse", "force", "tr"]
+_MACD_COLUMNS = ["fast", "signal", "macd-h"]
+
+
+def _split(spec):
+    """Split a spec on commas that are not inside parentheses."""
+    terms = []
+    depth = 0
+    term = ""
+    for char in spec:
+        if char == "," and depth == 0:
+            terms.append(term.strip())
+            term = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        term += char
+    terms.append(term.strip())
+    return [term for term in terms if term]
+
+
+def _parse(term):
+    """Split a term like ``macd(12, 26, 9)`` into kind and arguments."""
+    match = _TERM.match(term)
+    if match is None:
+        return None, []
+    kind, number, args = match.groups()
+    args = [] if args is None else [arg.strip("\"'") for arg in _split(args)]
+    args = [int(arg) if arg.isdigit() else arg for arg in args]
+    if number is not None:
+        args.insert(0, int(number))
+    return kind, args
+
+
+def ema_lookback(window, tol=1e-6, custom_a=None):
+    """Get the number of bars an ema needs to converge.
+
+    An ema started ``n`` bars later than another is seeded differently, and
+    the difference shrinks by a factor ``1 - a`` each bar. After the
+    returned number of bars, the difference is at most ``tol`` times the
+    spread of the input before the later start.
+
+    :param window: Number of data points to use in average
+    :param tol: Tolerance, relative to the spread of the input
+    :param custom_a: Custom a for the geometric series
+    :type window: ``int``
+    :type tol: ``float``
+    :type custom_a: ``float``
+    :returns: Number of bars, or ``None`` if the ema never converges
+    :rtype: ``int``
+    """
+    a = custom_a if custom_a is not None else 2 / (window)
+    if not 0 < a <= 1:
+        return None
+    decay = 0 if a == 1 else math.ceil(math.log(tol) / math.log(1 - a))
+    return window - 1 + max(decay, 0)
+
+
+def _term(key):
+    """Write a node key as a term, e.g. ``macd(12, 26, 9, close)``."""
+    return "%s(%s)" % (key[0], ", ".join(str(arg) for arg in key[1:]))
+
+
+def _add(*lookbacks):
+    """Add lookbacks, where ``None`` means all of history."""
+    return None if None in lookbacks else sum(lookbacks)
+
+
+class _Indicator:
+    """Function of ``gander.indicators``, looked up when it is called.
+
+    Calls thereby go through the cache and instrumentation, if they are
+    enabled after the graph is made, see :func:`gander.cache.enable_cache`.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        return getattr(indicators, self.name)(*args, **kwargs)
+
+    def __repr__(self):
+        return "_Indicator(%r)" % self.name
+
+
+class _Node:
+    """One indicator call, with the columns it needs and adds.
+
+    ``lookback`` gives the number of bars before a row the call needs, as a
+    function of the ema tolerance.
+    """
+
+    def __init__(self, key, outputs, inputs, call, lookback):
+        self.key = key
+        self.outputs = outputs
+        self.inputs = inputs
+        self.call = call
+        self.lookback = lookback
+
+
+class IndicatorGraph:
+    """Indicators given by a declarative spec, each calculated once.
+
+    The spec is a comma separated list of terms, e.g.
+
+    .. code-block:: python
+
+      graph = IndicatorGraph("ema13, macd(12, 26, 9), impulse(ema13, macd-h),"
+                             " stoch(15, 4)")
+      df = graph.compute(df)
+
+    Supported terms, with defaults, are ``sma(window, column="close")``,
+    ``ema(window, column="close")``, ``macd(12, 26, 9, column="close")``,
+    ``stoch(15, 4)``, ``impulse("ema13", "macd-h")``,
+    ``force("close", "volume")`` and ``tr("high", "low", "close")``. A
+    window may also be written as a suffix, i.e. ``ema13`` is the same as
+    ``ema(13)``. Arguments to ``impulse``, ``force`` and ``tr`` name either
+    input columns, columns added by other terms, or terms like ``ema13``.
+
+    Each distinct indicator is calculated once, even if several terms need
+    it, e.g. ``ema12`` is shared by ``ema12`` and ``macd(12, 26, 9)``.
+    MACD and stochastic terms add fixed column names, so a spec can have
+    only one of each. The MACD columns "fast", "signal" and "macd-h" refer
+    to the MACD term of the spec, or to ``macd(12, 26, 9)`` if there is
+    none.
+
+    :param spec: Comma separated list of indicator terms
+    :type spec: ``str``
+    """
+
+    def __init__(self, spec):
+        self._nodes = {}
+        self._producers = {}
+        terms = _split(spec)
+        # Terms naming columns of other terms come last, so that a MACD
+        # term is found wherever it is in the spec
+        nodes = {}
+        for i in sorted(range(len(terms)),
+                        key=lambda i: _parse(terms[i])[0] in _REFERRING):
+            nodes[i] = self._add_term(terms[i])
+        requested = [nodes[i] for i in range(len(terms))]
+        self.columns = []
+        for node in requested:
+            self.columns += [column for column in node.outputs
+                             if column not in self.columns]
+        self._requested = requested
+        self.calls = [node.call for node in self._order(requested)]
+
+    def compute(self, df):
+        """Add the requested indicator columns to a data frame.
+
+        Intermediate columns, e.g. the emas behind ``macd``, are dropped
+        unless requested. The input data frame is not changed.
+
+        :param df: Input data frame
+        :type df: ``pandas.DataFrame()`` [``float``]
+        :returns: Input data frame with requested indicator columns
+        :rtype: ``pandas.DataFrame()`` [``float``]
+        """
+        columns = list(df.columns)
+        # Some indicators add their columns in place, so they are added to
+        # a new data frame sharing the input columns
+        df = apply_calls(df.copy(deep=False), self.calls)
+        return df[columns + [column for column in self.columns
+                             if column not in columns]]
+
+    def lookback(self, tol=1e-6):
+        """Get the number of bars needed before a row to calculate it.
+
+        Sma, true range, force, impulse and stochastic %K need a fixed
+        number of bars, and give exactly the full history values. Emas, and
+        the MACD lines and stochastic %D built from them, need enough bars
+        to converge to within ``tol`` times the spread of their inputs, see
+        :func:`ema_lookback`. The errors of chained emas add up, e.g. the
+        MACD signal line error is at most about ``2 * tol`` times the close
+        price spread.
+
+        :param tol: Tolerance of ema based indicators
+        :type tol: ``float``
+        :returns: Number of bars, or ``None`` if all of history is needed
+        :rtype: ``int``
+        """
+        lookbacks = {}
+
+        def total(node):
+            if id(node) not in lookbacks:
+                inputs = [total(self._producers[column])
+                          for column in node.inputs
+                          if column in self._producers]
+                inputs = [0] if not inputs else inputs
+                lookbacks[id(node)] = _add(
+                    node.lookback(tol),
+                    None if None in inputs else max(inputs))
+            return lookbacks[id(node)]
+
+        totals = [total(node) for node in self._requested]
+        return None if None in totals else max(totals + [0])
+
+    def compute_range(self, df, start=None, end=None, tol=1e-6):
+        """Add indicator columns to a range of rows only.
+
+        Only the rows from ``start`` to ``end``, and the rows before them
+        given by :meth:`lookback`, are used, so a chart window of a long
+        history is calculated without paying for the whole history.
+
+        .. code-block:: python
+
+          window = graph.compute_range(df, df.index[-300], df.index[-201])
+
+        :param df: Input data frame
+        :param start: Index label of first row. Default is the first row
+        :param end: Index label of last row, included. Default is the last
+         row
+        :param tol: Tolerance of ema based indicators
+        :type df: ``pandas.DataFrame()`` [``float``]
+        :type tol: ``float``
+        :returns: Rows from ``start`` to ``end`` with requested indicator
+         columns
+        :rtype: ``pandas.DataFrame()`` [``float``]
+        """
+        rows = df.index.slice_indexer(start, end)
+        first = rows.start if rows.start is not None else 0
+        stop = rows.stop if rows.stop is not None else len(df)
+        lookback = self.lookback(tol)
+        warmup = first if lookback is None else min(lookback, first)
+        # Copy the rows, since some indicators add their columns in place
+        rows = df.iloc[first - warmup:stop].copy()
+        return self.compute(rows).iloc[warmup:]
+
+    def _add_term(self, term):
+        """Add the node for a term, and the nodes it depends on."""
+        kind, args = _parse(term)
+        if kind not in _KINDS:
+            raise ValueError("Unknown indicator term: %r" % term)
+        try:
+            return getattr(self, "_" + kind)(*args)
+        except TypeError:
+            raise ValueError("Wrong arguments in indicator term: %r" % term)
+
+    def _add_node(self, key, outputs, inputs, call, lookback):
+        """Add a node, unless an identical one already exists."""
+        if key in self._nodes:
+            return self._nodes[key]
+        for column in outputs:
+            if column in self._producers:
+                raise ValueError(
+                    "Column %r is added by both %s and %s, use only one of "
+                    "them" % (column, _term(self._producers[column].key),
+                              _term(key)))
+        node = _Node(key, outputs, inputs, call, lookback)
+        self._nodes[key] = node
+        for column in outputs:
+            self._producers[column] = node
+        return node
+
+    def _reference(self, name):
+        """Resolve a column name, adding a node if it names a term."""
+        kind, args = _parse(name)
+        if kind in _KINDS and args:
+            return self._add_term(name).outputs[0]
+        if name in _MACD_COLUMNS and name not in self._producers:
+            self._macd()
+        return name
+
+    def _order(self, requested):
+        """Order nodes so that every node comes after its inputs."""
+        ordered = []
+        seen = set()
+
+        def visit(node):
+            if id(node) in seen:
+                return
+            seen.add(id(node))
+            for column in node.inputs:
+                if column in self._producers:
+                    visit(self._producers[column])
+            ordered.append(node)
+
+        for node in requested:
+            visit(node)
+        return ordered
+
+    def _sma(self, window, column="close"):
+        name = "sma" + str(window) + ("" if column == "close"
+                                      else "_" + column)
+        return self._add_node(("sma", window, column), [name], [column],
+                              (_Indicator("calc_sma"),
+                               [window, column, name], {}),
+                              lambda tol: window - 1)
+
+    def _ema(self, window, column="close"):
+        name = "ema" + str(window) + ("" if column == "close"
+                                      else "_" + column)
+        return self._add_node(("ema", window, column), [name], [column],
+                              (_Indicator("calc_ema"), [Column(column), name],
+                               {"window": window}),
+                              lambda tol: ema_lookback(window, tol))
+
+    def _macd(self, short=12, long=26, window=9, column="close"):
+        ema_short = self._ema(short, column).outputs[0]
+        ema_long = self._ema(long, column).outputs[0]
+        return self._add_node(("macd", short, long, window, column),
+                              ["fast", "signal", "macd-h"],
+                              [ema_short, ema_long],
+                              (_Indicator("calc_macd"),
+                               [Column(ema_short), Column(ema_long)],
+                               {"window": window}),
+                              lambda tol: ema_lookback(window, tol))
+
+    def _stoch(self, stoch_window=15, ema_window=4):
+        return self._add_node(("stoch", stoch_window, ema_window),
+                              ["%K", "%D", "%%D"],
+                              ["open", "high", "low", "close"],
+                              (_Indicator("calc_stoch"),
+                               [stoch_window, ema_window], {}),
+                              lambda tol: _add(stoch_window - 1,
+                                               ema_lookback(ema_window, tol),
+                                               ema_lookback(ema_window, tol)))
+
+    def _impulse(self, ema="ema13", macdh="macd-h"):
+        ema = self._reference(ema)
+        macdh = self._reference(macdh)
+        return self._add_node(("impulse", ema, macdh), ["impulse"],
+                              [ema, macdh],
+                              (_Indicator("calc_impulse"), [ema, macdh], {}),
+                              lambda tol: 1)
+
+    def _force(self, close="close", volume="volume"):
+        close = self._reference(close)
+        volume = self._reference(volume)
+        return self._add_node(("force", close, volume), ["force"],
+                              [close, volume],
+                              (_Indicator("calc_force"), [close, volume], {}),
+                              lambda tol: 1)
+
+    def _tr(self, high="high", low="low", close="close"):
+        high, low, close = [self._reference(column)
+                            for column in [high, low, close]]
+        return self._add_node(("tr", high, low, close), ["tr"],
+                              [high, low, close],
+                              (_Indicator("calc_tr"), [high, low, close], {}),
+                              lambda tol: 1)
+
+
+def compute(df, spec):
+    """Add indicators given by a declarative spec to a data frame.
+
+    Shorthand for ``IndicatorGraph(spec).compute(df)``, see
+    :class:`IndicatorGraph`.
+
+    :param df: Input data frame
+    :param spec: Comma separated list of indicator terms
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type spec: ``str``
+    :returns: Input data frame with requested indicator columns
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    return IndicatorGraph(spec).compute(df)
+
+
+def compute_range(df, spec, start=None, end=None, tol=1e-6):
+    """Add indicators given by a declarative spec to a range of rows.
+
+    Shorthand for ``IndicatorGraph(spec).compute_range(df, start, end,
+    tol)``, see :meth:`IndicatorGraph.compute_range`.
+
+    :param df: Input data frame
+    :param spec: Comma separated list of indicator terms
+    :param start: Index label of first row. Default is the first row
+    :param end: Index label of last row, included. Default is the last row
+    :param tol: Tolerance of ema based indicators
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type spec: ``str``
+    :type tol: ``float``
+    :returns: Rows from ``start`` to ``end`` with requested indicator columns
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    return IndicatorGraph(spec).compute_range(df, start, end, tol)
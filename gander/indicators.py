@@ -20,9 +20,11 @@ Questions may be directed to resonate@ekkobit.com
 
 import pandas as pd
 import numpy as np
+from . import backends
+from .helper_indicators import pick_columns
 
 
-def calc_sma(df, window, column, new_column_name):
+def calc_sma(df, window, column, new_column_name, backend=None):
     """Calculate simple moving averages.
 
     Calculate SMA for data frame columns and expand data
@@ -32,17 +34,22 @@ def calc_sma(df, window, column, new_column_name):
     :param window: Number of data points to use in moving average
     :param column: which columns in data frame to perform calculations on
     :param trim: Whether or not to trim NaN values
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
     :type df: ``pandas.DataFrame()`` [``float``]
     :type window: ``int``
     :type column: ``str``
+    :type backend: ``str``
     :returns: Input dataframe with added sma column
     :rtype: ``pandas.DataFrame()`` [``float``]
     """
-    df[new_column_name] = df[column].rolling(window).mean()
+    sma = backends.kernel("sma", len(df), backend)
+    df[new_column_name] = sma(df[column].to_numpy(dtype=float), window)
     return df
 
 
-def calc_ema(df, column, new_column_name, window=10, custom_a=None):
+def calc_ema(df, column, new_column_name, window=10, custom_a=None,
+             inplace=False, backend=None):
     r"""Calculate exponential moving average.
 
     :param df: Input data frame
@@ -51,52 +58,140 @@ def calc_ema(df, column, new_column_name, window=10, custom_a=None):
     :param new_column_name: Name for new column of ema
     :param custom_a: Custom a for the geometric series
      :math:`a + ar + ar^2 + ... + ar^{n - 1}`.
+    :param inplace: Add the ema column directly to ``df``, instead of
+     concatenating into a new, index sorted data frame
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
     :type df: ``pandas.DataFrame()`` [``float``]
     :type window: ``int``
     :type column: ``pandas.DataFrame()`` [``float``]
     :type new_column_name: ``str``
     :type custom_a: ``float``
+    :type inplace: ``bool``
+    :type backend: ``str``
     :returns: Input dataframe with added ema column
     :rtype: ``pandas.DataFrame()`` [``float``]
     """
-    a = custom_a if custom_a is not None else 2 / (window)
-    data = column.dropna()
-    old_ema = np.mean(data[:window])
-    ema_values = [old_ema]
-
-    for i in range(len(data) - window):
-        price = data[i + window]
-        ema = a * price + (1 - a) * old_ema
-        ema_values.append(ema)
-        old_ema = ema
-
-    diff = len(df) - len(data)
+    values = column.to_numpy(dtype=float)
+    ema = backends.kernel("ema", len(values), backend)
+    ema_values = ema(values, window=window, custom_a=custom_a)
+    # Leave out the NaN values in front of the first ema value
+    ema_values = ema_values[np.count_nonzero(np.isnan(values)) + window - 1:]
+
+    if inplace:
+        df[new_column_name] = _pad(ema_values, len(df))
+        return df
+
     new_df = pd.DataFrame(ema_values, columns=[new_column_name],
-                          index=df.index[diff + window - 1:])
+                          index=df.index[len(df) - len(ema_values):])
     df = pd.concat([df, new_df], axis=1, sort=True)
 
     return df
 
 
-def calc_macd(df, ema_short, ema_long, window=9):
+def calc_sma_columns(df, window, columns=None, backend=None):
+    """Calculate simple moving averages of several columns at once.
+
+    Columns are picked by :func:`gander.helper_indicators.pick_columns`,
+    and averaged as one 2D array, with the same values as :func:`calc_sma`
+    of each column.
+
+    .. code-block:: python
+
+      smas = calc_sma_columns(df, 10, ["close", "volume"])
+      df[smas.columns] = smas
+
+    :param df: Input data frame
+    :param window: Number of data points to use in moving average
+    :param columns: Columns to average. Default is "open" to "volume"
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type window: ``int``
+    :type columns: ``list`` [``str``]
+    :type backend: ``str``
+    :returns: One sma column for each column, named like "sma_close_10"
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    df_raw, col_names = pick_columns(df, window, "sma", columns)
+    sma = backends.kernel("sma", len(df), backend)
+    return pd.DataFrame(sma(df_raw.to_numpy(dtype=float), window),
+                        index=df.index, columns=col_names)
+
+
+def calc_ema_columns(df, window=10, columns=None, custom_a=None,
+                     backend=None):
+    r"""Calculate exponential moving averages of several columns at once.
+
+    Columns are picked by :func:`gander.helper_indicators.pick_columns`,
+    and scanned together, see :func:`gander.kernels.ema_rows`. Each column
+    has the values of :func:`calc_ema` with ``inplace=True``, up to
+    rounding.
+
+    :param df: Input data frame
+    :param window: Number of data points to use in average
+    :param columns: Columns to average. Default is "open" to "volume"
+    :param custom_a: Custom a for the geometric series
+     :math:`a + ar + ar^2 + ... + ar^{n - 1}`.
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type window: ``int``
+    :type columns: ``list`` [``str``]
+    :type custom_a: ``float``
+    :type backend: ``str``
+    :returns: One ema column for each column, named like "ema_close_10"
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    df_raw, col_names = pick_columns(df, window, "ema", columns)
+    ema = backends.kernel("ema", len(df), backend)
+    values = ema(df_raw.to_numpy(dtype=float), window=window,
+                 custom_a=custom_a)
+    return pd.DataFrame(values, index=df.index, columns=col_names)
+
+
+def _pad(values, m):
+    """Put NaN values in front of an array to make it ``m`` long.
+
+    :param values: Values for the last data points
+    :param m: Length of output
+    :type values: ``numpy.ndarray``
+    :type m: ``int``
+    :rtype: ``numpy.ndarray``
+    """
+    padded = np.full(m, np.nan, dtype=np.result_type(values.dtype, float))
+    padded[m - len(values):] = values
+    return padded
+
+
+def calc_macd(df, ema_short, ema_long, window=9, inplace=False,
+              backend=None):
     """Create MACD fast-, signal line and Histogram from short and long EMAs.
 
     :param df: Input data frame
     :param ema_short: Short term EMA data
     :param ema_long: Long term EMA data
+    :param inplace: Add the signal line directly to ``df``, see
+     :func:`calc_ema`
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
     :type df: ``pandas.DataFrame()`` [``float``]
     :type ema_short: ``pandas.DataFrame()`` [``float``]
     :type ema_long: ``pandas.DataFrame()`` [``float``]
+    :type inplace: ``bool``
+    :type backend: ``str``
     :returns: Input dataframe with added macd columns
     :rtype: ``pandas.DataFrame()`` [``float``]
     """
     df['fast'] = ema_short - ema_long
-    df = calc_ema(df, df["fast"], "signal", window=window)
+    df = calc_ema(df, df["fast"], "signal", window=window, inplace=inplace,
+                  backend=backend)
     df['macd-h'] = df['fast'] - df['signal']
     return df
 
 
-def calc_stoch(df, stoch_window=15, ema_window=4):
+def calc_stoch(df, stoch_window=15, ema_window=4, inplace=False,
+               backend=None):
     """Add two columns to the dataframe, a %K and a %D line.
 
     :param df: Data frame to do and add calculations to
@@ -104,69 +199,87 @@ def calc_stoch(df, stoch_window=15, ema_window=4):
      current data point.
     :param ema_window: number data points in ema smoothing of %K, %D ---
      including current data point
+    :param inplace: Add the stochastic columns directly to ``df``, instead
+     of to a copy of it
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
     :type df: ``pandas.DataFrame()`` [``float``]
     :type stoch_window: ``int``
     :type ema_window: ``int``
+    :type inplace: ``bool``
+    :type backend: ``str``
     :returns: Input dataframe with added stochastic columns
     :rtype: ``pandas.DataFrame()`` [``float``]
     """
-    data = df.copy()
-    highs = data["close"].rolling(stoch_window).max()
-    lows = df.loc[:, "open":"close"].rolling(stoch_window).min().min(axis=1)
-    data["%K"] = ((data["close"] - lows) / (highs - lows)) * 100
-    data = calc_ema(data, data["%K"], "%D", window=ema_window)
-    data = calc_ema(data, data["%D"], "%%D", window=ema_window)
+    data = df if inplace else df.copy()
+    stoch = backends.kernel("stoch", len(df), backend)
+    k, d, dd = stoch(df["close"].to_numpy(dtype=float),
+                     df.loc[:, "open":"close"].to_numpy(dtype=float),
+                     stoch_window=stoch_window, ema_window=ema_window)
+    data["%K"] = k
+    data["%D"] = d
+    data["%%D"] = dd
     return data
 
 
-def calc_impulse(df, ema, macdh):
+def calc_impulse(df, ema, macdh, inplace=False, backend=None):
     """Calculate color according to the impulse system by Elder.
 
     :param df: Data frame to do and add calculations to
     :param ema: Pandas dataframe column. Normally ema13.
     :param macd-h: Pandas dataframe column
+    :param inplace: Add the impulse column directly to ``df``, instead of
+     concatenating into a new, index sorted data frame
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
     :type ema: ``str``
     :type macdh: ``str``
     :type df: ``pandas.DataFrame()`` [``float``]
+    :type inplace: ``bool``
+    :type backend: ``str``
     :returns: Input dataframe with added impulse column
     :rtype: ``pandas.DataFrame()`` [``float``]
     """
-    data = df[[ema, macdh]].dropna()
-    impulse = []
-    for i in range(len(data) - 1):
-        if data[ema][i+1] > data[ema][i] and data[macdh][i+1] > data[macdh][i]:
-            impulse.append("green")
-        elif data[ema][i+1] < data[ema][i] \
-                and data[macdh][i+1] < data[macdh][i]:
-            impulse.append("red")
-        else:
-            impulse.append("blue")
-
-    df_impulse = pd.DataFrame({"impulse": impulse}, index=data.index[1:])
+    kernel = backends.kernel("impulse", len(df), backend)
+    impulse = kernel(df[ema].to_numpy(dtype=float),
+                     df[macdh].to_numpy(dtype=float))
+
+    if inplace:
+        df["impulse"] = impulse
+        return df
+
+    rows = ~pd.isna(impulse)
+    df_impulse = pd.DataFrame({"impulse": impulse[rows]},
+                              index=df.index[rows])
     df_out = pd.concat([df, df_impulse], axis=1, sort=True)
 
     return df_out
 
 
-def calc_force(df, close, volume, col_name="force"):
+def calc_force(df, close, volume, col_name="force", backend=None):
     """Calculate force indicator (Elder).
 
     :param df: Data frame to do and add calculations to
     :param close: Pandas dataframe column name close price
     :param volume: Pandas dataframe column name volume
     :param col_name: Pandas dataframe column name for new force calculations
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
     :type df: ``pandas.DataFrame()`` [``float``]
     :type close: ``str``
     :type volume: ``str``
     :type col_name: ``str``
+    :type backend: ``str``
     :returns: Input dataframe with added force column
     :rtype: ``pandas.DataFrame()`` [``float``]
     """
-    df[col_name] = df[close].diff() * df[volume]
+    force = backends.kernel("force", len(df), backend)
+    df[col_name] = force(df[close].to_numpy(dtype=float),
+                         df[volume].to_numpy(dtype=float))
     return df
 
 
-def calc_tr(df, high, low, close, col_name="tr"):
+def calc_tr(df, high, low, close, col_name="tr", backend=None):
     """Calculate True Range.
 
     :param df: Data frame to do and add calculations to
@@ -175,20 +288,19 @@ def calc_tr(df, high, low, close, col_name="tr"):
     :param close: Pandas dataframe column name close price
     :param col_name: Pandas dataframe column name for new tr calculations.
      Default "tr"
+    :param backend: Kernel backend, see :func:`gander.backends.set_backend`.
+     Default is the backend set globally
     :type df: ``pandas.DataFrame()`` [``float``]
     :type high: ``str``
     :type low: ``str``
     :type close: ``str``
     :type col_name: ``str``
+    :type backend: ``str``
     :returns: Input dataframe with added force column
     :rtype: ``pandas.DataFrame()`` [``float``]
     """
-    tr = [np.nan]
-
-    for i in range(len(df) - 1):
-        high_low = abs(df[high][i + 1] - df[low][i + 1])
-        high_last_close = abs(df[high][i + 1] - df[close][i])
-        low_last_close = abs(df[low][i + 1] - df[close][i])
-        tr.append(max([high_low, high_last_close, low_last_close]))
-    df[col_name] = tr
+    tr = backends.kernel("tr", len(df), backend)
+    df[col_name] = tr(df[high].to_numpy(dtype=float),
+                      df[low].to_numpy(dtype=float),
+                      df[close].to_numpy(dtype=float))
     return df
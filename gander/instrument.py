@@ -0,0 +1,240 @@
+"""Opt-in timing and memory instrumentation of indicators and plotting.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from collections import namedtuple
+import functools
+import logging
+import threading
+import time
+import tracemalloc
+import numpy as np
+from . import indicators, plotting
+from .layers import add_layer, remove_layer
+
+INSTRUMENTED_FUNCTIONS = {
+    indicators: ["calc_sma", "calc_ema", "calc_macd", "calc_stoch",
+                 "calc_impulse", "calc_force", "calc_tr"],
+    plotting: ["candles", "macds", "force", "stochs", "weekly_labels",
+               "daily_labels"]
+}
+
+Measurement = namedtuple("Measurement",
+                         ["name", "seconds", "rows", "bytes", "copies",
+                          "depth"])
+Measurement.__doc__ = """Measurement of one call.
+
+``bytes`` is the peak memory allocated during the call, and ``copies`` the
+same in units of one float64 column of ``rows`` values. Both are ``None``
+unless memory is measured. ``depth`` is 0 for calls from outside of
+instrumented functions, and 1 or more for calls made by them, like
+``calc_macd`` calling ``calc_ema``.
+"""
+
+
+class LoggingSink:
+    """Send measurements to a logger.
+
+    :param logger: Logger to use. Default is the "gander.instrument" logger
+    :param level: Logging level
+    :type logger: ``logging.Logger``
+    :type level: ``int``
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger if logger is not None else \
+            logging.getLogger(__name__)
+        self.level = level
+
+    def __call__(self, measurement):
+        self.logger.log(self.level, "%s: %.6f s, %s rows, %s bytes",
+                        measurement.name, measurement.seconds,
+                        measurement.rows, measurement.bytes)
+
+
+class Aggregator:
+    """Collect measurements in memory, and summarize them by function.
+
+    .. code-block:: python
+
+      aggregator = Aggregator()
+      enable_instrumentation(aggregator)
+      run_strategy()
+      print(aggregator.summary()["gander.indicators.calc_ema"])
+
+    :param percentiles: Percentiles of seconds to summarize
+    :type percentiles: ``list`` [``float``]
+    """
+
+    def __init__(self, percentiles=(50, 90, 99)):
+        self.percentiles = list(percentiles)
+        self._measurements = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, measurement):
+        with self._lock:
+            self._measurements.setdefault(measurement.name, []).append(
+                measurement)
+
+    def clear(self):
+        """Remove all measurements."""
+        with self._lock:
+            self._measurements.clear()
+
+    def summary(self):
+        """Summarize measurements of each function.
+
+        :returns: Number of calls, total seconds, rows and bytes, and
+         percentiles of seconds, e.g. "p90_seconds", for each function name
+        :rtype: ``dict`` [``dict``]
+        """
+        with self._lock:
+            measurements = {name: list(calls)
+                            for name, calls in self._measurements.items()}
+        out = {}
+        for name, calls in measurements.items():
+            seconds = np.array([call.seconds for call in calls])
+            nbytes = [call.bytes for call in calls if call.bytes is not None]
+            stats = {"calls": len(calls),
+                     "seconds": float(seconds.sum()),
+                     "rows": sum(call.rows or 0 for call in calls),
+                     "bytes": sum(nbytes) if nbytes else None
+                     }
+            for q, value in zip(self.percentiles,
+                                np.percentile(seconds, self.percentiles)):
+                stats["p%g_seconds" % q] = float(value)
+            out[name] = stats
+        return out
+
+
+_state = threading.local()
+
+
+def _stack():
+    if not hasattr(_state, "stack"):
+        _state.stack = []
+    return _state.stack
+
+
+def _rows(args):
+    """Get the number of rows of the input data frame, if there is one."""
+    try:
+        return len(args[0])
+    except (IndexError, TypeError):
+        return None
+
+
+def instrument(func, sinks, memory=False):
+    """Wrap a function so that each call is measured.
+
+    :param func: Function to wrap
+    :param sinks: Callables that are given a :class:`Measurement` for each
+     call
+    :param memory: Measure memory allocated, with ``tracemalloc``
+    :type func: ``function``
+    :type sinks: ``list`` [``callable``]
+    :type memory: ``bool``
+    :returns: Instrumented function
+    :rtype: ``function``
+    """
+    name = func.__module__ + "." + func.__qualname__
+
+    @functools.wraps(func)
+    def instrumented(*args, **kwargs):
+        stack = _stack()
+        frame = [0, 0]
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            frame = [current, current]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            rows = _rows(args)
+            nbytes = copies = None
+            if memory:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+                nbytes = peak - frame[0]
+                copies = nbytes / (8 * rows) if rows else None
+            measurement = Measurement(name, seconds, rows, nbytes, copies,
+                                      len(stack))
+            for sink in sinks:
+                sink(measurement)
+
+    return instrumented
+
+
+_started_tracemalloc = False
+
+
+def enable_instrumentation(sinks, memory=False):
+    """Measure all calls of indicator and plotting functions.
+
+    Replaces the functions in ``gander.indicators`` and ``gander.plotting``
+    listed in ``INSTRUMENTED_FUNCTIONS`` with instrumented versions, like
+    :func:`gander.cache.enable_cache` does. When instrumentation is
+    disabled, the original functions are back in place, so it costs
+    nothing. Names imported from those modules before enabling are not
+    affected.
+
+    Memory is measured with ``tracemalloc``, which slows down all code
+    while it runs, so it is off by default. Instrumentation and the cache
+    can be enabled and disabled in any order, see :mod:`gander.layers`.
+
+    .. code-block:: python
+
+      aggregator = Aggregator()
+      enable_instrumentation([aggregator, LoggingSink()], memory=True)
+
+    :param sinks: Callable, or list of callables, that are given a
+     :class:`Measurement` for each call, e.g. :class:`Aggregator` or
+     :class:`LoggingSink`
+    :param memory: Measure memory allocated, with ``tracemalloc``
+    :type sinks: ``callable`` or ``list`` [``callable``]
+    :type memory: ``bool``
+    """
+    global _started_tracemalloc
+    disable_instrumentation()
+    sinks = list(sinks) if isinstance(sinks, (list, tuple)) else [sinks]
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    for module, names in INSTRUMENTED_FUNCTIONS.items():
+        for name in names:
+            add_layer(module, name, "instrument",
+                      lambda func: instrument(func, sinks, memory))
+
+
+def disable_instrumentation():
+    """Restore the original indicator and plotting functions."""
+    global _started_tracemalloc
+    for module, names in INSTRUMENTED_FUNCTIONS.items():
+        for name in names:
+            remove_layer(module, name, "instrument")
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
@@ -0,0 +1,492 @@
+"""Indicator kernels on plain numpy arrays.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Number of data points scanned in one batch of emas
+_BATCH_SIZE = 2**14
+
+
+def _output(out, m, dtype=float, shape=None):
+    """Get an output array, either the one given or a new one."""
+    if out is None:
+        return np.empty(m if shape is None else shape, dtype=dtype)
+    if len(out) != m:
+        raise ValueError("Output array has length %d, expected %d"
+                         % (len(out), m))
+    return out
+
+
+def sma(values, window, out=None):
+    """Calculate simple moving average.
+
+    Windows that contain NaN values give NaN, like
+    ``pandas.Series.rolling(window).mean()``.
+
+    :param values: Input data, or one column of data per sma
+    :param window: Number of data points to use in moving average
+    :param out: Array to write the result to
+    :type values: ``numpy.ndarray`` [``float``]
+    :type window: ``int``
+    :type out: ``numpy.ndarray`` [``float``]
+    :returns: sma, NaN for the first ``window - 1`` data points
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    values = np.asarray(values, dtype=float)
+    m = len(values)
+    out = _output(out, m, shape=values.shape)
+    out[:window - 1] = np.nan
+    if m < window:
+        return out
+
+    missing = np.isnan(values)
+    # Sum deviations from one of the values, which keeps the cumulative sum
+    # small and the window sums accurate for long price series
+    first = np.argmax(~missing, axis=0)
+    offset = np.where(missing.all(axis=0), 0.0,
+                      np.take_along_axis(values, first[None], axis=0)[0]
+                      if values.ndim > 1 else values[first])
+    zero = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate((zero, np.cumsum(np.where(missing, 0.0,
+                                                    values - offset),
+                                           axis=0)))
+    counts = np.concatenate((zero, np.cumsum(missing, axis=0)))
+    out[window - 1:] = (sums[window:] - sums[:-window]) / window + offset
+    out[window - 1:][counts[window:] - counts[:-window] > 0] = np.nan
+    return out
+
+
+def _ema_loop(values, window, a):
+    """Run the ema recursion one data point at a time.
+
+    Reference implementation of :func:`_ema_filter`, seeded with the sma of
+    the first ``window`` values. It is also the loop of the python and numba
+    backends, see :mod:`gander.backends`, so it only uses what numba
+    supports in nopython mode.
+
+    :param values: Data without NaN values
+    :param window: Number of data points in the sma seed
+    :param a: Weight of the newest data point
+    :type values: ``numpy.ndarray`` [``float``]
+    :type window: ``int``
+    :type a: ``float``
+    :returns: ema values, starting at data point ``window - 1``. One value,
+     the mean of all data points, if there are fewer than ``window``
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    k = min(window, len(values))
+    seed = 0.0
+    for i in range(k):
+        seed += values[i]
+    out = np.empty(max(len(values) - window + 1, 1))
+    out[0] = seed / k if k else np.nan
+    for i in range(1, len(out)):
+        out[i] = a * values[i + window - 1] + (1 - a) * out[i - 1]
+    return out
+
+
+def _ema_scan(seeded, a):
+    r"""Run the recursion :math:`y_i = a x_i + (1 - a) y_{i - 1}`, from
+    :math:`y_0 = x_0`, with array operations only.
+
+    The recursion is run on deviations from :math:`x_0`, which keeps
+    constant data exactly constant. The data is cut into blocks short enough
+    that :math:`(1 - a)^{-j}` stays below 10 within a block. Each block is
+    solved from zero by a scaled cumulative sum, and what each block carries
+    into the next one is found by summing over the preceding blocks until
+    their weight vanishes.
+
+    :param seeded: Seed followed by the data points after it
+    :param a: Weight of the newest data point, in :math:`(0, 1]`
+    :type seeded: ``numpy.ndarray`` [``float``]
+    :type a: ``float``
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    r = 1 - a
+    n = len(seeded)
+    if r == 0 or n == 0:
+        return seeded.copy()
+
+    block = int(min(n, max(1, np.log(0.1) / np.log(r))))
+    k = -(-n // block)
+    offset = seeded[0]
+    x = np.zeros(k * block)
+    x[:n] = a * (seeded - offset)
+    x = x.reshape(k, block)
+
+    powers = r ** np.arange(block)
+    local = np.cumsum(x / powers, axis=1) * powers
+
+    ends = local[:, -1]
+    ratio = r ** block
+    terms = 1 if ratio == 0 else int(np.ceil(np.log(1e-17) / np.log(ratio)))
+    carry = np.zeros(k)
+    for i in range(min(terms, k - 1)):
+        carry[i + 1:] += ratio ** i * ends[:k - i - 1]
+
+    return (local + np.outer(carry, powers * r)).ravel()[:n] + offset
+
+
+def _ema_filter(values, window, a):
+    r"""Calculate ema values as a recursive filter over the whole array.
+
+    The sma seed is put in front of the remaining values, and the recursion
+    :math:`ema_i = a \cdot price_i + (1 - a) \cdot ema_{i - 1}` is solved by
+    :func:`_ema_scan`. Weights outside of :math:`(0, 1]` make the recursion
+    unstable, and fall back to :func:`_ema_loop`.
+
+    :param values: Data without NaN values
+    :param window: Number of data points in the sma seed
+    :param a: Weight of the newest data point
+    :type values: ``numpy.ndarray`` [``float``]
+    :type window: ``int``
+    :type a: ``float``
+    :returns: ema values, starting at data point ``window - 1``
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    if not 0 < a <= 1 or len(values) < window:
+        return _ema_loop(values, window, a)
+
+    seeded = np.concatenate(([np.mean(values[:window])], values[window:]))
+    return _ema_scan(seeded, a)
+
+
+def _block(a):
+    """Block length of the ema scan, see :func:`_ema_scan`."""
+    return max(1, int(np.log(0.1) / np.log(1 - a))) if a < 1 else 1
+
+
+def _ema_scan_rows(seeded, a):
+    r"""Run the ema recursion on many rows, with one weight per row.
+
+    Batch version of :func:`_ema_scan`, for rows that share a
+    block length. Each row starts from its own first value.
+
+    :param seeded: Rows of seed followed by the data points after it
+    :param a: Weight of the newest data point of each row, in
+     :math:`(0, 1)`
+    :type seeded: ``numpy.ndarray`` [``float``]
+    :type a: ``numpy.ndarray`` [``float``]
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    rows, n = seeded.shape
+    r = 1 - a
+    block = min(n, min(_block(weight) for weight in a))
+    k = -(-n // block)
+    offset = seeded[:, :1]
+    x = np.zeros((rows, k * block))
+    x[:, :n] = a[:, None] * (seeded - offset)
+    x = x.reshape(rows, k, block)
+
+    powers = r[:, None] ** np.arange(block)
+    local = np.cumsum(x / powers[:, None, :], axis=2) * powers[:, None, :]
+
+    ends = local[:, :, -1]
+    ratio = r ** block
+    terms = int(np.ceil(np.log(1e-17) / np.log(ratio.max())))
+    carry = np.zeros((rows, k))
+    for i in range(min(terms, k - 1)):
+        carry[:, i + 1:] += ratio[:, None] ** i * ends[:, :k - i - 1]
+
+    out = local + carry[:, :, None] * (powers * r[:, None])[:, None, :]
+    return out.reshape(rows, -1)[:, :n] + offset
+
+
+def ema_rows(values, windows, alphas):
+    """Calculate the ema of each row of ``values``, with its own window.
+
+    Like :func:`ema` for each row, NaN values are dropped, and the ema is
+    seeded with the mean of its first ``window`` data points. Rows with
+    block lengths within a factor two of each other are scanned together.
+    Used by :func:`ema` of 2D values and by :mod:`gander.sweep`.
+
+    :param values: Input data, one row per ema, or one row shared by all
+    :param windows: Number of data points in the seed of each row
+    :param alphas: Weight of the newest data point of each row
+    :type values: ``numpy.ndarray`` [``float``]
+    :type windows: ``list`` [``int``]
+    :type alphas: ``list`` [``float``]
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    m = values.shape[-1]
+    if values.ndim == 1:
+        finite_rows = [values[~np.isnan(values)]] * len(windows)
+    else:
+        finite_rows = [row[~np.isnan(row)] for row in values]
+    out = np.full((len(windows), m), np.nan)
+
+    def seeded(i):
+        finite = finite_rows[i]
+        return np.concatenate(([np.mean(finite[:windows[i]])],
+                               finite[windows[i]:]))
+
+    groups = {}
+    for i, (finite, window, a) in enumerate(zip(finite_rows, windows,
+                                                alphas)):
+        if not 0 < a <= 1 or len(finite) < window:
+            ema_values = _ema_loop(finite, window, a)
+            out[i, m - len(ema_values):] = ema_values
+        elif a == 1:
+            out[i, m - len(finite) + window - 1:] = seeded(i)
+        else:
+            groups.setdefault(int(np.log2(_block(a))), []).append(i)
+
+    # Long rows are scanned a few at a time, so the arrays of the scan stay
+    # in cache
+    chunk = max(1, _BATCH_SIZE // max(m, 1))
+    for group in groups.values():
+        for first in range(0, len(group), chunk):
+            rows = group[first:first + chunk]
+            if len(rows) == 1:
+                ema_values = _ema_scan(seeded(rows[0]), alphas[rows[0]])
+                out[rows[0], m - len(ema_values):] = ema_values
+                continue
+            # Rows are aligned at their seeds, shorter rows are padded at
+            # the end, which can not change the values before the padding
+            lengths = [len(finite_rows[i]) - windows[i] + 1 for i in rows]
+            block = np.zeros((len(rows), max(lengths)))
+            for j, i in enumerate(rows):
+                block[j, :lengths[j]] = seeded(i)
+            scanned = _ema_scan_rows(block,
+                                     np.array([alphas[i] for i in rows]))
+            for j, i in enumerate(rows):
+                out[i, m - lengths[j]:] = scanned[j, :lengths[j]]
+    return out
+
+
+def ema(values, window=10, custom_a=None, out=None):
+    r"""Calculate exponential moving average.
+
+    Like :func:`gander.indicators.calc_ema`, NaN values are dropped, the ema
+    is seeded with the mean of the first ``window`` data points, and the
+    result is placed at the end of the output.
+
+    :param values: Input data, or one column of data per ema, scanned
+     together by :func:`ema_rows`
+    :param window: Number of data points to use in average
+    :param custom_a: Custom a for the geometric series
+     :math:`a + ar + ar^2 + ... + ar^{n - 1}`.
+    :param out: Array to write the result to
+    :type values: ``numpy.ndarray`` [``float``]
+    :type window: ``int``
+    :type custom_a: ``float``
+    :type out: ``numpy.ndarray`` [``float``]
+    :returns: ema, NaN for the leading data points
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    a = custom_a if custom_a is not None else 2 / (window)
+    values = np.asarray(values, dtype=float)
+    if values.ndim > 1:
+        n = values.shape[1]
+        out = _output(out, len(values), shape=values.shape)
+        out[:] = ema_rows(values.T, [window] * n, [a] * n).T
+        return out
+    ema_values = _ema_filter(values[~np.isnan(values)], window, a)
+    out = _output(out, len(values))
+    out[:len(out) - len(ema_values)] = np.nan
+    out[len(out) - len(ema_values):] = ema_values
+    return out
+
+
+def macd(ema_short, ema_long, window=9, out=None):
+    """Calculate MACD fast-, signal line and histogram from two emas.
+
+    :param ema_short: Short term ema
+    :param ema_long: Long term ema
+    :param window: Number of data points in signal line ema
+    :param out: Three arrays to write fast, signal and histogram to
+    :type ema_short: ``numpy.ndarray`` [``float``]
+    :type ema_long: ``numpy.ndarray`` [``float``]
+    :type window: ``int``
+    :type out: ``tuple`` [``numpy.ndarray`` [``float``]]
+    :returns: fast line, signal line and histogram
+    :rtype: ``tuple`` [``numpy.ndarray`` [``float``]]
+    """
+    m = len(ema_short)
+    fast, signal, macdh = out if out is not None else (None, None, None)
+    fast = _output(fast, m)
+    np.subtract(ema_short, ema_long, out=fast)
+    signal = ema(fast, window=window, out=_output(signal, m))
+    macdh = _output(macdh, m)
+    np.subtract(fast, signal, out=macdh)
+    return fast, signal, macdh
+
+
+def stoch_k(close, prices, stoch_window=15, out=None):
+    """Calculate the stochastic %K line.
+
+    :param close: Close prices, the highest close is the top of the range
+    :param prices: Prices to take the lowest low from, one column per price,
+     e.g. open, high, low and close
+    :param stoch_window: Number of data points in the stochastic, including
+     current data point.
+    :param out: Array to write the result to
+    :type close: ``numpy.ndarray`` [``float``]
+    :type prices: ``numpy.ndarray`` [``float``]
+    :type stoch_window: ``int``
+    :type out: ``numpy.ndarray`` [``float``]
+    :returns: %K, NaN for the first ``stoch_window - 1`` data points
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    close = np.asarray(close, dtype=float)
+    prices = np.asarray(prices, dtype=float).reshape(len(close), -1)
+    m = len(close)
+    k = _output(out, m)
+    k[:stoch_window - 1] = np.nan
+
+    if m >= stoch_window:
+        highs = sliding_window_view(close, stoch_window).max(axis=-1)
+        lows = sliding_window_view(prices, stoch_window, axis=0)
+        lows = np.fmin.reduce(lows.min(axis=-1), axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k[stoch_window - 1:] = ((close[stoch_window - 1:] - lows) /
+                                    (highs - lows)) * 100
+    return k
+
+
+def stoch(close, prices, stoch_window=15, ema_window=4, out=None):
+    """Calculate stochastic %K and smoothed %D lines.
+
+    :param close: Close prices, the highest close is the top of the range
+    :param prices: Prices to take the lowest low from, one column per price,
+     e.g. open, high, low and close
+    :param stoch_window: Number of data points in the stochastic, including
+     current data point.
+    :param ema_window: number data points in ema smoothing of %K, %D ---
+     including current data point
+    :param out: Three arrays to write %K, %D and %%D to
+    :type close: ``numpy.ndarray`` [``float``]
+    :type prices: ``numpy.ndarray`` [``float``]
+    :type stoch_window: ``int``
+    :type ema_window: ``int``
+    :type out: ``tuple`` [``numpy.ndarray`` [``float``]]
+    :returns: %K, %D and %%D
+    :rtype: ``tuple`` [``numpy.ndarray`` [``float``]]
+    """
+    m = len(close)
+    k, d, dd = out if out is not None else (None, None, None)
+    k = stoch_k(close, prices, stoch_window, out=k)
+    d = ema(k, window=ema_window, out=_output(d, m))
+    dd = ema(d, window=ema_window, out=_output(dd, m))
+    return k, d, dd
+
+
+def force(close, volume, out=None):
+    """Calculate force index (Elder).
+
+    :param close: Close prices
+    :param volume: Volume
+    :param out: Array to write the result to
+    :type close: ``numpy.ndarray`` [``float``]
+    :type volume: ``numpy.ndarray`` [``float``]
+    :type out: ``numpy.ndarray`` [``float``]
+    :returns: force, NaN for the first data point
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    close = np.asarray(close, dtype=float)
+    out = _output(out, len(close))
+    out[:1] = np.nan
+    np.multiply(np.diff(close), volume[1:], out=out[1:])
+    return out
+
+
+def _nan_max(arrays):
+    """Take element wise maximum the way the builtin ``max()`` does.
+
+    The first array wins unless a later one compares greater, so NaN values
+    propagate only from the first array, just like ``max([a, b, c])``.
+
+    :param arrays: Arrays of equal length
+    :type arrays: ``list`` [``numpy.ndarray`` [``float``]]
+    :returns: Element wise maximum
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    result = arrays[0].copy()
+    for array in arrays[1:]:
+        greater = array > result
+        result[greater] = array[greater]
+    return result
+
+
+def tr(high, low, close, out=None):
+    """Calculate true range.
+
+    :param high: High prices
+    :param low: Low prices
+    :param close: Close prices
+    :param out: Array to write the result to
+    :type high: ``numpy.ndarray`` [``float``]
+    :type low: ``numpy.ndarray`` [``float``]
+    :type close: ``numpy.ndarray`` [``float``]
+    :type out: ``numpy.ndarray`` [``float``]
+    :returns: true range, NaN for the first data point
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    out = _output(out, len(close))
+    out[:1] = np.nan
+    if len(close) > 1:
+        out[1:] = _nan_max([np.abs(high[1:] - low[1:]),
+                            np.abs(high[1:] - close[:-1]),
+                            np.abs(low[1:] - close[:-1])])
+    return out
+
+
+def _steps(values):
+    """Find where values go up and down from one data point to the next.
+
+    :param values: Data to compare
+    :type values: ``numpy.ndarray`` [``float``]
+    :returns: Masks for rising and falling values, one shorter than ``values``
+    :rtype: ``tuple`` [``numpy.ndarray`` [``bool``]]
+    """
+    return values[1:] > values[:-1], values[1:] < values[:-1]
+
+
+def impulse(ema, macdh, out=None):
+    """Calculate color according to the impulse system by Elder.
+
+    Like :func:`gander.indicators.calc_impulse`, data points where either
+    input is NaN are skipped, and each color compares with the last data
+    point where both were present.
+
+    :param ema: ema, normally ema13
+    :param macdh: MACD histogram
+    :param out: Object array to write the result to
+    :type ema: ``numpy.ndarray`` [``float``]
+    :type macdh: ``numpy.ndarray`` [``float``]
+    :type out: ``numpy.ndarray`` [``object``]
+    :returns: "green", "red", "blue" or NaN for each data point
+    :rtype: ``numpy.ndarray`` [``object``]
+    """
+    ema = np.asarray(ema, dtype=float)
+    macdh = np.asarray(macdh, dtype=float)
+    rows = np.flatnonzero(~(np.isnan(ema) | np.isnan(macdh)))
+    ema_up, ema_down = _steps(ema[rows])
+    macdh_up, macdh_down = _steps(macdh[rows])
+
+    out = _output(out, len(ema), dtype=object)
+    out[:] = np.nan
+    out[rows[1:]] = np.select([ema_up & macdh_up, ema_down & macdh_down],
+                              ["green", "red"], default="blue")
+    return out
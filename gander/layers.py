@@ -0,0 +1,91 @@
+"""Layers of wrappers around module functions, like caching.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import weakref
+
+# Kind of each layer, and the function that wraps a function in it. Kept
+# outside of the wrappers, since ``functools.wraps`` copies the attributes
+# of a wrapped function onto its wrapper.
+_layers = weakref.WeakKeyDictionary()
+
+
+def add_layer(module, name, kind, wrap):
+    """Replace a module function with a wrapped version of it.
+
+    :param module: Module of function, e.g. ``gander.indicators``
+    :param name: Name of function
+    :param kind: Kind of layer, e.g. "cache"
+    :param wrap: Function that wraps a function in the layer, setting
+     ``__wrapped__``, like ``functools.wraps`` does
+    :type module: ``module``
+    :type name: ``str``
+    :type kind: ``str``
+    :type wrap: ``function``
+    """
+    wrapper = wrap(getattr(module, name))
+    _layers[wrapper] = (kind, wrap)
+    setattr(module, name, wrapper)
+
+
+def remove_layer(module, name, kind):
+    """Remove the layers of one kind from a module function.
+
+    Layers of other kinds stay in their order. Those that were outside of a
+    removed layer are wrapped again around the layers inside of it.
+
+    :param module: Module of function
+    :param name: Name of function
+    :param kind: Kind of layer to remove
+    :type module: ``module``
+    :type name: ``str``
+    :type kind: ``str``
+    """
+    func = getattr(module, name)
+    outer = []
+    while func in _layers:
+        outer.append(func)
+        func = func.__wrapped__
+    removed = False
+    for layer in reversed(outer):
+        layer_kind, wrap = _layers[layer]
+        if layer_kind == kind:
+            removed = True
+        elif removed:
+            func = wrap(func)
+            _layers[func] = (layer_kind, wrap)
+        else:
+            func = layer
+    setattr(module, name, func)
+
+
+def has_layer(func, kind):
+    """Check if a function has a layer of one kind.
+
+    :param func: Function, wrapped or not
+    :param kind: Kind of layer
+    :type func: ``function``
+    :type kind: ``str``
+    :rtype: ``bool``
+    """
+    while func in _layers:
+        if _layers[func][0] == kind:
+            return True
+        func = func.__wrapped__
+    return False
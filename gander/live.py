@@ -0,0 +1,372 @@
+"""Live charts, updated in place as new bars arrive.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import numpy as np
+from matplotlib.collections import PathCollection
+from .plotting import _candle_paths, _macd_bin_paths
+
+# Number of bars drawn by each set of settled artists. A new bar only
+# rebuilds the set it settles into.
+_CHUNK_SIZE = 1000
+
+
+class _LiveChart:
+    """Bars of a live chart, and the artists drawing them.
+
+    Bars are drawn by settled artists for all bars but the last, one set
+    per ``_CHUNK_SIZE`` bars, and live artists for the last bar. Ticks that
+    only change the last bar only touch the live artists. When a new bar
+    arrives, only the set of settled artists it settles into is rebuilt,
+    and when blitting, bars that settle are drawn into the stored
+    background instead of redrawing the figure.
+    """
+
+    def __init__(self, ax, df, columns, blit):
+        self.ax = ax
+        self.blit = blit
+        self._columns = columns
+        self._index = list(df.index)
+        self._m = len(df)
+        self._data = {}
+        for name in columns:
+            values = df[name].to_numpy()
+            dtype = object if values.dtype.kind in "OUS" else float
+            self._data[name] = np.empty(max(2 * self._m, 256), dtype=dtype)
+            self._data[name][:self._m] = values
+        self._settled = 0
+        self._background = None
+
+        self._chunks = [self._create()]
+        self._live_artists = self._create()
+        self._settle()
+        self._draw_live()
+        ax.set_xlim(-1, max(self._m, 1))
+        if blit:
+            for artist in self._live_artists:
+                artist.set_animated(True)
+            ax.figure.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def __len__(self):
+        return self._m
+
+    def update(self, new_bars):
+        """Add new bars, or replace the last bar, and update the chart.
+
+        If the first new bar has the same index as the last bar, it replaces
+        the last bar, e.g. for a bar that is still forming. Other bars are
+        added after the last bar.
+
+        With ``blit=True``, only the changed bars are drawn, and a new bar
+        only rebuilds the artists of the last ``_CHUNK_SIZE`` settled bars,
+        so the cost of an update does not depend on the number of bars.
+        Only updates that change the axis limits redraw the full figure,
+        which does.
+
+        :param new_bars: New bars, with the same columns as the initial data
+        :type new_bars: ``pandas.DataFrame()`` [``float``]
+        :returns: Changed artists, e.g. for
+         ``matplotlib.animation.FuncAnimation``
+        :rtype: ``list`` [``matplotlib.artist.Artist``]
+        """
+        if len(new_bars) == 0:
+            return []
+        start = self._m
+        if start and new_bars.index[0] == self._index[-1]:
+            start -= 1
+        stop = start + len(new_bars)
+        self._reserve(stop)
+        for name in self._columns:
+            self._data[name][start:stop] = new_bars[name].to_numpy()
+        del self._index[start:]
+        self._index.extend(new_bars.index)
+        self._m = stop
+
+        full = self._rescale_x()
+        full = self._rescale_y(start) or full
+        changed = []
+        if self._m - 1 > self._settled:
+            if self.blit and not full and self._background is not None:
+                # Draw the bars that settled into the background
+                self._set(self._live_artists, self._settled, self._m - 1)
+                self._draw_background()
+            changed = self._settle()
+        self._draw_live()
+        if self.blit:
+            self._blit(full)
+        if full:
+            return self._settled_artists + self._live_artists
+        return changed + list(self._live_artists)
+
+    @property
+    def _settled_artists(self):
+        return [artist for chunk in self._chunks for artist in chunk]
+
+    def _reserve(self, m):
+        """Grow data buffers to hold at least ``m`` bars."""
+        for name, values in self._data.items():
+            if len(values) < m:
+                grown = np.empty(max(2 * len(values), m), dtype=values.dtype)
+                grown[:self._m] = values[:self._m]
+                self._data[name] = grown
+
+    def _values(self, name, start=0, stop=None):
+        """Get a view of the values of a column."""
+        return self._data[name][start:self._m if stop is None else stop]
+
+    def _settle(self):
+        """Draw bars settled since the last call with the settled artists.
+
+        :returns: Changed artists
+        :rtype: ``list`` [``matplotlib.artist.Artist``]
+        """
+        stop = max(self._m - 1, 0)
+        changed = []
+        for k in range(self._settled // _CHUNK_SIZE, -(-stop // _CHUNK_SIZE)):
+            if k == len(self._chunks):
+                self._chunks.append(self._create())
+            start = k * _CHUNK_SIZE
+            self._set(self._chunks[k], start, min(start + _CHUNK_SIZE, stop))
+            changed += self._chunks[k]
+        self._settled = stop
+        return changed
+
+    def _draw_live(self):
+        self._set(self._live_artists, self._settled, self._m)
+
+    def _rescale_x(self):
+        """Make room for new bars on the x-axis, 10 % at a time."""
+        left, right = self.ax.get_xlim()
+        if self._m - 0.5 <= right:
+            return False
+        self.ax.set_xlim(left, self._m - 0.5 + 0.1 * (right - left))
+        return True
+
+    def _rescale_y(self, start):
+        """Widen the y-axis if bars from ``start`` fall outside it."""
+        low, high = self._y_range(start)
+        bottom, top = self.ax.get_ylim()
+        if not (low < bottom or high > top):
+            return False
+        low, high = min(low, bottom), max(high, top)
+        padding = (high - low) * 0.05
+        self.ax.set_ylim(low - padding, high + padding)
+        return True
+
+    def _on_draw(self, event):
+        """Store the background, and draw the live artists on top of it."""
+        canvas = self.ax.figure.canvas
+        self._background = canvas.copy_from_bbox(self.ax.bbox)
+        for artist in self._live_artists:
+            self.ax.draw_artist(artist)
+
+    def _draw_background(self):
+        """Draw the live artists into the stored background."""
+        canvas = self.ax.figure.canvas
+        canvas.restore_region(self._background)
+        for artist in self._live_artists:
+            self.ax.draw_artist(artist)
+        self._background = canvas.copy_from_bbox(self.ax.bbox)
+
+    def _blit(self, full):
+        """Redraw the live artists only, or the full figure."""
+        canvas = self.ax.figure.canvas
+        if full or self._background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self._background)
+            for artist in self._live_artists:
+                self.ax.draw_artist(artist)
+        canvas.blit(self.ax.bbox)
+
+
+def _set_line(line, values, start, stop):
+    """Set the data of a line to values from ``start`` to ``stop``."""
+    line.set_data(np.arange(start, stop), values[start:stop])
+
+
+class LiveCandles(_LiveChart):
+    """Candle chart updated in place, see :func:`gander.plotting.candles`.
+
+    .. code-block:: python
+
+      chart = LiveCandles(ax, df, blit=True)
+      for bar in feed:
+          chart.update(bar)
+
+    :param ax: Axes instance of subplot to plot candles in
+    :param df: Initial data frame
+    :param cwidth: width of candle, 1 is full width, 0 is no width
+    :param lwidth: width of grid line width
+    :param columns: Dictionary of appropriate column names, like in
+     :func:`gander.plotting.candles`
+    :param colors: Colors to use for candles when impulse=None (Default),
+     like in :func:`gander.plotting.candles`
+    :param impulse: Name of data frame column with impulse system data,
+     either "red", "green" or "blue"
+    :param blit: Redraw only the last bar on ticks, with blitting. The last
+     bar is then left out of ``savefig``
+    :type ax: ``matplotlib.axes.Axes``
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type cwidth: ``float`` or ``int``
+    :type lwidth: ``float`` or ``int``
+    :type columns: ``dict`` [``str``]
+    :type colors: ``list`` [``str``]
+    :type impulse: ``str``
+    :type blit: ``bool``
+    """
+
+    def __init__(self, ax, df, cwidth=0.6, lwidth=1, columns=None,
+                 colors=None, impulse=None, blit=False):
+        if columns is not None:
+            cols = columns
+        else:
+            cols = {"open": "open",
+                    "close": "close",
+                    "high": "high",
+                    "low": "low"
+                    }
+        self._cols = [cols["open"], cols["close"], cols["high"], cols["low"]]
+        self._colors = colors if colors is not None else ["green", "red"]
+        self._impulse = impulse
+        self.cwidth = cwidth
+        self.lwidth = lwidth
+        super().__init__(ax, df, self._cols + ([] if impulse is None
+                                               else [impulse]), blit)
+        if self._m:
+            low, high = self._y_range(0)
+            padding = (high - low) * 0.05
+            ax.set_ylim(low - padding, high + padding)
+
+    def _create(self):
+        wicks = PathCollection([], facecolors='none', linestyle='-',
+                               linewidth=self.lwidth, capstyle='projecting',
+                               zorder=2)
+        bodies = PathCollection([], linewidth=self.lwidth)
+        self.ax.add_collection(wicks)
+        self.ax.add_collection(bodies)
+        return [wicks, bodies]
+
+    def _set(self, artists, start, stop):
+        impulse = None
+        if self._impulse is not None:
+            impulse = self._values(self._impulse, start, stop)
+        wicks, bodies = _candle_paths(
+            np.arange(start, stop),
+            *[self._values(name, start, stop) for name in self._cols],
+            self._colors[0], self._colors[1], impulse, self.cwidth)
+        artists[0].set_paths(wicks[0])
+        artists[0].set_edgecolor(wicks[1])
+        artists[1].set_paths(bodies[0])
+        artists[1].set_facecolor(bodies[1])
+        artists[1].set_edgecolor(bodies[2])
+
+    def _y_range(self, start):
+        return (np.nanmin(self._values(self._cols[3], start)),
+                np.nanmax(self._values(self._cols[2], start)))
+
+
+class LiveMacd(_LiveChart):
+    """MACD chart updated in place, see :func:`gander.plotting.macds`.
+
+    :param ax: Axes instance of subplot to plot macd in
+    :param df: Initial data frame
+    :param fast: Name of data frame column, fast line
+    :param signal: Name of data frame column, signal line
+    :param macdh: Name of data frame column, macd histogram
+    :param blit: Redraw only the last bar on ticks, with blitting. The last
+     bar is then left out of ``savefig``
+    :type ax: ``matplotlib.axes.Axes``
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type fast: ``str``
+    :type signal: ``str``
+    :type macdh: ``str``
+    :type blit: ``bool``
+    """
+
+    def __init__(self, ax, df, fast, signal, macdh, blit=False):
+        self._names = [fast, signal, macdh]
+        super().__init__(ax, df, self._names, blit)
+        if self._m:
+            axis_max = np.nanmax(np.abs(self._values(fast)))
+            padding = axis_max * 0.1
+            ax.set_ylim(ymin=-axis_max - padding, ymax=axis_max + padding)
+
+    def _create(self):
+        fast, = self.ax.plot([], [], 'k-')
+        signal, = self.ax.plot([], [], 'r--')
+        bins = PathCollection([], edgecolors='black', linewidth=1)
+        self.ax.add_collection(bins)
+        return [fast, signal, bins]
+
+    def _set(self, artists, start, stop):
+        # Line segments start at the last point of the bars before
+        for line, name in zip(artists[:2], self._names[:2]):
+            _set_line(line, self._data[name], max(start - 1, 0), stop)
+        paths, colors = _macd_bin_paths(
+            np.arange(start, stop),
+            self._values(self._names[2], start, stop), 0.6)
+        artists[2].set_paths(paths)
+        artists[2].set_facecolor(colors)
+
+    def _rescale_y(self, start):
+        """Widen the y-axis symmetrically, like ``macds()``."""
+        axis_max = np.nanmax(np.abs(self._values(self._names[0], start)))
+        if not axis_max > self.ax.get_ylim()[1]:
+            return False
+        padding = axis_max * 0.1
+        self.ax.set_ylim(ymin=-axis_max - padding, ymax=axis_max + padding)
+        return True
+
+
+class LiveStochs(_LiveChart):
+    """Stochastic chart updated in place, see :func:`gander.plotting.stochs`.
+
+    :param ax: Axes instance of subplot to plot stochastic in
+    :param df: Initial data frame
+    :param raw: Name of data frame column, raw stachastic (%K)
+    :param smooth: Name of data frame column, smoothed raw stachastic (%D)
+    :param blit: Redraw only the last bar on ticks, with blitting. The last
+     bar is then left out of ``savefig``
+    :type ax: ``matplotlib.axes.Axes``
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type raw: ``str``
+    :type smooth: ``str``
+    :type blit: ``bool``
+    """
+
+    def __init__(self, ax, df, raw, smooth, blit=False):
+        self._names = [raw, smooth]
+        super().__init__(ax, df, self._names, blit)
+        ax.axhline(50, linestyle='--', color='gray')
+        ax.axhline(80, linestyle='-', color='gray')
+        ax.axhline(20, linestyle='-', color='gray')
+        ax.set_ylim(ymin=0, ymax=100)
+
+    def _create(self):
+        raw, = self.ax.plot([], [], 'k-')
+        smooth, = self.ax.plot([], [], 'r-')
+        return [raw, smooth]
+
+    def _set(self, artists, start, stop):
+        for line, name in zip(artists, self._names):
+            _set_line(line, self._data[name], max(start - 1, 0), stop)
+
+    def _rescale_y(self, start):
+        return False
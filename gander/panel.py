@@ -0,0 +1,219 @@
+"""Indicators for many symbols at once.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import pandas as pd
+import numpy as np
+from .kernels import _ema_loop, _nan_max
+
+
+def panel_fields(df, fields=None, symbol_level=0):
+    """Split a multi symbol data frame into one wide data frame per field.
+
+    A wide data frame has time along the index and one column per symbol.
+    Both data frames with (field, symbol) MultiIndex columns and data frames
+    with (symbol, time) MultiIndex rows are accepted.
+
+    :param df: Input data frame
+    :param fields: Fields to pick out. Default is all fields
+    :param symbol_level: Level of the MultiIndex rows holding symbols
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type fields: ``list`` [``str``]
+    :type symbol_level: ``int`` or ``str``
+    :returns: Wide data frame for each field
+    :rtype: ``dict`` [``pandas.DataFrame()`` [``float``]]
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        if fields is None:
+            fields = df.columns.get_level_values(0).unique()
+        return {field: df[field] for field in fields}
+
+    if fields is None:
+        fields = df.columns
+    wide = df[list(fields)].unstack(symbol_level)
+    return {field: wide[field] for field in fields}
+
+
+def panel_sma(prices, window):
+    """Calculate simple moving averages for all symbols.
+
+    :param prices: Wide data frame, one column per symbol
+    :param window: Number of data points to use in moving average
+    :type prices: ``pandas.DataFrame()`` [``float``]
+    :type window: ``int``
+    :returns: sma for all symbols
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    return prices.rolling(window).mean()
+
+
+def panel_ema(prices, window=10, custom_a=None):
+    """Calculate exponential moving averages for all symbols.
+
+    Each symbol gets the same values as :func:`gander.indicators.calc_ema`
+    gives for its column, i.e. leading NaN values are dropped and the ema is
+    seeded with the mean of the first ``window`` data points after them.
+    NaN values inside a series are skipped by the ema and left as NaN, so
+    results stay aligned to the dates of each symbol.
+
+    :param prices: Wide data frame, one column per symbol
+    :param window: Number of data points to use in average
+    :param custom_a: Custom a for the geometric series
+    :type prices: ``pandas.DataFrame()`` [``float``]
+    :type window: ``int``
+    :type custom_a: ``float``
+    :returns: ema for all symbols
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    a = custom_a if custom_a is not None else 2 / (window)
+    values = prices.to_numpy(dtype=float)
+    missing = np.isnan(values)
+
+    # Count valid data points per symbol, so that the seed lands on the
+    # window-th valid data point no matter where each symbol starts
+    valid_count = np.cumsum(~missing, axis=0)
+    seed_row = (valid_count == window) & ~missing
+    before_seed = valid_count < window
+
+    if not 0 < a <= 1:
+        ema = np.full(values.shape, np.nan)
+        for j in range(values.shape[1]):
+            rows = np.flatnonzero(~missing[:, j])
+            if len(rows) >= window:
+                ema[rows[window - 1:], j] = _ema_loop(values[rows, j],
+                                                      window, a)
+        return pd.DataFrame(ema, index=prices.index, columns=prices.columns)
+
+    sums = np.cumsum(np.where(missing, 0, values), axis=0)
+    seeded = np.where(before_seed, np.nan, values)
+    seeded[seed_row] = sums[seed_row] / window
+
+    ema = pd.DataFrame(seeded, index=prices.index, columns=prices.columns)
+    ema = ema.ewm(alpha=a, adjust=False, ignore_na=True).mean()
+    return ema.mask(np.isnan(seeded))
+
+
+def panel_macd(ema_short, ema_long, window=9):
+    """Calculate MACD fast-, signal line and histogram for all symbols.
+
+    :param ema_short: Short term ema, one column per symbol
+    :param ema_long: Long term ema, one column per symbol
+    :param window: Number of data points in signal line ema
+    :type ema_short: ``pandas.DataFrame()`` [``float``]
+    :type ema_long: ``pandas.DataFrame()`` [``float``]
+    :type window: ``int``
+    :returns: Wide data frames "fast", "signal" and "macd-h"
+    :rtype: ``dict`` [``pandas.DataFrame()`` [``float``]]
+    """
+    fast = ema_short - ema_long
+    signal = panel_ema(fast, window=window)
+    return {"fast": fast, "signal": signal, "macd-h": fast - signal}
+
+
+def panel_stoch(open, high, low, close, stoch_window=15, ema_window=4):
+    """Calculate stochastic %K and %D lines for all symbols.
+
+    :param open: Open prices, one column per symbol
+    :param high: High prices, one column per symbol
+    :param low: Low prices, one column per symbol
+    :param close: Close prices, one column per symbol
+    :param stoch_window: Number of data points in the stochastic, including
+     current data point.
+    :param ema_window: number data points in ema smoothing of %K, %D ---
+     including current data point
+    :type open: ``pandas.DataFrame()`` [``float``]
+    :type high: ``pandas.DataFrame()`` [``float``]
+    :type low: ``pandas.DataFrame()`` [``float``]
+    :type close: ``pandas.DataFrame()`` [``float``]
+    :type stoch_window: ``int``
+    :type ema_window: ``int``
+    :returns: Wide data frames "%K", "%D" and "%%D"
+    :rtype: ``dict`` [``pandas.DataFrame()`` [``float``]]
+    """
+    highs = close.rolling(stoch_window).max()
+    lows = np.fmin.reduce([field.rolling(stoch_window).min().to_numpy()
+                           for field in [open, high, low, close]])
+    k = ((close - lows) / (highs - lows)) * 100
+    d = panel_ema(k, window=ema_window)
+    return {"%K": k, "%D": d, "%%D": panel_ema(d, window=ema_window)}
+
+
+def panel_force(close, volume):
+    """Calculate force index (Elder) for all symbols.
+
+    :param close: Close prices, one column per symbol
+    :param volume: Volume, one column per symbol
+    :type close: ``pandas.DataFrame()`` [``float``]
+    :type volume: ``pandas.DataFrame()`` [``float``]
+    :returns: force for all symbols
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    return close.diff() * volume
+
+
+def panel_tr(high, low, close):
+    """Calculate true range for all symbols.
+
+    Symbols have no true range until the bar after their first close, just
+    like the first bar of :func:`gander.indicators.calc_tr`.
+
+    :param high: High prices, one column per symbol
+    :param low: Low prices, one column per symbol
+    :param close: Close prices, one column per symbol
+    :type high: ``pandas.DataFrame()`` [``float``]
+    :type low: ``pandas.DataFrame()`` [``float``]
+    :type close: ``pandas.DataFrame()`` [``float``]
+    :returns: true range for all symbols
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    highs = high.to_numpy(dtype=float)
+    lows = low.to_numpy(dtype=float)
+    last_close = close.shift(1).to_numpy(dtype=float)
+    tr = _nan_max([np.abs(highs - lows), np.abs(highs - last_close),
+                   np.abs(lows - last_close)])
+    tr[close.notna().cumsum().shift(1, fill_value=0).to_numpy() == 0] = np.nan
+    return pd.DataFrame(tr, index=close.index, columns=close.columns)
+
+
+def panel_impulse(ema, macdh):
+    """Calculate impulse system colors (Elder) for all symbols.
+
+    Like :func:`gander.indicators.calc_impulse`, dates where either input is
+    NaN are skipped, and each color compares with the last date where both
+    were present.
+
+    :param ema: ema, normally ema13, one column per symbol
+    :param macdh: MACD histogram, one column per symbol
+    :type ema: ``pandas.DataFrame()`` [``float``]
+    :type macdh: ``pandas.DataFrame()`` [``float``]
+    :returns: "green", "red", "blue" or NaN for all symbols
+    :rtype: ``pandas.DataFrame()`` [``str``]
+    """
+    valid = ema.notna() & macdh.notna()
+    ema = ema.where(valid)
+    macdh = macdh.where(valid)
+    last_ema = ema.ffill().shift(1)
+    last_macdh = macdh.ffill().shift(1)
+
+    green = (ema > last_ema) & (macdh > last_macdh)
+    red = (ema < last_ema) & (macdh < last_macdh)
+    impulse = np.select([green, red], ["green", "red"],
+                        default="blue").astype(object)
+    impulse[~(valid & last_ema.notna()).to_numpy()] = np.nan
+    return pd.DataFrame(impulse, index=ema.index, columns=ema.columns)
@@ -19,14 +19,21 @@ Questions may be directed to resonate@ekkobit.com
 """
 
 import numpy as np
-import matplotlib.patches as mpatches
-from matplotlib.collections import PatchCollection
+import pandas as pd
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
+from .downsample import axis_bars, buckets, ohlc_buckets, minmax_decimate
 
 
 def candles(df, ax, cwidth=0.6, lwidth=1, columns=None, colors=None,
-            impulse=None):
+            impulse=None, max_bars=None):
     r"""Draw a candle chart in the figure main ax.
 
+    With ``max_bars``, bars are aggregated into OHLC buckets that keep the
+    extremes of their bars, see :func:`gander.downsample.ohlc_buckets`, and
+    each bucket is drawn as one wider candle at the x-positions of its bars.
+    Impulse colors are taken from the last bar of each bucket.
+
     :param df: Input data frame
     :param ax: Axes instance of subplot to plot candles in
     :param cwidth: width of candle, 1 is full width, 0 is no width
@@ -46,6 +53,8 @@ def candles(df, ax, cwidth=0.6, lwidth=1, columns=None, colors=None,
      price. Second color is for when closing price is lower than opening price.
      Default is ["green", red]
     :param impulse: Impulse system data, either "red", "green" or "blue"
+    :param max_bars: Maximum number of candles to draw, or "auto" for one
+     candle per pixel column of ``ax``. Default is to draw all bars
     :type df: ``pandas.DataFrame()`` [``float``]
     :type ax: ``matplotlib.axes.Axes``
     :type cwidth: ``float`` or ``int``
@@ -53,6 +62,7 @@ def candles(df, ax, cwidth=0.6, lwidth=1, columns=None, colors=None,
     :type columns: ``dict`` [``str``]
     :type colors: ``list`` [``str``]
     :type impulse: ``pandas.DataFrame()`` [``str``]
+    :type max_bars: ``int`` or ``str``
     """
     if columns is not None:
         cols = columns
@@ -63,9 +73,6 @@ def candles(df, ax, cwidth=0.6, lwidth=1, columns=None, colors=None,
                 "low": "low"
                 }
 
-    m = len(df)
-    xpos = range(m)
-
     if colors is not None:
         upcolor = colors[0]
         downcolor = colors[1]
@@ -73,125 +80,232 @@ def candles(df, ax, cwidth=0.6, lwidth=1, columns=None, colors=None,
         upcolor = "green"
         downcolor = "red"
 
-    candles = []
-    facecol = []
-    edgecol = []
-
-    # Build dimensions for candles and wicks and decide fill-color
-    for i in range(m):
-        candle_height = abs(df[cols["close"]][i] - df[cols["open"]][i])
-        if df[cols["close"]][i] < df[cols["open"]][i]:
-            y_pos = df[cols["close"]][i]
-            wick_top_base = df[cols["open"]][i]
-            wick_bottom_base = df[cols["close"]][i]
-            if impulse is None:
-                facecol.append(downcolor)
-                edgecol.append(downcolor)
-                linecol = downcolor
-        else:
-            y_pos = df[cols["open"]][i]
-            wick_top_base = df[cols["close"]][i]
-            wick_bottom_base = df[cols["open"]][i]
-            if impulse is None:
-                facecol.append(upcolor)
-                edgecol.append(upcolor)
-                linecol = upcolor
-
+    xpos = np.arange(len(df))
+    if max_bars is not None:
+        starts, counts = buckets(len(df), _max_bars(ax, max_bars))
+        df = ohlc_buckets(df, len(starts), cols)
+        xpos = starts + (counts - 1) / 2
+        cwidth = cwidth * counts
         if impulse is not None:
-            if df[cols["close"]][i] < df[cols["open"]][i]:
-                facecol.append('white')
-            else:
-                facecol.append(impulse[i])
-
-            edgecol.append(impulse[i])
-            linecol = impulse[i]
-
-        wick_top_tip = df[cols["high"]][i]
-        wick_bottom_tip = df[cols["low"]][i]
-
-        # Build candles in the form of rectangles, append to list of candles
-        candle = mpatches.Rectangle([xpos[i]-(cwidth/2), y_pos],
-                                    cwidth, candle_height)
-        candles.append(candle)
-
-        # Plot wick lines
-        ax.plot([xpos[i], xpos[i]], [wick_top_base, wick_top_tip],
-                linestyle='-', color=linecol, linewidth=lwidth)
-        ax.plot([xpos[i], xpos[i]], [wick_bottom_base, wick_bottom_tip],
-                linestyle='-', color=linecol, linewidth=lwidth)
-
-    # Make a collection from candle-rectangles and add to ax
-    collection = PatchCollection(candles, facecolors=facecol,
-                                 edgecolors=edgecol, linewidth=lwidth)
-    ax.add_collection(collection)
+            impulse = np.asarray(impulse, dtype=str)[starts + counts - 1]
+
+    opens = df[cols["open"]].to_numpy(dtype=float)
+    closes = df[cols["close"]].to_numpy(dtype=float)
+    highs = df[cols["high"]].to_numpy(dtype=float)
+    lows = df[cols["low"]].to_numpy(dtype=float)
+
+    # Make collections from candle-rectangles and wick-lines and add to ax,
+    # with one compound path per color rather than one path per candle
+    wicks, bodies = _candle_paths(xpos, opens, closes, highs, lows,
+                                  upcolor, downcolor, impulse, cwidth)
+    paths, wick_colors = wicks
+    ax.add_collection(PathCollection(paths, facecolors='none',
+                                     edgecolors=wick_colors,
+                                     linestyle='-', linewidth=lwidth,
+                                     capstyle='projecting', zorder=2),
+                      autolim=False)
+    paths, facecolors, edgecolors = bodies
+    collection = PathCollection(paths, facecolors=facecolors,
+                                edgecolors=edgecolors, linewidth=lwidth)
+    ax.add_collection(collection, autolim=False)
+    # Scale to the wicks only, at the candle centres, not the body widths
+    ax.update_datalim(np.column_stack(
+        [np.tile(xpos, 4), np.concatenate([opens, closes, highs, lows])]))
+    ax.autoscale_view()
+
+
+def _candle_paths(xpos, opens, closes, highs, lows, upcolor, downcolor,
+                  impulse, cwidth):
+    """Build wick and body paths of candles, grouped by color.
+
+    :returns: Wick paths and colors, and body paths, face- and edge colors
+    :rtype: ``tuple`` [``tuple``]
+    """
+    down = closes < opens
+
+    # Decide fill-, edge- and wick-color
+    if impulse is None:
+        linecol = np.where(down, downcolor, upcolor)
+        facecol = linecol
+    else:
+        linecol = np.asarray(impulse, dtype=str)
+        facecol = np.where(down, 'white', linecol)
+
+    # Build candles in the form of rectangles, and wicks from the body to the
+    # high and low price
+    body_top = np.where(down, opens, closes)
+    body_bottom = np.where(down, closes, opens)
+    candles = _rectangles(xpos - cwidth / 2, body_bottom, cwidth,
+                          body_top - body_bottom)
+    wicks = np.stack([np.column_stack([xpos, body_top, xpos, highs]),
+                      np.column_stack([xpos, body_bottom, xpos, lows])],
+                     axis=1).reshape(-1, 2, 2)
+
+    wick_paths, (wick_colors,) = _grouped_paths(wicks, _LINE_CODES,
+                                                np.repeat(linecol, 2))
+    body_paths, (facecolors, edgecolors) = _grouped_paths(
+        candles, _RECT_CODES, facecol, linecol)
+    return (wick_paths, wick_colors), (body_paths, facecolors, edgecolors)
+
+
+def _max_bars(ax, max_bars):
+    """Resolve a ``max_bars`` argument to a number of bars."""
+    return axis_bars(ax) if max_bars == "auto" else int(max_bars)
+
+
+def _decimate(values, ax, max_bars):
+    """Get x-positions and values of a line, decimated to ``max_bars``."""
+    values = np.asarray(values, dtype=float)
+    if max_bars is None:
+        return np.arange(len(values)), values
+    return minmax_decimate(values, 2 * _max_bars(ax, max_bars))
+
+
+_LINE_CODES = [Path.MOVETO, Path.LINETO]
+_RECT_CODES = [Path.MOVETO, Path.LINETO, Path.LINETO, Path.LINETO,
+               Path.CLOSEPOLY]
+
+
+def _rectangles(x, y, width, height):
+    """Build closed rectangle vertices.
+
+    :param x: Left edges
+    :param y: Bottom edges
+    :param width: Widths
+    :param height: Heights
+    :type x: ``numpy.ndarray`` [``float``]
+    :type y: ``numpy.ndarray`` [``float``]
+    :type width: ``float`` or ``numpy.ndarray`` [``float``]
+    :type height: ``numpy.ndarray`` [``float``]
+    :returns: Vertices, shape (number of rectangles, 5, 2)
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    x, y, width, height = np.broadcast_arrays(x, y, width, height)
+    return np.stack([np.column_stack([x, y]),
+                     np.column_stack([x + width, y]),
+                     np.column_stack([x + width, y + height]),
+                     np.column_stack([x, y + height]),
+                     np.column_stack([x, y])], axis=1)
+
+
+def _grouped_paths(shapes, codes, *colors):
+    """Join shapes of equal colors into one compound path per color.
+
+    Creating one ``matplotlib.path.Path`` per shape is what makes large
+    collections slow, while a chart only has a handful of colors.
+
+    :param shapes: Vertices, shape (number of shapes, vertices per shape, 2)
+    :param codes: Path codes for the vertices of one shape
+    :param colors: One or more sequences of colors, one color per shape
+    :type shapes: ``numpy.ndarray`` [``float``]
+    :type codes: ``list`` [``int``]
+    :type colors: ``numpy.ndarray`` [``str``]
+    :returns: One path per distinct combination of colors, and the colors
+     of each path
+    :rtype: ``tuple`` [``list`` [``matplotlib.path.Path``], ``list``]
+    """
+    if len(shapes) == 0:
+        return [], [[] for _ in colors]
 
+    keys = np.stack([np.asarray(color, dtype=str) for color in colors])
+    unique, inverse = np.unique(keys, axis=1, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind="stable")
+    splits = np.cumsum(np.bincount(inverse))[:-1]
 
-def macds(df, ax, fast, signal, macdh):
+    paths = [Path(group.reshape(-1, 2), np.tile(codes, len(group)))
+             for group in np.split(shapes[order], splits)]
+    return paths, [list(row) for row in unique]
+
+
+def macds(df, ax, fast, signal, macdh, max_bars=None):
     """Plot macd fast- and signal line and histogram.
 
+    With ``max_bars``, the fast- and signal line are decimated to the
+    lowest and highest point per bucket of bars, see
+    :func:`gander.downsample.minmax_decimate`, and each histogram bin shows
+    the value furthest from zero in its bucket.
+
     :param df: Input data frame
     :param ax: Axes instance of subplot to plot macd in
     :param figsize: Size of figure in inches
     :param fast: Name of data frame column, fast line
     :param signal: Name of data frame column, signal line
     :param macdh: Name of data frame column, macd histogram
+    :param max_bars: Maximum number of histogram bins to draw, or "auto"
+     for one bin per pixel column of ``ax``. Default is to draw all bars
     :type df: ``pandas.DataFrame()`` [``float``]
     :type ax: ``matplotlib.axes.Axes``
     :type fast: ``str``
     :type signal: ``str``
     :type macdh: ``str``
+    :type max_bars: ``int`` or ``str``
     """
     m = len(df)
-    xpos = range(m)
-
     max_macdh = df[fast].max()
     min_macdh = df[fast].min()
     axis_max = max(np.abs(max_macdh), np.abs(min_macdh))
     padding = axis_max * 0.1
     ax.set_ylim(ymin=-axis_max - padding, ymax=axis_max + padding)
-    ax.plot(xpos, df[fast], 'k-')
-    ax.plot(xpos, df[signal], 'r--')
+    ax.plot(*_decimate(df[fast], ax, max_bars), 'k-')
+    ax.plot(*_decimate(df[signal], ax, max_bars), 'r--')
 
-    # Build MACD-Histogram
-    bins = []
-    bin_color = []
+    # Build MACD-Histogram, bins in the form of rectangles from zero
+    macdh_values = df[macdh].to_numpy(dtype=float)
+    xpos = np.arange(m)
     bin_width = 0.6
-
-    for i in range(m):
-        if df[macdh][i] < 0:
-            ypos = df[macdh][i]
-            bin_color.append('white')
-        else:
-            ypos = 0
-            bin_color.append('lightblue')
-
-        bin_height = abs(df[macdh][i])
-
-        # Build bins in the form of rectangles, append to list of bins
-        binn = mpatches.Rectangle([xpos[i]-(1/2)*bin_width, ypos],
-                                  bin_width, bin_height)
-        bins.append(binn)
+    if max_bars is not None and m:
+        starts, counts = buckets(m, _max_bars(ax, max_bars))
+        highs = np.fmax.reduceat(macdh_values, starts)
+        lows = np.fmin.reduceat(macdh_values, starts)
+        macdh_values = np.where(np.abs(lows) > np.abs(highs), lows, highs)
+        xpos = starts + (counts - 1) / 2
+        bin_width = bin_width * counts
+    paths, bin_color = _macd_bin_paths(xpos, macdh_values, bin_width)
 
     # Make a collection from macd-rectangles and add to ax
-    collection = PatchCollection(bins, facecolors=bin_color,
-                                 edgecolors='black', linewidth=1)
+    collection = PathCollection(paths, facecolors=bin_color,
+                                edgecolors='black', linewidth=1)
     ax.add_collection(collection)
 
 
-def force(df, ax, force):
+def _macd_bin_paths(xpos, macdh_values, bin_width):
+    """Build MACD histogram bin paths, grouped by color.
+
+    :returns: Bin paths and colors
+    :rtype: ``tuple`` [``list``]
+    """
+    shown = ~np.isnan(macdh_values)
+    bin_width = np.broadcast_to(bin_width, shown.shape)[shown]
+    negative = macdh_values[shown] < 0
+    bins = _rectangles(xpos[shown] - (1/2)*bin_width,
+                       np.where(negative, macdh_values[shown], 0),
+                       bin_width, np.abs(macdh_values[shown]))
+    paths, (bin_color,) = _grouped_paths(bins, _RECT_CODES,
+                                         np.where(negative, 'white',
+                                                  'lightblue'))
+    return paths, bin_color
+
+
+def force(df, ax, force, max_bars=None):
     """Draw force with differential coloring below and above zero.
 
+    With ``max_bars``, force is decimated to the lowest and highest point
+    per bucket of bars, see :func:`gander.downsample.minmax_decimate`.
+
     :param df: Input data frame
     :param ax: Axes instance of subplot to plot macd in
     :param force: Name of data frame column, force
+    :param max_bars: Maximum number of buckets to decimate force to, or
+     "auto" for one bucket per pixel column of ``ax``. Default is to draw
+     all bars
     :type df: ``pandas.DataFrame()`` [``float``]
     :type ax: ``matplotlib.axes.Axes``
     :type force: ``str``
+    :type max_bars: ``int`` or ``str``
     """
-    m = len(df)
-    xpos = range(m)
-    xpos_new = [xpos[0]]
-    force_new = [df[force][0]]
+    xpos, force_values = _decimate(df[force], ax, max_bars)
+    m = len(xpos)
 
     max_force = df[force].max()
     min_force = df[force].min()
@@ -199,31 +313,28 @@ def force(df, ax, force):
     padding = axis_max * 0.1
     ax.set_ylim(ymin=-axis_max - padding, ymax=axis_max + padding)
 
-    ax.plot(xpos, df[force], 'k-', alpha=0.3)
+    ax.plot(xpos, force_values, 'k-', alpha=0.3)
 
-    for i in range(m - 1):
-        if df[force][i+1] * df[force][i] < 0:
-            force_new.append(0)
-            m = df[force][i+1] - df[force][i]
-            x_intercept = ((m*xpos[i+1])-df[force][i+1])/m
-            xpos_new.append(x_intercept)
-            xpos_new.append(xpos[i+1])
-            force_new.append(df[force][i+1])
-        else:
-            force_new.append(df[force][i+1])
-            xpos_new.append(xpos[i+1])
-
-    xpos_new.append(xpos[-1])
-    force_new.append(df[force][-1])
+    # Add points where force crosses zero, so that the fills below and above
+    # zero meet there
+    crossing = np.flatnonzero(force_values[1:] * force_values[:-1] < 0)
+    slope = ((force_values[crossing + 1] - force_values[crossing]) /
+             (xpos[crossing + 1] - xpos[crossing]))
+    x_intercept = ((slope*xpos[crossing + 1]) -
+                   force_values[crossing + 1])/slope
+    xpos_new = np.insert(xpos.astype(float), crossing + 1, x_intercept)
+    force_new = np.insert(force_values, crossing + 1, 0)
+    xpos_new = np.append(xpos_new, xpos[-1])
+    force_new = np.append(force_new, force_values[-1])
 
-    force_pos = np.array(force_new) >= 0
-    force_neg = np.array(force_new) <= 0
+    force_pos = force_new >= 0
+    force_neg = force_new <= 0
 
     ax.fill_between(xpos_new, force_new, y2=0, where=force_pos, color='green',
                     alpha=0.3)
     ax.fill_between(xpos_new, force_new, y2=0, where=force_neg, color='red',
                     alpha=0.3)
-    ax.plot(xpos, [0 for pos in xpos], "k-", alpha=0.3)
+    ax.plot(xpos, np.zeros(m), "k-", alpha=0.3)
 
 
 def stochs(df, ax, raw, smooth):
@@ -248,66 +359,129 @@ def stochs(df, ax, raw, smooth):
     ax.set_ylim(ymin=0, ymax=100)
 
 
+_MONTHS = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+
+
+_DAYS = np.array(["%02d" % day for day in range(32)])
+
+
+def _date_parts(dates, m, seperator, step):
+    """Split the first date, and the dates of each tick, into parts.
+
+    Dates are either datetimes, or strings like "2020-01-31", where day
+    labels are taken as they are written.
+
+    :returns: ticks, and years, months and day labels of the first date
+     followed by the dates of each tick
+    :rtype: ``tuple`` [``numpy.ndarray``]
+    """
+    ticks = np.arange(step - 1, m, step)
+    dates = pd.Index(dates[:m])[np.r_[0, ticks]]
+    if dates.dtype == object:
+        parts = dates.str.split(seperator, expand=True)
+        return (ticks, parts.get_level_values(0).astype(int).to_numpy(),
+                parts.get_level_values(1).astype(int).to_numpy(),
+                parts.get_level_values(2).to_numpy(dtype=str))
+    dates = pd.DatetimeIndex(dates)
+    return (ticks, dates.year.to_numpy(), dates.month.to_numpy(),
+            _DAYS[dates.day.to_numpy()])
+
+
+def _next_major(years, months, k, old_year, old_month):
+    """Find the first tick from ``k`` that could get a year or month label.
+
+    Searches windows of growing size, so that finding all major ticks costs
+    about as much as one pass over the ticks.
+    """
+    size = 64
+    while k < len(years):
+        stop = min(k + size, len(years))
+        hit = np.flatnonzero((years[k:stop] > old_year) |
+                             ((months[k:stop] != old_month) &
+                              (months[k:stop] != 1)))
+        if len(hit):
+            return k + hit[0]
+        k = stop
+        size *= 2
+    return None
+
+
 def weekly_labels(df, dates, seperator="-", step=5):
     """Get labels and ticks appropriate for weekly plot.
 
+    Every ``step``-th date gets a tick. Ticks are labeled with the year when
+    the year is later than at the last year label, and with day and month
+    otherwise.
+
     :param df: Input data frame
+    :param dates: Dates of the data frame rows, either datetimes or
+     strings like "2020-01-31"
+    :param seperator: Seperator of year, month and day in string dates
+    :param step: Number of rows between ticks
     :type df: ``pandas.DataFrame()`` [``float``]
+    :type dates: ``pandas.DatetimeIndex`` or ``list`` [``str``]
+    :type seperator: ``str``
+    :type step: ``int``
     :returns: ticks and labels
     :rtype ticks: ``list`` [``int``]
-    :rtype labels: ``list`` [``int``]
+    :rtype labels: ``list`` [``str``]
     """
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-              "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    raw_labels = [dates[i].split(seperator) for i in range(len(df))]
-    labels = []
-    ticks = []
-    old_year = int(raw_labels[0][0])
-    for i in range(len(raw_labels)):
-        if (i + 1) % step == 0:
-            new_year = int(raw_labels[i][0])
-            new_month = int(raw_labels[i][1])
-            if new_year > old_year:
-                labels.append(str(new_year))
-                old_year = new_year
-            else:
-                labels.append(raw_labels[i][2] + "/" + months[new_month - 1])
-            ticks.append(i)
-    return ticks, labels
+    ticks, years, months, days = _date_parts(dates, len(df), seperator,
+                                             step)
 
+    # The year is labeled when it is later than at the last year label,
+    # which is the latest year seen so far
+    old_year = np.maximum.accumulate(years)[:-1]
+    years, months, days = years[1:], months[1:], days[1:]
 
-def daily_labels(df, dates, seperator="-", step=5):
-    """Get labels and ticks appropriate for weekly plot.
+    # Look day/month labels up in a table of the few distinct ones
+    codes, unique_days = pd.factorize(days)
+    table = np.array([day + "/" + month for day in unique_days
+                      for month in _MONTHS], dtype=object)
+    labels = table[codes * 12 + months - 1]
+    year_label = years > old_year
+    labels[year_label] = years[year_label].astype(str)
+    return ticks.tolist(), labels.tolist()
 
-    :param df: Input data frame
+
+def daily_labels(df, dates, seperator="-", step=5):
+    """Get labels and ticks appropriate for daily plot.
+
+    Every ``step``-th row gets a tick. Ticks are labeled with the year when
+    a new year starts, with the month when a new month other than January
+    starts, and with the day otherwise. A year or month label is never
+    followed directly by another one.
+
+    :param df: Input data frame, indexed by datetimes or strings like
+     "2020-01-31"
+    :param dates: Not used, the dates are taken from the index of ``df``
+    :param seperator: Seperator of year, month and day in string dates
+    :param step: Number of rows between ticks
     :type df: ``pandas.DataFrame()`` [``float``]
+    :type seperator: ``str``
+    :type step: ``int``
     :returns: ticks and labels
     :rtype ticks: ``list`` [``int``]
-    :rtype labels: ``list`` [``int``]
+    :rtype labels: ``list`` [``str``]
     """
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-              "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    raw_labels = [df.index[i].split(seperator) for i in range(len(df))]
-    labels = []
-    ticks = []
-    old_year = int(raw_labels[0][0])
-    old_month = int(raw_labels[0][1])
-    major_previous_tick = False
-    for i in range(len(raw_labels)):
-        if (i + 1) % step == 0:
-            new_year = int(raw_labels[i][0])
-            new_month = int(raw_labels[i][1])
-            if new_year > old_year and not major_previous_tick:
-                labels.append(str(new_year))
-                old_year = new_year
-                major_previous_tick = True
-            elif new_month != old_month and not major_previous_tick and \
-                    new_month != 1:
-                labels.append(months[new_month - 1])
-                old_month = new_month
-                major_previous_tick = True
-            else:
-                labels.append(raw_labels[i][2])
-                major_previous_tick = False
-            ticks.append(i)
-    return ticks, labels
+    ticks, years, months, days = _date_parts(df.index, len(df), seperator,
+                                             step)
+    labels = days[1:].astype(object)
+
+    # Only ticks labeled with a year or a month change the labeling state,
+    # so skip ahead from one such tick to the next
+    old_year = years[0]
+    old_month = months[0]
+    years = years[1:]
+    months = months[1:]
+    k = _next_major(years, months, 0, old_year, old_month)
+    while k is not None:
+        if years[k] > old_year:
+            labels[k] = str(years[k])
+            old_year = years[k]
+        else:
+            labels[k] = _MONTHS[months[k] - 1]
+            old_month = months[k]
+        k = _next_major(years, months, k + 2, old_year, old_month)
+    return ticks.tolist(), labels.tolist()
@@ -0,0 +1,288 @@
+"""Resampling of ohlcv data, and alignment of higher timeframe indicators.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+from .streaming import update_all
+
+_AGGREGATIONS = {"open": "first",
+                 "high": "max",
+                 "low": "min",
+                 "close": "last",
+                 "volume": "sum"
+                 }
+
+
+def period_starts(index, rule):
+    """Get the start of the period each timestamp falls in.
+
+    Fixed periods, like "h" or "15min", are counted from midnight, and
+    calendar periods, like "W" or "M", follow pandas periods, e.g. weeks
+    run from Monday to Sunday.
+
+    :param index: Timestamps
+    :param rule: Period, as a pandas frequency string
+    :type index: ``pandas.DatetimeIndex``
+    :type rule: ``str``
+    :returns: Start of period for each timestamp
+    :rtype: ``pandas.DatetimeIndex``
+    """
+    index = pd.DatetimeIndex(index)
+    try:
+        return index.floor(rule)
+    except ValueError:
+        # Calendar periods, like weeks and months, have no fixed length
+        return index.to_period(rule).start_time
+
+
+def _columns(df, columns):
+    """Pick the ohlcv column names that are present in a data frame."""
+    cols = dict(zip(_AGGREGATIONS, _AGGREGATIONS))
+    if columns is not None:
+        cols.update(columns)
+    return {key: name for key, name in cols.items() if name in df.columns}
+
+
+def resample_ohlcv(df, rule, columns=None):
+    """Aggregate ohlcv bars into bars of a higher timeframe.
+
+    Each bar keeps the first open, the highest high, the lowest low, the
+    last close and the summed volume of its period, and is labeled with the
+    start of the period, see :func:`period_starts`. Periods without bars
+    are left out.
+
+    :param df: Input data frame, with a ``DatetimeIndex``
+    :param rule: Period of output bars, e.g. "W", "M" or "h"
+    :param columns: Dictionary of appropriate column names, like in
+     :func:`gander.plotting.candles`, optionally with a "volume" key
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type rule: ``str``
+    :type columns: ``dict`` [``str``]
+    :returns: Higher timeframe bars
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    cols = _columns(df, columns)
+    starts = period_starts(df.index, rule)
+    out = df.groupby(starts).agg({name: _AGGREGATIONS[key]
+                                  for key, name in cols.items()})
+    out.index.name = df.index.name
+    return out
+
+
+def align(higher, index, rule):
+    """Map higher timeframe values onto a lower timeframe index.
+
+    Each lower timeframe bar gets the values of the last higher timeframe
+    bar that was complete when its period started, so there is no
+    lookahead: a daily bar on a Wednesday sees last week's weekly ema, not
+    this week's.
+
+    .. code-block:: python
+
+      weekly = resample_ohlcv(daily, "W")
+      weekly = gi.calc_ema(weekly, weekly["close"], "ema13w", window=13)
+      daily["ema13w"] = align(weekly["ema13w"], daily.index, "W")
+
+    :param higher: Higher timeframe data, indexed by period start like the
+     output of :func:`resample_ohlcv`
+    :param index: Lower timeframe index
+    :param rule: Period of ``higher``
+    :type higher: ``pandas.DataFrame()`` or ``pandas.Series()``
+    :type index: ``pandas.DatetimeIndex``
+    :type rule: ``str``
+    :returns: Higher timeframe values for each lower timeframe bar
+    :rtype: ``pandas.DataFrame()`` or ``pandas.Series()``
+    """
+    starts = period_starts(index, rule)
+    position = higher.index.searchsorted(starts, side="left") - 1
+    out = higher.iloc[np.maximum(position, 0)]
+    out.index = index
+    return out.where(pd.Series(position >= 0, index=index), axis=0)
+
+
+class Resampler:
+    """Resample ohlcv bars incrementally, as new bars arrive.
+
+    The last higher timeframe bar is partial until a bar from a later period
+    arrives. New bars only update the partial bar, or add bars after it, so
+    there is no full recompute.
+
+    .. code-block:: python
+
+      weekly = Resampler("W")
+      for bar in feed:
+          changed = weekly.update(bar)
+
+    :param rule: Period of output bars, e.g. "W", "M" or "h"
+    :param columns: Dictionary of appropriate column names, like in
+     :func:`resample_ohlcv`
+    :type rule: ``str``
+    :type columns: ``dict`` [``str``]
+    """
+
+    def __init__(self, rule, columns=None):
+        self.rule = rule
+        self.columns = columns
+        self._cols = None
+        self._starts = []
+        self._rows = []
+
+    def update(self, new_bars):
+        """Add lower timeframe bars.
+
+        :param new_bars: New bars, later than all bars seen so far
+        :type new_bars: ``pandas.DataFrame()`` [``float``]
+        :returns: Higher timeframe bars that were changed or added. The
+         last one is partial
+        :rtype: ``pandas.DataFrame()`` [``float``]
+        """
+        if self._cols is None:
+            self._cols = _columns(new_bars, self.columns)
+        chunk = resample_ohlcv(new_bars, self.rule, self.columns)
+        rows = chunk.to_numpy(dtype=float)
+        starts = list(chunk.index)
+        if self._starts and starts:
+            if starts[0] < self._starts[-1]:
+                raise ValueError("Bars must arrive in time order")
+            if starts[0] == self._starts[-1]:
+                keys = list(self._cols)
+                merged = _merge_bar(dict(zip(keys, self._rows.pop())),
+                                    dict(zip(keys, rows[0])))
+                rows[0] = [merged[key] for key in keys]
+                self._starts.pop()
+        first = len(self._starts)
+        self._starts.extend(starts)
+        self._rows.extend(rows)
+        return self._frame(first)
+
+    @property
+    def bars(self):
+        """All higher timeframe bars so far. The last one is partial.
+
+        :rtype: ``pandas.DataFrame()`` [``float``]
+        """
+        return self._frame(0)
+
+    def _frame(self, first):
+        names = [] if self._cols is None else list(self._cols.values())
+        rows = self._rows[first:]
+        return pd.DataFrame(np.array(rows).reshape(len(rows), len(names)),
+                            index=pd.DatetimeIndex(self._starts[first:]),
+                            columns=names)
+
+
+class HigherTimeframe:
+    """Higher timeframe indicators, updated with each lower timeframe bar.
+
+    Lower timeframe bars are resampled into higher timeframe bars, and fed
+    to streaming indicators from :mod:`gander.streaming`. Indicator states
+    are kept at the end of the last complete period, so each new bar only
+    costs one update of each indicator, not a recompute.
+
+    .. code-block:: python
+
+      weekly = HigherTimeframe("W", {"ema13w": (Ema(13), ["close"]),
+                                     ("fast", "signal", "macd-h"):
+                                     (Macd(12, 26, 9), ["close"])})
+      for bar in feed:
+          values = weekly.update(bar)
+
+    :param rule: Period of higher timeframe, e.g. "W", "M" or "h"
+    :param indicators: Output name, or tuple of names for indicators with
+     several values, mapped to a streaming indicator and the names of its
+     inputs. Inputs are "open", "high", "low", "close", "volume", or
+     outputs of indicators listed earlier
+    :param partial: Include the partial period, i.e. calculate indicators as
+     if the current higher timeframe bar closed now. Default is to use the
+     last complete period only, like :func:`align`
+    :param columns: Dictionary of appropriate column names, like in
+     :func:`resample_ohlcv`
+    :type rule: ``str``
+    :type indicators: ``dict``
+    :type partial: ``bool``
+    :type columns: ``dict`` [``str``]
+    """
+
+    def __init__(self, rule, indicators, partial=False, columns=None):
+        self.rule = rule
+        self.partial = partial
+        self.columns = columns
+        self._outputs = []
+        for names in indicators:
+            self._outputs += [names] if isinstance(names, str) else \
+                list(names)
+        self._complete = dict(indicators)
+        self._current = self._complete
+        self._values = {name: np.nan for name in self._outputs}
+        self._last_values = dict(self._values)
+        self._start = None
+        self._bar = None
+
+    def update(self, new_bars):
+        """Add lower timeframe bars, and get indicator values for each.
+
+        :param new_bars: New bars, later than all bars seen so far
+        :type new_bars: ``pandas.DataFrame()`` [``float``]
+        :returns: Higher timeframe indicator values known at each new bar
+        :rtype: ``pandas.DataFrame()``
+        """
+        cols = _columns(new_bars, self.columns)
+        starts = period_starts(new_bars.index, self.rule)
+        fields = list(cols)
+        values = new_bars[list(cols.values())].to_numpy(dtype=float)
+
+        out = []
+        for start, row in zip(starts, values):
+            bar = dict(zip(fields, row))
+            if self._start is not None and start < self._start:
+                raise ValueError("Bars must arrive in time order")
+            if start != self._start:
+                # The previous period is complete
+                self._complete = self._current
+                self._last_values = self._values
+                self._start = start
+                self._bar = bar
+            else:
+                self._bar = _merge_bar(self._bar, bar)
+            self._current = copy.deepcopy(self._complete)
+            self._values = self._evaluate(self._current, self._bar)
+            out.append(self._values if self.partial else self._last_values)
+        return pd.DataFrame(out, index=new_bars.index, columns=self._outputs)
+
+    def _evaluate(self, indicators, bar):
+        """Update indicators with a higher timeframe bar."""
+        values = update_all(indicators, bar)
+        return {name: values[name] for name in self._outputs}
+
+
+def _merge_bar(old, new):
+    """Merge a lower timeframe bar into a partial higher timeframe bar."""
+    merged = dict(new)
+    if "open" in old and not np.isnan(old["open"]):
+        merged["open"] = old["open"]
+    for key, combine in [("high", np.fmax), ("low", np.fmin)]:
+        if key in old:
+            merged[key] = combine(old[key], new[key])
+    if "close" in old and np.isnan(new["close"]):
+        merged["close"] = old["close"]
+    if "volume" in old:
+        merged["volume"] = old["volume"] + new["volume"]
+    return merged
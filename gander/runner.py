@@ -0,0 +1,184 @@
+"""Run indicator calculations for many symbols over a process pool.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import pandas as pd
+
+Result = namedtuple("Result", ["symbol", "data", "error"])
+Result.__doc__ = """Indicator columns, or the error raised, for one symbol."""
+
+
+class Column:
+    """Reference to a data frame column in an indicator call.
+
+    Functions like :func:`gander.indicators.calc_ema` take data frame columns
+    as arguments. Since the data frame only exists inside the worker,
+    ``Column("close")`` stands in for ``df["close"]`` in the call.
+
+    :param name: Name of data frame column
+    :type name: ``str``
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "Column(%r)" % self.name
+
+
+def _resolve(df, arg):
+    """Replace a ``Column`` with the data frame column it refers to."""
+    return df[arg.name] if isinstance(arg, Column) else arg
+
+
+def apply_calls(df, calls):
+    """Apply indicator calls to a data frame, one after another.
+
+    :param df: Input data frame
+    :param calls: Indicator calls on the form ``(function, args, kwargs)``,
+     where the data frame is passed as first argument to ``function``
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type calls: ``list`` [``tuple``]
+    :returns: Output data frame of the last call
+    :rtype: ``pandas.DataFrame()`` [``float``]
+    """
+    for func, args, kwargs in calls:
+        args = [_resolve(df, arg) for arg in args]
+        kwargs = {key: _resolve(df, arg) for key, arg in kwargs.items()}
+        df = func(df, *args, **kwargs)
+    return df
+
+
+def _run_chunk(chunk, calls):
+    """Calculate indicators for a chunk of symbols inside a worker.
+
+    Data frames are sent in and out as plain arrays, and only the columns
+    added by ``calls`` are sent back.
+    """
+    out = []
+    for symbol, index, columns, values in chunk:
+        if columns is None:
+            # Picking columns failed before sending, values holds the error
+            out.append((None, None, values))
+            continue
+        try:
+            df = pd.DataFrame(values, index=index, columns=columns)
+            df = apply_calls(df, calls)
+            new_index = None if df.index.equals(index) else df.index
+            new_columns = {column: df[column].to_numpy()
+                           for column in df.columns if column not in columns}
+            out.append((new_index, new_columns, None))
+        except Exception as error:
+            out.append((None, None, error))
+    return out
+
+
+def _pack(items, columns):
+    """Strip data frames down to index, column names and values."""
+    for symbol, df in items:
+        try:
+            data = df if columns is None else df[columns]
+        except KeyError as error:
+            yield symbol, None, None, error
+            continue
+        yield symbol, data.index, list(data.columns), data.to_numpy()
+
+
+def run_universe(items, calls, max_workers=None, chunksize=16, columns=None):
+    """Calculate indicators for many symbols over a process pool.
+
+    Symbols are sent to the workers in chunks of ``chunksize``, and at most
+    two chunks per worker are in flight at once, so ``items`` may be a lazy
+    iterator over a universe that does not fit in memory. Results are
+    yielded in the same order as ``items``.
+
+    .. code-block:: python
+
+      calls = [(gi.calc_ema, [Column("close"), "ema13"], {"window": 13}),
+               (gi.calc_force, ["close", "volume"], {})]
+      for result in run_universe(frames.items(), calls):
+          if result.error is None:
+              print(result.symbol, result.data["force"].iloc[-1])
+
+    :param items: Pairs of symbol name and ohlcv data frame
+    :param calls: Indicator calls on the form ``(function, args, kwargs)``.
+     Use :class:`Column` for arguments that are data frame columns.
+     Functions must be importable by the workers, i.e. not lambdas.
+    :param max_workers: Number of worker processes. Default is the number of
+     cpus, and 0 runs everything in the current process
+    :param chunksize: Number of symbols sent to a worker at a time
+    :param columns: Columns to send to the workers. Default is all columns
+    :type items: ``iterable`` [``tuple`` [``str``, ``pandas.DataFrame()``]]
+    :type calls: ``list`` [``tuple``]
+    :type max_workers: ``int``
+    :type chunksize: ``int``
+    :type columns: ``list`` [``str``]
+    :returns: Added indicator columns, or the error raised, for each symbol
+    :rtype: ``iterator`` [:class:`Result`]
+    """
+    packed = _pack(items, columns)
+    for chunk, results in _map_chunks(_run_chunk, packed, (calls,),
+                                      max_workers, chunksize):
+        yield from _unpack(chunk, results)
+
+
+def _map_chunks(func, items, args, max_workers, chunksize, initializer=None,
+                initargs=()):
+    """Apply ``func(chunk, *args)`` to chunks of items over a process pool.
+
+    At most two chunks per worker are in flight at once, and chunks are
+    yielded with their results in the same order as ``items``. With
+    ``max_workers=0``, everything runs in the current process.
+    """
+    chunks = iter(lambda: list(islice(items, chunksize)), [])
+
+    if max_workers == 0:
+        if initializer is not None:
+            initializer(*initargs)
+        for chunk in chunks:
+            yield chunk, func(chunk, *args)
+        return
+
+    max_workers = max_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(func, chunk, *args)))
+            if len(pending) >= 2 * max_workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def _unpack(chunk, results):
+    """Turn worker output back into data frames."""
+    for (symbol, index, _, _), (new_index, new_columns, error) in \
+            zip(chunk, results):
+        if error is not None:
+            yield Result(symbol, None, error)
+        else:
+            index = index if new_index is None else new_index
+            yield Result(symbol, pd.DataFrame(new_columns, index=index), None)
@@ -0,0 +1,172 @@
+"""Screen many symbols for new indicator signals.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import numpy as np
+import pandas as pd
+from .graph import IndicatorGraph
+from .panel import panel_fields, panel_ema, panel_macd, panel_stoch, \
+    panel_force, panel_impulse
+
+SIGNALS = ["impulse", "macd", "force", "stoch"]
+
+MATCH_COLUMNS = ["symbol", "time", "signal", "value", "previous"]
+
+
+def _spec(signals, ema_window, macd, stoch):
+    """Get the indicator spec of the signals, for its lookback."""
+    terms = []
+    if "impulse" in signals or "macd" in signals:
+        terms.append("macd(%d, %d, %d)" % tuple(macd))
+    if "impulse" in signals:
+        terms += ["ema%d" % ema_window, "impulse(ema%d, macd-h)" % ema_window]
+    if "stoch" in signals:
+        terms.append("stoch(%d, %d)" % tuple(stoch))
+    if "force" in signals:
+        terms.append("force")
+    return ", ".join(terms)
+
+
+def _crosses(name, values, level, bars):
+    """Find crossings of ``level`` in the last ``bars`` rows of ``values``.
+
+    :returns: Name, mask, values and previous values of upward and downward
+     crossings
+    :rtype: ``list`` [``tuple``]
+    """
+    before, after = values[-bars - 1:-1], values[-bars:]
+    with np.errstate(invalid="ignore"):
+        up = (before <= level) & (after > level)
+        down = (before >= level) & (after < level)
+    return [(name + "_up", up, after, before),
+            (name + "_down", down, after, before)]
+
+
+def _exits(name, values, low, high, bars):
+    """Find exits from below ``low`` and above ``high`` in the last rows.
+
+    :returns: Name, mask, values and previous values of the exits
+    :rtype: ``list`` [``tuple``]
+    """
+    before, after = values[-bars - 1:-1], values[-bars:]
+    with np.errstate(invalid="ignore"):
+        from_low = (before < low) & (after >= low)
+        from_high = (before > high) & (after <= high)
+    return [(name + "_exit_low", from_low, after, before),
+            (name + "_exit_high", from_high, after, before)]
+
+
+def screen(prices, bars=1, ema_window=13, macd=(12, 26, 9), stoch=(15, 4),
+           bands=(20, 80), signals=None, tol=1e-6):
+    """Find new indicator signals of all symbols in the last bars.
+
+    Indicators are calculated with the panel functions, see
+    :mod:`gander.panel`, for all symbols at once, and only on the last
+    ``bars`` rows and the rows before them given by
+    :meth:`gander.graph.IndicatorGraph.lookback`. Ema based values are
+    therefore within about ``tol`` times the price spread of their full
+    history values. Each of the last ``bars`` rows is compared with the row
+    before it, and the signals are:
+
+    * "impulse": the impulse color changed, values are colors
+    * "macd_up", "macd_down": the MACD fast line crossed the signal line,
+      values are the MACD histogram
+    * "force_up", "force_down": the force index crossed zero
+    * "stoch_exit_low", "stoch_exit_high": stochastic %D left the band
+      below ``bands[0]``, or above ``bands[1]``
+
+    .. code-block:: python
+
+      matches = screen(panel_fields(df, ["open", "high", "low", "close",
+                                         "volume"]), bars=3)
+      print(matches[matches["signal"] == "impulse"])
+
+    :param prices: Wide data frames of "open", "high", "low", "close" and
+     "volume", as given by :func:`gander.panel.panel_fields`, or a multi
+     symbol data frame to pass to it
+    :param bars: Number of most recent bars to look for signals in
+    :param ema_window: Window of the impulse system ema
+    :param macd: Short ema, long ema and signal line windows of MACD
+    :param stoch: Stochastic window and ema window of stochastic
+    :param bands: Lower and upper stochastic band
+    :param signals: Signals to look for, out of "impulse", "macd", "force"
+     and "stoch". Default is all
+    :param tol: Tolerance of ema based indicators
+    :type prices: ``dict`` [``pandas.DataFrame()`` [``float``]]
+    :type bars: ``int``
+    :type ema_window: ``int``
+    :type macd: ``tuple`` [``int``]
+    :type stoch: ``tuple`` [``int``]
+    :type bands: ``tuple`` [``float``]
+    :type signals: ``list`` [``str``]
+    :type tol: ``float``
+    :returns: One row per match, with symbol, time, signal, and the value
+     that triggered it and the value the bar before, ordered by time and
+     symbol
+    :rtype: ``pandas.DataFrame()``
+    """
+    signals = SIGNALS if signals is None else list(signals)
+    unknown = set(signals) - set(SIGNALS)
+    if unknown:
+        raise ValueError("Unknown signals: %s" % ", ".join(sorted(unknown)))
+    fields = prices if isinstance(prices, dict) else panel_fields(prices)
+    m = len(fields["close"])
+    lookback = IndicatorGraph(_spec(signals, ema_window, macd,
+                                    stoch)).lookback(tol)
+    rows = m if lookback is None else min(m, lookback + bars + 1)
+    bars = min(bars, rows - 1)
+    if bars < 1:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+    tail = {name: field.iloc[m - rows:] for name, field in fields.items()}
+    close = tail["close"]
+
+    checks = []
+    if "impulse" in signals or "macd" in signals:
+        short, long, window = macd
+        lines = panel_macd(panel_ema(close, short), panel_ema(close, long),
+                           window)
+    if "impulse" in signals:
+        colors = panel_impulse(panel_ema(close, ema_window),
+                               lines["macd-h"]).to_numpy()
+        before, after = colors[-bars - 1:-1], colors[-bars:]
+        flips = pd.notna(before) & pd.notna(after) & (before != after)
+        checks.append(("impulse", flips, after, before))
+    if "macd" in signals:
+        checks += _crosses("macd", lines["macd-h"].to_numpy(), 0, bars)
+    if "force" in signals:
+        checks += _crosses("force",
+                           panel_force(close, tail["volume"]).to_numpy(), 0,
+                           bars)
+    if "stoch" in signals:
+        d = panel_stoch(tail["open"], tail["high"], tail["low"], close,
+                        *stoch)["%D"]
+        checks += _exits("stoch", d.to_numpy(), bands[0], bands[1], bars)
+
+    times = close.index[-bars:]
+    found = {name: [] for name in MATCH_COLUMNS}
+    for name, mask, values, previous in checks:
+        row, column = np.nonzero(mask)
+        found["symbol"] += list(close.columns[column])
+        found["time"] += list(times[row])
+        found["signal"] += [name] * len(row)
+        found["value"] += list(values[row, column])
+        found["previous"] += list(previous[row, column])
+    matches = pd.DataFrame(found, columns=MATCH_COLUMNS)
+    return matches.sort_values(["time", "symbol"],
+                               kind="stable").reset_index(drop=True)
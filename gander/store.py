@@ -0,0 +1,273 @@
+"""On-disk columnar store of ohlcv data, read through memory maps.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from .graph import IndicatorGraph
+from .runner import apply_calls
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+class OhlcvStore:
+    """Columnar store of ohlcv bars, one directory per symbol.
+
+    Each column is a flat file of float64 values, and the index a flat file
+    of int64 nanosecond timestamps, so any time slice is read through memory
+    maps without loading the rest of the history.
+
+    .. code-block:: python
+
+      store = OhlcvStore("data/minute")
+      store.append("AAPL", new_bars)
+      df = store.compute("AAPL", "ema13, macd(12, 26, 9)",
+                         start="2020-03-01", end="2020-03-31")
+
+    :param directory: Directory of the store, created if missing
+    :param columns: Columns to store
+    :type directory: ``str``
+    :type columns: ``list`` [``str``]
+    """
+
+    def __init__(self, directory, columns=None):
+        self.directory = directory
+        self.columns = list(columns) if columns is not None else COLUMNS
+        self._maps = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def symbols(self):
+        """Get the symbols in the store.
+
+        :rtype: ``list`` [``str``]
+        """
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isfile(self._path(name, "meta.json")))
+
+    def __contains__(self, symbol):
+        return os.path.isfile(self._path(symbol, "meta.json"))
+
+    def length(self, symbol):
+        """Get the number of bars stored for a symbol.
+
+        :param symbol: Symbol name
+        :type symbol: ``str``
+        :rtype: ``int``
+        """
+        return os.path.getsize(self._path(symbol, "index.i8")) // 8
+
+    def write(self, symbol, df):
+        """Store bars for a symbol, replacing any bars stored before.
+
+        :param symbol: Symbol name
+        :param df: Bars, with a ``DatetimeIndex`` in time order
+        :type symbol: ``str``
+        :type df: ``pandas.DataFrame()`` [``float``]
+        """
+        index, values = _prepare(df, self.columns)
+        os.makedirs(self._path(symbol), exist_ok=True)
+        self._maps.pop(symbol, None)
+        for name in ["index"] + self.columns:
+            open(self._file(symbol, name), "wb").close()
+        with open(self._path(symbol, "meta.json"), "w") as f:
+            json.dump({"columns": self.columns}, f)
+        self._extend(symbol, index, values)
+
+    def append(self, symbol, df):
+        """Add bars after the bars stored for a symbol.
+
+        :param symbol: Symbol name
+        :param df: Bars, with a ``DatetimeIndex`` in time order, all later
+         than the stored bars
+        :type symbol: ``str``
+        :type df: ``pandas.DataFrame()`` [``float``]
+        """
+        if symbol not in self:
+            return self.write(symbol, df)
+        stored, columns = self._open(symbol)
+        index, values = _prepare(df, list(columns))
+        if len(stored) and len(index) and index[0] <= stored[-1]:
+            raise ValueError("Bars must be later than the stored bars")
+        self._extend(symbol, index, values)
+
+    def _extend(self, symbol, index, values):
+        """Add checked bars to the files of a symbol.
+
+        The index is written last, since its length is the number of bars
+        stored. If any write fails, all files are cut back to the bars
+        stored before.
+        """
+        self._maps.pop(symbol, None)
+        m = self.length(symbol)
+        try:
+            for name, column in values.items():
+                with open(self._file(symbol, name), "ab") as f:
+                    column.tofile(f)
+            with open(self._file(symbol, "index"), "ab") as f:
+                index.tofile(f)
+        except BaseException:
+            for name in list(values) + ["index"]:
+                os.truncate(self._file(symbol, name), 8 * m)
+            raise
+
+    def arrays(self, symbol, start=None, end=None, lookback=0):
+        """Get memory mapped views of a time slice, without copying.
+
+        :param symbol: Symbol name
+        :param start: First time to include. Default is the first bar
+        :param end: Last time to include. Default is the last bar
+        :param lookback: Number of bars before ``start`` to include
+        :type symbol: ``str``
+        :type start: ``str`` or ``pandas.Timestamp``
+        :type end: ``str`` or ``pandas.Timestamp``
+        :type lookback: ``int``
+        :returns: Index as int64 nanoseconds, and values of each column
+        :rtype: ``tuple`` [``numpy.ndarray``, ``dict`` [``numpy.ndarray``]]
+        """
+        index, columns = self._open(symbol)
+        first, stop = self._bounds(index, start, end)
+        first = max(first - lookback, 0)
+        return index[first:stop], {name: values[first:stop]
+                                   for name, values in columns.items()}
+
+    def read(self, symbol, start=None, end=None, lookback=0):
+        """Read a time slice into a data frame.
+
+        Only the slice, and ``lookback`` bars before it, are read from disk.
+
+        :param symbol: Symbol name
+        :param start: First time to include. Default is the first bar
+        :param end: Last time to include. Default is the last bar
+        :param lookback: Number of bars before ``start`` to include
+        :type symbol: ``str``
+        :type start: ``str`` or ``pandas.Timestamp``
+        :type end: ``str`` or ``pandas.Timestamp``
+        :type lookback: ``int``
+        :returns: Bars
+        :rtype: ``pandas.DataFrame()`` [``float``]
+        """
+        index, columns = self.arrays(symbol, start, end, lookback)
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(index))
+
+    def compute(self, symbol, indicators, start=None, end=None,
+                lookback=None, tol=1e-6):
+        """Calculate indicators over a time slice.
+
+        Indicators are calculated over the slice and ``lookback`` bars
+        before it, and the lookback bars are dropped from the output. With
+        a long enough lookback, results match a calculation over the full
+        history, e.g. ``window - 1`` bars are enough for an sma. For a spec,
+        the default lookback is the one needed to match within ``tol``, see
+        :meth:`gander.graph.IndicatorGraph.lookback`.
+
+        :param symbol: Symbol name
+        :param indicators: Indicator spec, see
+         :class:`gander.graph.IndicatorGraph`, or indicator calls, see
+         :func:`gander.runner.apply_calls`
+        :param start: First time to include. Default is the first bar
+        :param end: Last time to include. Default is the last bar
+        :param lookback: Number of bars before ``start`` to warm up the
+         indicators with. Default is found from a spec, and 0 for calls
+        :param tol: Tolerance of ema based indicators, for the default
+         lookback
+        :type symbol: ``str``
+        :type indicators: ``str`` or ``list`` [``tuple``]
+        :type start: ``str`` or ``pandas.Timestamp``
+        :type end: ``str`` or ``pandas.Timestamp``
+        :type lookback: ``int``
+        :type tol: ``float``
+        :returns: Bars and indicators of the slice
+        :rtype: ``pandas.DataFrame()`` [``float``]
+        """
+        first, _ = self._bounds(self._open(symbol)[0], start, end)
+        graph = None
+        if isinstance(indicators, str):
+            graph = IndicatorGraph(indicators)
+            if lookback is None:
+                lookback = graph.lookback(tol)
+                lookback = first if lookback is None else lookback
+        lookback = 0 if lookback is None else lookback
+        warmup = min(lookback, first)
+        df = self.read(symbol, start, end, lookback)
+        if graph is not None:
+            df = graph.compute(df)
+        else:
+            df = apply_calls(df, indicators)
+        return df.iloc[warmup:]
+
+    def _path(self, symbol, *names):
+        if os.sep in symbol or symbol in ("", ".", ".."):
+            raise ValueError("Invalid symbol name: %r" % symbol)
+        return os.path.join(self.directory, symbol, *names)
+
+    def _file(self, symbol, name):
+        return self._path(symbol, name + (".i8" if name == "index"
+                                          else ".f8"))
+
+    def _open(self, symbol):
+        """Memory map the files of a symbol, reusing maps while unchanged."""
+        if symbol not in self:
+            raise KeyError(symbol)
+        m = self.length(symbol)
+        if symbol in self._maps and len(self._maps[symbol][0]) == m:
+            return self._maps[symbol]
+        with open(self._path(symbol, "meta.json")) as f:
+            columns = json.load(f)["columns"]
+        maps = (_memmap(self._file(symbol, "index"), "<i8", m),
+                {name: _memmap(self._file(symbol, name), "<f8", m)
+                 for name in columns})
+        self._maps[symbol] = maps
+        return maps
+
+    @staticmethod
+    def _bounds(index, start, end):
+        """Find the positions of a time slice in a sorted index."""
+        first = 0 if start is None else \
+            int(np.searchsorted(index, pd.Timestamp(start).value, "left"))
+        stop = len(index) if end is None else \
+            int(np.searchsorted(index, pd.Timestamp(end).value, "right"))
+        return first, max(stop, first)
+
+
+def _prepare(df, columns):
+    """Check bars and convert them to the types of the files.
+
+    :param df: Bars, with a ``DatetimeIndex`` in time order
+    :param columns: Columns to store
+    :type df: ``pandas.DataFrame()`` [``float``]
+    :type columns: ``list`` [``str``]
+    :returns: Index as int64 nanoseconds, and float64 values of each column
+    :rtype: ``tuple`` [``numpy.ndarray``, ``dict`` [``numpy.ndarray``]]
+    """
+    missing = [name for name in columns if name not in df.columns]
+    if missing:
+        raise KeyError("Bars are missing columns: %s" % ", ".join(missing))
+    index = pd.DatetimeIndex(df.index).asi8.astype("<i8")
+    if np.any(np.diff(index) <= 0):
+        raise ValueError("Bars must be in time order")
+    return index, {name: df[name].to_numpy(dtype="<f8") for name in columns}
+
+
+def _memmap(path, dtype, m):
+    """Memory map a flat file read only, or give an empty array."""
+    if m == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(m,))
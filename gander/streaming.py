@@ -0,0 +1,380 @@
+"""Streaming counterparts of the indicators in gander.indicators.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from collections import deque
+import math
+
+nan = float("nan")
+
+
+def _divide(numerator, denominator):
+    """Divide floats the way numpy does, without raising on zero.
+
+    :param numerator: Numerator
+    :param denominator: Denominator
+    :type numerator: ``float``
+    :type denominator: ``float``
+    :rtype: ``float``
+    """
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return nan
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+class _RollingExtreme:
+    """Rolling maximum or minimum in O(1) amortized time per data point.
+
+    :param window: Number of data points in the rolling window
+    :param maximum: Track the maximum if ``True``, else the minimum
+    :type window: ``int``
+    :type maximum: ``bool``
+    """
+
+    def __init__(self, window, maximum=True):
+        self.window = window
+        self.maximum = maximum
+        self._count = 0
+        self._candidates = deque()
+        self._nans = deque()
+
+    def update(self, value):
+        """Add a data point and return the extreme of the current window.
+
+        :param value: New data point
+        :type value: ``float``
+        :returns: Extreme value, NaN until the window is full or while it
+         contains NaN values
+        :rtype: ``float``
+        """
+        i = self._count
+        self._count += 1
+        if math.isnan(value):
+            self._nans.append(i)
+        else:
+            while self._candidates and (
+                    self._candidates[-1][1] <= value if self.maximum
+                    else self._candidates[-1][1] >= value):
+                self._candidates.pop()
+            self._candidates.append((i, value))
+
+        oldest = i - self.window + 1
+        while self._candidates and self._candidates[0][0] < oldest:
+            self._candidates.popleft()
+        while self._nans and self._nans[0] < oldest:
+            self._nans.popleft()
+
+        if oldest < 0 or self._nans:
+            return nan
+        return self._candidates[0][1]
+
+
+class Sma:
+    """Simple moving average, one data point at a time.
+
+    Streaming version of :func:`gander.indicators.calc_sma`.
+
+    :param window: Number of data points to use in moving average
+    :type window: ``int``
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.value = nan
+        self._values = deque()
+        self._sum = 0.0
+        self._compensation = 0.0
+        self._nans = 0
+
+    def _add(self, value):
+        """Add to the running sum, with Neumaier compensated summation.
+
+        The rounding error of each addition is kept in ``_compensation``, so
+        the sum does not drift from the window sum over long streams.
+        """
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._compensation += (self._sum - total) + value
+        else:
+            self._compensation += (value - total) + self._sum
+        self._sum = total
+
+    def update(self, price):
+        """Add a data point and return the updated sma.
+
+        :param price: New data point
+        :type price: ``float``
+        :returns: sma, NaN until ``window`` data points have been seen or
+         while the window contains NaN values
+        :rtype: ``float``
+        """
+        self._values.append(price)
+        if math.isnan(price):
+            self._nans += 1
+        else:
+            self._add(price)
+
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nans -= 1
+            else:
+                self._add(-old)
+
+        if len(self._values) < self.window or self._nans:
+            self.value = nan
+        else:
+            self.value = (self._sum + self._compensation) / self.window
+        return self.value
+
+
+class Ema:
+    """Exponential moving average, one data point at a time.
+
+    Streaming version of :func:`gander.indicators.calc_ema`. The ema is
+    seeded with the mean of the first ``window`` data points, and NaN data
+    points are skipped, just like ``calc_ema`` drops them.
+
+    :param window: Number of data points to use in average
+    :param custom_a: Custom a for the geometric series
+    :type window: ``int``
+    :type custom_a: ``float``
+    """
+
+    def __init__(self, window=10, custom_a=None):
+        self.window = window
+        self.a = custom_a if custom_a is not None else 2 / (window)
+        self.value = nan
+        self._seed = []
+
+    def update(self, price):
+        """Add a data point and return the updated ema.
+
+        :param price: New data point
+        :type price: ``float``
+        :returns: ema, NaN until ``window`` data points have been seen and
+         for NaN data points
+        :rtype: ``float``
+        """
+        if math.isnan(price):
+            return nan
+
+        if self._seed is not None:
+            self._seed.append(price)
+            if len(self._seed) < self.window:
+                return nan
+            self.value = sum(self._seed) / self.window
+            self._seed = None
+        else:
+            self.value = self.a * price + (1 - self.a) * self.value
+        return self.value
+
+
+class Macd:
+    """MACD fast-, signal line and histogram, one data point at a time.
+
+    Streaming version of :func:`gander.indicators.calc_macd`, including the
+    short and long emas it is calculated from.
+
+    :param short_window: Number of data points in short term ema
+    :param long_window: Number of data points in long term ema
+    :param window: Number of data points in signal line ema
+    :type short_window: ``int``
+    :type long_window: ``int``
+    :type window: ``int``
+    """
+
+    def __init__(self, short_window=12, long_window=26, window=9):
+        self.ema_short = Ema(window=short_window)
+        self.ema_long = Ema(window=long_window)
+        self.ema_signal = Ema(window=window)
+        self.value = (nan, nan, nan)
+
+    def update(self, price):
+        """Add a data point and return the updated macd.
+
+        :param price: New data point, normally a close price
+        :type price: ``float``
+        :returns: fast line, signal line and histogram
+        :rtype: ``tuple`` [``float``]
+        """
+        fast = self.ema_short.update(price) - self.ema_long.update(price)
+        signal = self.ema_signal.update(fast)
+        self.value = (fast, signal, fast - signal)
+        return self.value
+
+
+class Stoch:
+    """Stochastic %K and smoothed %D lines, one bar at a time.
+
+    Streaming version of :func:`gander.indicators.calc_stoch`.
+
+    :param stoch_window: Number of data points in the stochastic, including
+     current data point.
+    :param ema_window: number data points in ema smoothing of %K, %D ---
+     including current data point
+    :type stoch_window: ``int``
+    :type ema_window: ``int``
+    """
+
+    def __init__(self, stoch_window=15, ema_window=4):
+        self._highs = _RollingExtreme(stoch_window, maximum=True)
+        self._lows = _RollingExtreme(stoch_window, maximum=False)
+        self.ema_d = Ema(window=ema_window)
+        self.ema_dd = Ema(window=ema_window)
+        self.value = (nan, nan, nan)
+
+    def update(self, open, high, low, close):
+        """Add a bar and return the updated stochastic.
+
+        :param open: Open price
+        :param high: High price
+        :param low: Low price
+        :param close: Close price
+        :type open: ``float``
+        :type high: ``float``
+        :type low: ``float``
+        :type close: ``float``
+        :returns: %K, %D and %%D
+        :rtype: ``tuple`` [``float``]
+        """
+        highs = self._highs.update(close)
+        lows = self._lows.update(min(open, high, low, close))
+        k = _divide(close - lows, highs - lows) * 100
+        d = self.ema_d.update(k)
+        self.value = (k, d, self.ema_dd.update(d))
+        return self.value
+
+
+class Force:
+    """Force index (Elder), one bar at a time.
+
+    Streaming version of :func:`gander.indicators.calc_force`.
+    """
+
+    def __init__(self):
+        self.value = nan
+        self._close = nan
+
+    def update(self, close, volume):
+        """Add a bar and return the updated force.
+
+        :param close: Close price
+        :param volume: Volume
+        :type close: ``float``
+        :type volume: ``float``
+        :returns: force, NaN for the first bar
+        :rtype: ``float``
+        """
+        self.value = (close - self._close) * volume
+        self._close = close
+        return self.value
+
+
+class TrueRange:
+    """True range, one bar at a time.
+
+    Streaming version of :func:`gander.indicators.calc_tr`.
+    """
+
+    def __init__(self):
+        self.value = nan
+        self._close = None
+
+    def update(self, high, low, close):
+        """Add a bar and return the updated true range.
+
+        :param high: High price
+        :param low: Low price
+        :param close: Close price
+        :type high: ``float``
+        :type low: ``float``
+        :type close: ``float``
+        :returns: true range, NaN for the first bar
+        :rtype: ``float``
+        """
+        if self._close is not None:
+            self.value = max([abs(high - low), abs(high - self._close),
+                              abs(low - self._close)])
+        self._close = close
+        return self.value
+
+
+class Impulse:
+    """Impulse system color (Elder), one bar at a time.
+
+    Streaming version of :func:`gander.indicators.calc_impulse`. Bars where
+    the ema or histogram is NaN are skipped, just like ``calc_impulse``
+    drops them.
+    """
+
+    def __init__(self):
+        self.value = nan
+        self._last = None
+
+    def update(self, ema, macdh):
+        """Add a bar and return the updated impulse color.
+
+        :param ema: ema value, normally ema13
+        :param macdh: MACD histogram value
+        :type ema: ``float``
+        :type macdh: ``float``
+        :returns: "green", "red" or "blue", NaN until two bars have been seen
+         and for NaN input
+        :rtype: ``str`` or ``float``
+        """
+        if math.isnan(ema) or math.isnan(macdh):
+            return nan
+
+        if self._last is not None:
+            last_ema, last_macdh = self._last
+            if ema > last_ema and macdh > last_macdh:
+                self.value = "green"
+            elif ema < last_ema and macdh < last_macdh:
+                self.value = "red"
+            else:
+                self.value = "blue"
+        self._last = (ema, macdh)
+        return self.value
+
+
+def update_all(indicators, bar):
+    """Update several streaming indicators with one bar.
+
+    :param indicators: Output name, or tuple of names for indicators with
+     several values, mapped to a streaming indicator and the names of its
+     inputs. Inputs are fields of ``bar``, or outputs of indicators listed
+     earlier
+    :param bar: Values of one bar, e.g. "open", "high", "low", "close" and
+     "volume"
+    :type indicators: ``dict``
+    :type bar: ``dict`` [``float``]
+    :returns: Fields of ``bar`` and all indicator outputs
+    :rtype: ``dict``
+    """
+    values = dict(bar)
+    for names, (indicator, inputs) in indicators.items():
+        value = indicator.update(*[values[name] for name in inputs])
+        if isinstance(names, str):
+            values[names] = value
+        else:
+            values.update(zip(names, value))
+    return values
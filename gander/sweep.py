@@ -0,0 +1,146 @@
+"""Indicators over many windows, or parameter grids, at once.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import numpy as np
+from .kernels import ema_rows, stoch_k
+
+
+def sma_sweep(values, windows):
+    """Calculate simple moving averages for many windows.
+
+    All windows are taken from one cumulative sum of the data, and give the
+    same values as :func:`gander.kernels.sma` for each window.
+
+    :param values: Input data
+    :param windows: Numbers of data points to use in moving average
+    :type values: ``numpy.ndarray`` [``float``]
+    :type windows: ``list`` [``int``]
+    :returns: One row of sma values for each window
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    values = np.asarray(values, dtype=float)
+    m = len(values)
+    out = np.full((len(windows), m), np.nan)
+    missing = np.isnan(values)
+    finite = values[~missing]
+    offset = finite[0] if len(finite) else 0.0
+    sums = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0,
+                                                     values - offset))))
+    counts = np.concatenate(([0], np.cumsum(missing)))
+    for row, window in zip(out, windows):
+        if m < window:
+            continue
+        row[window - 1:] = (sums[window:] - sums[:-window]) / window + offset
+        row[window - 1:][counts[window:] - counts[:-window] > 0] = np.nan
+    return out
+
+
+def ema_sweep(values, windows, custom_a=None):
+    """Calculate exponential moving averages for many windows.
+
+    The input is cleaned of NaN values once for all windows. Emas of short
+    series are scanned in batches of windows, while long series, where one
+    window already fills the cache, are scanned a window at a time. Each
+    row gives the same values as :func:`gander.kernels.ema`, up to rounding.
+
+    .. code-block:: python
+
+      windows = range(5, 201)
+      emas = ema_sweep(df["close"].to_numpy(), windows)
+
+    :param values: Input data
+    :param windows: Numbers of data points to use in average
+    :param custom_a: Custom a of each window, for the geometric series
+     :math:`a + ar + ar^2 + ... + ar^{n - 1}`. Default is ``2 / window``
+    :type values: ``numpy.ndarray`` [``float``]
+    :type windows: ``list`` [``int``]
+    :type custom_a: ``list`` [``float``]
+    :returns: One row of ema values for each window
+    :rtype: ``numpy.ndarray`` [``float``]
+    """
+    values = np.asarray(values, dtype=float)
+    windows = list(windows)
+    alphas = custom_a if custom_a is not None else \
+        [2 / (window) for window in windows]
+    return ema_rows(values, windows, list(alphas))
+
+
+def macd_sweep(close, grid):
+    """Calculate MACD fast-, signal line and histogram over a parameter grid.
+
+    Each distinct ema window is calculated once, and all signal lines as
+    one batch, see :func:`ema_sweep`.
+
+    .. code-block:: python
+
+      grid = [(short, long, 9) for short in range(5, 20)
+              for long in range(20, 40)]
+      fast, signal, macdh = macd_sweep(df["close"].to_numpy(), grid)
+
+    :param close: Close prices
+    :param grid: Short ema window, long ema window and signal window of
+     each MACD
+    :type close: ``numpy.ndarray`` [``float``]
+    :type grid: ``list`` [``tuple`` [``int``]]
+    :returns: fast lines, signal lines and histograms, one row for each
+     MACD
+    :rtype: ``tuple`` [``numpy.ndarray`` [``float``]]
+    """
+    grid = [tuple(params) for params in grid]
+    windows = sorted({window for short, long, _ in grid
+                      for window in (short, long)})
+    emas = dict(zip(windows, ema_sweep(close, windows)))
+    fast = np.array([emas[short] - emas[long] for short, long, _ in grid])
+    fast = fast.reshape(len(grid), len(close))
+    signal_windows = [window for _, _, window in grid]
+    signal = ema_rows(fast, signal_windows,
+                       [2 / (window) for window in signal_windows])
+    return fast, signal, fast - signal
+
+
+def stoch_sweep(close, prices, grid):
+    """Calculate stochastic %K and smoothed %D lines over a parameter grid.
+
+    Each distinct stochastic window is calculated once, and all smoothing
+    emas as batches, see :func:`ema_sweep`.
+
+    :param close: Close prices, the highest close is the top of the range
+    :param prices: Prices to take the lowest low from, one column per price,
+     e.g. open, high, low and close
+    :param grid: Stochastic window and ema window of each stochastic
+    :type close: ``numpy.ndarray`` [``float``]
+    :type prices: ``numpy.ndarray`` [``float``]
+    :type grid: ``list`` [``tuple`` [``int``]]
+    :returns: %K, %D and %%D, one row for each stochastic
+    :rtype: ``tuple`` [``numpy.ndarray`` [``float``]]
+    """
+    close = np.asarray(close, dtype=float)
+    prices = np.asarray(prices, dtype=float).reshape(len(close), -1)
+    m = len(close)
+    grid = [tuple(params) for params in grid]
+    raw = {stoch_window: stoch_k(close, prices, stoch_window)
+           for stoch_window in {window for window, _ in grid}}
+
+    k = np.array([raw[window] for window, _ in grid]).reshape(len(grid), m)
+    ema_windows = [window for _, window in grid]
+    alphas = [2 / (window) for window in ema_windows]
+    d = ema_rows(k, ema_windows, alphas)
+    dd = ema_rows(d, ema_windows, alphas)
+    return k, d, dd
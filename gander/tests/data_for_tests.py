@@ -110,3 +110,48 @@ def force_test_data():
     data.loc[:, "volume"] = 10.0
     data.loc[:, "close"] = [i + 1 for i in range(m)]
     return data
+
+
+def random_test_data(m, seed=0):
+    """Construct a random walk of ohlcv data.
+
+    :param m: Number of rows in data set
+    :param seed: Seed for the random number generator
+    :type m: ``int``
+    :type seed: ``int``
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, m))
+    open_ = close + rng.normal(0, 0.5, m)
+    high = np.maximum(open_, close) + rng.uniform(0, 1, m)
+    low = np.minimum(open_, close) - rng.uniform(0, 1, m)
+    volume = rng.integers(1000, 10000, m).astype(float)
+    data = np.column_stack([open_, high, low, close, volume])
+    return data_format(data, m)
+
+
+def tr_reference(df):
+    """Calculate true range one data point at a time, for comparison."""
+    tr = [np.nan]
+    for i in range(len(df) - 1):
+        high_low = abs(df["high"].iloc[i + 1] - df["low"].iloc[i + 1])
+        high_last_close = abs(df["high"].iloc[i + 1] - df["close"].iloc[i])
+        low_last_close = abs(df["low"].iloc[i + 1] - df["close"].iloc[i])
+        tr.append(max([high_low, high_last_close, low_last_close]))
+    return tr
+
+
+def impulse_reference(df, ema, macdh):
+    """Calculate impulse colors one data point at a time, for comparison."""
+    data = df[[ema, macdh]].dropna()
+    impulse = []
+    for i in range(len(data) - 1):
+        ema_0, ema_1 = data[ema].iloc[i], data[ema].iloc[i + 1]
+        macdh_0, macdh_1 = data[macdh].iloc[i], data[macdh].iloc[i + 1]
+        if ema_1 > ema_0 and macdh_1 > macdh_0:
+            impulse.append("green")
+        elif ema_1 < ema_0 and macdh_1 < macdh_0:
+            impulse.append("red")
+        else:
+            impulse.append("blue")
+    return pd.Series(impulse, index=data.index[1:], dtype=object)
@@ -0,0 +1,126 @@
+"""Tests for ``gander.aio`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import asyncio
+from .. aio import AsyncIndicators, stream_indicators
+from .. indicators import calc_ema, calc_macd
+from .. streaming import Ema, Macd
+from . data_for_tests import random_test_data
+import numpy as np
+import pytest
+
+INDICATORS = {"ema13": (Ema(13), ["close"]),
+              ("fast", "signal", "macd-h"): (Macd(12, 26, 9), ["close"])}
+
+
+async def feed(frames, log=None):
+    """Yield bars of several symbols, interleaved."""
+    for time in frames[0][1].index:
+        for symbol, df in frames:
+            if log is not None:
+                log.append(symbol)
+            yield symbol, time, df.loc[time].to_dict()
+
+
+async def collect(updates):
+    """Gather all updates of a stream."""
+    out = []
+    async for update in updates:
+        out.append(update)
+    return out
+
+
+def test_stream():
+    """Test that each symbol's updates match batch calculations."""
+    frames = [("a", random_test_data(200, seed=1)),
+              ("b", random_test_data(200, seed=2))]
+    updates = asyncio.run(collect(stream_indicators(feed(frames),
+                                                    INDICATORS, batch=7)))
+    assert len(updates) == 400
+    for symbol, df in frames:
+        values = [update.values for update in updates
+                  if update.symbol == symbol]
+        assert [update.time for update in updates
+                if update.symbol == symbol] == list(df.index)
+        expected = calc_ema(df, df["close"], "ema13", window=13)
+        expected = calc_ema(expected, expected["close"], "ema12", window=12)
+        expected = calc_ema(expected, expected["close"], "ema26", window=26)
+        expected = calc_macd(expected, expected["ema12"], expected["ema26"])
+        for name in ["ema13", "fast", "signal", "macd-h"]:
+            np.testing.assert_allclose([value[name] for value in values],
+                                       expected[name], rtol=1e-9)
+
+
+def test_backpressure():
+    """Test that a slow consumer stops the feed from being read."""
+    frames = [("a", random_test_data(100))]
+    log = []
+
+    async def consume():
+        stream = AsyncIndicators(INDICATORS, maxsize=2, batch=1)
+        updates = stream.stream(feed(frames, log))
+        first = await updates.__anext__()
+        await asyncio.sleep(0.05)
+        read = len(log)
+        await updates.aclose()
+        return first, read
+
+    first, read = asyncio.run(consume())
+    assert first.symbol == "a"
+    # Two queues of two, one bar in the executor and one waiting to be put
+    assert 2 < read <= 7
+
+
+def test_stream_error():
+    """Test that feed errors are raised after the updates before them."""
+    async def broken():
+        yield "a", 0, {"close": 1.0}
+        raise RuntimeError("feed lost")
+
+    async def consume(out):
+        async for update in stream_indicators(broken(), INDICATORS):
+            out.append(update)
+
+    out = []
+    with pytest.raises(RuntimeError, match="feed lost"):
+        asyncio.run(consume(out))
+    assert len(out) == 1
+
+
+def test_stream_error_in_batch():
+    """Test that updates before a failing bar of a batch are yielded."""
+    async def bars():
+        for time in range(5):
+            yield "a", time, {"close": 100.0 + time}
+        yield "a", 5, {"open": 100.0}
+
+    async def consume(stream, out):
+        async for update in stream.stream(bars()):
+            out.append(update)
+
+    stream = AsyncIndicators(INDICATORS, batch=16)
+    out = []
+    with pytest.raises(KeyError):
+        asyncio.run(consume(stream, out))
+    assert [update.time for update in out] == list(range(5))
+
+    updates, failed = stream._update_batch([("b", 0, {"close": 1.0}),
+                                            ("b", 1, {})])
+    assert len(updates) == 1 and isinstance(failed.error, KeyError)
@@ -0,0 +1,139 @@
+"""Tests for ``gander.backends`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. import backends, kernels
+from .. backends import BACKENDS, kernel, register_backend, set_backend, \
+    get_backend
+from .. indicators import calc_ema, calc_stoch, calc_impulse, calc_tr
+from . data_for_tests import random_test_data
+import numpy as np
+import pytest
+
+
+def kernel_calls(m, seed=0):
+    """Set up calls of every kernel on data with NaN values and flat runs."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, m))
+    close[rng.random(m) < 0.05] = np.nan
+    close[m // 2:m // 2 + 20] = 100.0
+    prices = close[:, None] + rng.normal(0, 0.5, (m, 4))
+    prices[m // 2:m // 2 + 20] = 100.0
+    volume = rng.uniform(1000, 10000, m)
+    return [("sma", (close, 10), {}),
+            ("sma", (close, 1), {}),
+            ("ema", (close, 13), {}),
+            ("ema", (close, 10), {"custom_a": 0.3}),
+            ("ema", (close[:5], 13), {}),
+            ("macd", (close, np.roll(close, 3), 9), {}),
+            ("stoch", (close, prices, 15, 4), {}),
+            ("force", (close, volume), {}),
+            ("tr", (prices[:, 1], prices[:, 2], close), {}),
+            ("impulse", (close, np.roll(close, 5) - close), {})]
+
+
+def assert_same(result, expected):
+    """Compare kernel outputs, single arrays or tuples of them."""
+    if isinstance(expected, tuple):
+        for part, expected_part in zip(result, expected):
+            assert_same(part, expected_part)
+    elif expected.dtype == object:
+        assert [str(value) for value in result] == \
+            [str(value) for value in expected]
+    else:
+        np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-9,
+                                   equal_nan=True)
+
+
+@pytest.mark.parametrize("backend", ["python", "numba"])
+def test_backend_equivalence(backend):
+    """Test that every kernel of a backend matches the numpy kernels.
+
+    :param backend: Name of backend
+    """
+    if backend == "numba":
+        pytest.importorskip("numba")
+    for name, args, kwargs in kernel_calls(300):
+        assert_same(kernel(name, backend=backend)(*args, **kwargs),
+                    getattr(kernels, name)(*args, **kwargs))
+
+
+def test_indicators_backend():
+    """Test backends chosen per call and globally give the same columns."""
+    df = random_test_data(100)
+    expected = calc_impulse(calc_stoch(calc_ema(df, df["close"], "ema13",
+                                                window=13)),
+                            "ema13", "%K")
+    expected = calc_tr(expected, "high", "low", "close")
+
+    out = calc_ema(df, df["close"], "ema13", window=13, backend="python")
+    out = calc_stoch(out, backend="python")
+    out = calc_impulse(out, "ema13", "%K", backend="python")
+    assert np.allclose(out["ema13"], expected["ema13"], equal_nan=True)
+    assert np.allclose(out["%D"], expected["%D"], equal_nan=True)
+    assert out["impulse"].equals(expected["impulse"])
+
+    set_backend("python")
+    try:
+        assert get_backend() == "python"
+        assert kernel("tr", 10**6) is BACKENDS["python"].kernels["tr"]
+        out = calc_tr(out, "high", "low", "close")
+    finally:
+        set_backend("auto")
+    assert np.allclose(out["tr"], expected["tr"], equal_nan=True)
+
+
+def test_auto_dispatch():
+    """Test that "auto" picks backends by input size."""
+    calls = []
+
+    def loader():
+        return {"ema": lambda *args, **kwargs: calls.append(args)}
+
+    register_backend("big", loader, min_size=10**9)
+    try:
+        assert kernel("ema", 100) is kernels.ema
+        assert kernel("sma", 10**9) is kernels.sma
+        kernel("ema", 10**9)(np.zeros(3), 2)
+        assert len(calls) == 1
+        # The pure python reference is only used when asked for
+        assert kernel("tr", 10) is kernels.tr
+    finally:
+        del BACKENDS["big"]
+
+
+def test_backend_errors():
+    """Test that unknown and unavailable backends raise ``ValueError``."""
+    with pytest.raises(ValueError):
+        set_backend("fortran")
+    with pytest.raises(ValueError):
+        kernel("ema", backend="fortran")
+
+    def loader():
+        raise ImportError("No module named 'missing'")
+
+    register_backend("missing", loader, min_size=0)
+    try:
+        assert not BACKENDS["missing"].available
+        with pytest.raises(ValueError, match="not available"):
+            set_backend("missing")
+        assert kernel("ema", 100) is kernels.ema
+        assert backends.get_backend() == "auto"
+    finally:
+        del BACKENDS["missing"]
@@ -0,0 +1,77 @@
+"""Tests for ``gander.batch`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. batch import ChartTemplate, BatchRenderer, render_universe
+from . data_for_tests import random_test_data
+import os
+import pytest
+
+
+def test_template_reuse():
+    """Test that drawing a new symbol replaces the previous chart."""
+    template = ChartTemplate(bars=60)
+    first = template.draw(random_test_data(100, seed=1), title="A")
+    counts = [len(ax.lines) + len(ax.collections) for ax in first.axes]
+    second = template.draw(random_test_data(100, seed=2), title="B")
+    assert second is first
+    assert [len(ax.lines) + len(ax.collections)
+            for ax in second.axes] == counts
+    assert second.axes[0].get_xlim() == (-1, 60)
+    assert second.axes[0].get_title() == "B"
+
+
+def test_template_panels():
+    """Test spec and labels of a template with some panels."""
+    template = ChartTemplate(panels=["candles", "stoch"], labels="weekly")
+    assert template.spec == ("macd(12, 26, 9), impulse(ema13, macd-h), "
+                             "stoch(15, 4)")
+    figure = template.draw(random_test_data(50))
+    assert len(figure.axes) == 2
+    assert len(figure.axes[-1].get_xticks()) == 10
+    with pytest.raises(ValueError):
+        ChartTemplate(panels=["volume"])
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_render_universe(tmp_path, max_workers):
+    """Test that images are written, and failing symbols reported."""
+    frames = {"S%d" % i: random_test_data(80, seed=i) for i in range(3)}
+    frames["BAD"] = frames["S0"].drop(columns="volume")
+    renderer = BatchRenderer(ChartTemplate(bars=40), str(tmp_path),
+                             max_workers=max_workers, chunksize=2)
+    results = list(renderer.run(frames.items()))
+    assert [result.symbol for result in results] == list(frames)
+    assert results[-1].error is not None
+    for result in results[:-1]:
+        assert result.error is None
+        assert os.path.getsize(result.data) > 0
+    stats = renderer.stats()
+    assert stats["charts"] == 3
+    assert stats["errors"] == 1
+    assert stats["charts_per_second"] > 0
+
+
+def test_render_universe_stats(tmp_path):
+    """Test the statistics returned by ``render_universe()``."""
+    frames = {"S%d" % i: random_test_data(40, seed=i) for i in range(2)}
+    stats = render_universe(frames.items(), str(tmp_path / "charts"),
+                            max_workers=0, fmt="svg")
+    assert stats["charts"] == 2
+    assert sorted(os.listdir(tmp_path / "charts")) == ["S0.svg", "S1.svg"]
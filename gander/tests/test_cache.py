@@ -0,0 +1,147 @@
+"""Tests for ``gander.cache`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. import indicators
+from .. indicators import calc_sma, calc_ema, calc_stoch, calc_force
+from .. cache import IndicatorCache, enable_cache, disable_cache, \
+    fingerprint
+from .. layers import has_layer
+from . data_for_tests import random_test_data
+import pytest
+
+
+@pytest.mark.parametrize("func, args, kwargs", [
+    (calc_ema, ["close", "ema"], {"window": 13}),
+    (calc_sma, [10, "close", "sma"], {}),
+    (calc_stoch, [], {})])
+def test_cache_hit(func, args, kwargs):
+    """Test that cached results equal calculated results.
+
+    :param func: Indicator function
+    :param args: Positional arguments, "close" is passed as column for ema
+    :param kwargs: Keyword arguments
+    """
+    cache = IndicatorCache()
+    cached = cache.wrap(func)
+    df = random_test_data(100)
+    if func is calc_ema:
+        args = [df["close"]] + args[1:]
+
+    expected = func(df.copy(), *args, **kwargs)
+    miss = cached(df.copy(), *args, **kwargs)
+    hit = cached(df.copy(), *args, **kwargs)
+    assert miss.equals(expected)
+    assert hit.equals(expected)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_keys():
+    """Test that changed data or parameters miss the cache."""
+    cache = IndicatorCache()
+    cached = cache.wrap(calc_ema)
+    df = random_test_data(100)
+    cached(df, df["close"], "ema", window=13)
+    cached(df, df["close"], "ema", window=12)
+    df_changed = df.copy()
+    df_changed.iloc[50, 3] += 1
+    cached(df_changed, df_changed["close"], "ema", window=13)
+    assert cache.stats()["misses"] == 3
+    assert fingerprint(df) == fingerprint(df.copy())
+    assert fingerprint(df) != fingerprint(df_changed)
+
+
+def test_cache_input_columns():
+    """Test that only the columns an indicator reads are in its key."""
+    cache = IndicatorCache()
+    cached = cache.wrap(calc_force)
+    df = random_test_data(100)
+    cached(df.copy(), "close", "volume")
+    other = df.copy()
+    other["open"] += 1
+    out = cached(other.copy(), "close", "volume")
+    assert cache.stats()["hits"] == 1
+    assert out.equals(calc_force(other.copy(), "close", "volume"))
+    changed = df.copy()
+    changed.iloc[50, 4] += 1
+    out = cached(changed.copy(), "close", "volume")
+    assert cache.stats()["misses"] == 2
+    assert out.equals(calc_force(changed.copy(), "close", "volume"))
+
+
+def test_cache_sign_flip():
+    """Test that negated values miss the cache."""
+    cache = IndicatorCache()
+    cached = cache.wrap(calc_ema)
+    df = random_test_data(100)
+    df["fast"] = df["close"] - df["close"].mean()
+    cached(df.copy(), df["fast"], "signal", window=9)
+    negated = df.copy()
+    negated["fast"] = -negated["fast"]
+    out = cached(negated.copy(), negated["fast"], "signal", window=9)
+    assert fingerprint(df["fast"]) != fingerprint(negated["fast"])
+    assert cache.stats()["misses"] == 2
+    assert out.equals(calc_ema(negated.copy(), negated["fast"], "signal",
+                               window=9))
+
+
+def test_cache_eviction():
+    """Test least recently used eviction by number of entries and bytes."""
+    cache = IndicatorCache(max_entries=2)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    cache.get("a")
+    cache.put("c", 3, 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache = IndicatorCache(max_bytes=25)
+    for key in "abc":
+        cache.put(key, key, 10)
+    assert len(cache) == 2
+    assert cache.stats()["bytes"] == 20
+    assert cache.stats()["evictions"] == 1
+
+
+def test_enable_cache():
+    """Test caching of the functions in ``gander.indicators``."""
+    original = indicators.calc_ema
+    cache = enable_cache()
+    try:
+        df = random_test_data(100)
+        df = indicators.calc_ema(df, df["close"], "ema12", window=12)
+        df = indicators.calc_ema(df, df["close"], "ema26", window=26)
+        df = indicators.calc_macd(df, df["ema12"], df["ema26"])
+        assert cache.stats()["misses"] == 4
+        assert has_layer(indicators.calc_ema, "cache")
+    finally:
+        disable_cache()
+    assert indicators.calc_ema is original
+
+
+def test_cache_sorted_index():
+    """Test cached ``calc_ema()`` on a data frame with unsorted index."""
+    cache = IndicatorCache()
+    cached = cache.wrap(calc_ema)
+    df = random_test_data(50)[::-1]
+    expected = calc_ema(df.copy(), df["close"], "ema", window=5)
+    cached(df.copy(), df["close"], "ema", window=5)
+    assert cached(df.copy(), df["close"], "ema", window=5).equals(expected)
+    assert cache.stats()["hits"] == 1
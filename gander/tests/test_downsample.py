@@ -0,0 +1,79 @@
+"""Tests for ``gander.downsample`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. downsample import buckets, ohlc_buckets, minmax_decimate
+from . data_for_tests import random_test_data
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("m, max_bars", [(100, 10), (101, 10), (7, 3),
+                                         (5, 10)])
+def test_buckets(m, max_bars):
+    """Test that buckets cover all bars, in at most ``max_bars`` buckets."""
+    starts, counts = buckets(m, max_bars)
+    assert len(starts) <= max_bars
+    assert counts.sum() == m
+    assert (starts[1:] == starts[:-1] + counts[:-1]).all()
+
+
+def test_ohlc_buckets():
+    """Test aggregated bars against a pandas groupby."""
+    df = random_test_data(103)
+    out = ohlc_buckets(df, 10)
+    groups = df.groupby(np.arange(len(df)) // 11)
+    expected = pd.DataFrame({"open": groups["open"].first(),
+                             "high": groups["high"].max(),
+                             "low": groups["low"].min(),
+                             "close": groups["close"].last(),
+                             "volume": groups["volume"].sum()})
+    expected.index = df.index[::11]
+    pd.testing.assert_frame_equal(out, expected[out.columns],
+                                  check_dtype=False)
+    assert out["high"].max() == df["high"].max()
+    assert out["low"].min() == df["low"].min()
+
+
+def test_ohlc_buckets_short():
+    """Test that short data is not aggregated."""
+    df = random_test_data(20)
+    out = ohlc_buckets(df, 50)
+    pd.testing.assert_frame_equal(
+        out, df[["open", "close", "high", "low", "volume"]])
+
+
+def test_minmax_decimate():
+    """Test that decimation keeps the extremes of every bucket."""
+    values = np.random.default_rng(0).normal(size=1001).cumsum()
+    values[:30] = np.nan
+    positions, decimated = minmax_decimate(values, 100)
+    assert len(positions) <= 100
+    assert (np.diff(positions) > 0).all()
+    np.testing.assert_array_equal(decimated, values[positions])
+
+    starts, counts = buckets(len(values), 50)
+    for start, count in zip(starts, counts):
+        bucket = values[start:start + count]
+        kept = decimated[(positions >= start) & (positions < start + count)]
+        if np.isnan(bucket).all():
+            continue
+        assert np.nanmax(kept) == np.nanmax(bucket)
+        assert np.nanmin(kept) == np.nanmin(bucket)
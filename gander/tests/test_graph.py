@@ -0,0 +1,149 @@
+"""Tests for ``gander.graph`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. indicators import calc_ema, calc_macd, calc_stoch, calc_impulse
+from .. graph import IndicatorGraph, compute, compute_range, ema_lookback
+from .. runner import run_universe
+from . data_for_tests import random_test_data
+import numpy as np
+import pytest
+import warnings
+
+SPEC = "ema13, macd(12, 26, 9), impulse(ema13, macd-h), stoch(15, 4)"
+
+
+def test_graph():
+    """Test ``gander.graph.compute()`` against calling directly."""
+    df = random_test_data(200)
+    df_out = compute(df.copy(), SPEC)
+
+    expected = calc_ema(df.copy(), df["close"], "ema13", window=13)
+    expected = calc_ema(expected, expected["close"], "ema12", window=12)
+    expected = calc_ema(expected, expected["close"], "ema26", window=26)
+    expected = calc_macd(expected, expected["ema12"], expected["ema26"])
+    expected = calc_impulse(expected, "ema13", "macd-h")
+    expected = calc_stoch(expected)
+
+    columns = ["ema13", "fast", "signal", "macd-h", "impulse", "%K", "%D",
+               "%%D"]
+    assert list(df_out.columns) == list(df.columns) + columns
+    assert df_out.equals(expected[list(df_out.columns)])
+
+
+def test_graph_shared_nodes():
+    """Test that shared indicators are calculated once."""
+    graph = IndicatorGraph("ema12, macd, impulse(ema12, macd-h), "
+                           "impulse(ema12, macd-h)")
+    # ema12, ema26, macd and impulse
+    assert len(graph.calls) == 4
+    assert graph.columns == ["ema12", "fast", "signal", "macd-h", "impulse"]
+
+
+@pytest.mark.parametrize("spec", ["wma(10)", "ema", "stoch, stoch(5)"])
+def test_graph_bad_spec(spec):
+    """Test that bad specs raise ``ValueError``.
+
+    :param spec: Indicator spec
+    """
+    with pytest.raises(ValueError):
+        IndicatorGraph(spec)
+
+
+def test_graph_impulse_forms():
+    """Test the documented forms of impulse terms."""
+    df = random_test_data(200)
+    expected = compute(df.copy(), SPEC)["impulse"]
+    for spec in ["impulse", "impulse(ema13, macd-h)",
+                 'impulse("ema13", "macd-h")']:
+        assert compute(df.copy(), spec)["impulse"].equals(expected)
+
+    # The MACD term of the spec is used, wherever it is
+    out = compute(df.copy(), "impulse(ema13, macd-h), macd(5, 35, 5)")
+    expected = compute(df.copy(), "ema13, macd(5, 35, 5), "
+                                  "impulse(ema13, macd-h)")
+    assert out["impulse"].equals(expected["impulse"])
+    with pytest.raises(ValueError, match="macd"):
+        IndicatorGraph("macd, macd(5, 35, 5)")
+
+
+def test_graph_runner():
+    """Test that graph calls can be run by ``gander.runner``."""
+    graph = IndicatorGraph(SPEC)
+    frames = [("s" + str(i), random_test_data(100, seed=i))
+              for i in range(3)]
+    for (symbol, df), result in zip(frames, run_universe(frames, graph.calls,
+                                                          max_workers=2)):
+        expected = graph.compute(df.copy())
+        assert result.data[graph.columns].equals(expected[graph.columns])
+
+
+def test_lookback():
+    """Test lookback of exact and ema based indicators."""
+    assert IndicatorGraph("sma10, tr").lookback() == 9
+    assert IndicatorGraph("stoch(15, 2)").lookback() == 14 + 1 + 1
+    assert ema_lookback(2) == 1
+    assert ema_lookback(13, 1e-6) == 13 - 1 + 83
+    assert ema_lookback(1) is None
+    # Signal line is an ema of the difference of emas
+    assert IndicatorGraph("macd(12, 26, 9)").lookback(1e-3) == \
+        ema_lookback(26, 1e-3) + ema_lookback(9, 1e-3)
+    # Impulse needs one bar before ema13 and macd-h
+    assert IndicatorGraph(SPEC).lookback(1e-3) == \
+        ema_lookback(26, 1e-3) + ema_lookback(9, 1e-3) + 1
+
+
+def test_compute_range():
+    """Test that a range matches the full history within the bound."""
+    df = random_test_data(2000)
+    start, end = df.index[1500], df.index[1799]
+    full = compute(df.copy(), SPEC + ", sma10, tr, force")
+    full = full.loc[start:end]
+
+    part = compute_range(df, SPEC + ", sma10, tr, force", start, end,
+                         tol=1e-4)
+    assert part.index.equals(full.index)
+    exact = ["sma10", "tr", "force", "%K"]
+    np.testing.assert_allclose(part[exact], full[exact])
+
+    bound = 2e-4 * np.ptp(df["close"].iloc[:1500])
+    for column in ["ema13", "fast", "signal", "macd-h"]:
+        assert np.abs(part[column] - full[column]).max() <= bound
+
+
+def test_compute_keeps_input():
+    """Test that ``compute()`` does not change its input data frame."""
+    df = random_test_data(200)
+    before = df.copy()
+    out = compute(df, "sma10, force, tr, " + SPEC)
+    assert df.equals(before)
+    assert list(df.columns) == list(before.columns)
+    assert "force" in out.columns and "ema12" not in out.columns
+
+
+def test_compute_range_in_place():
+    """Test ranges of indicators that add their columns in place."""
+    df = random_test_data(300)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        part = compute_range(df, "force, sma10", df.index[200])
+    assert list(df.columns) == list(random_test_data(300).columns)
+    full = compute(df.copy(), "force, sma10")
+    np.testing.assert_allclose(part[["force", "sma10"]],
+                               full[["force", "sma10"]].iloc[200:])
@@ -19,9 +19,12 @@ Questions may be directed to resonate@ekkobit.com
 """
 
 from .. indicators import calc_sma, calc_ema, calc_macd, calc_stoch, \
-    calc_impulse, calc_force
+    calc_impulse, calc_force, calc_tr, calc_sma_columns, calc_ema_columns
+from .. kernels import _ema_loop
 from . data_for_tests import sma_test_data, ema_test_data, \
-    macd_test_data, stoch_test_data, impulse_test_data, force_test_data
+    macd_test_data, stoch_test_data, impulse_test_data, force_test_data, \
+    random_test_data, tr_reference, impulse_reference
+import numpy as np
 import pytest
 
 
@@ -86,6 +89,27 @@ def test_ema(ema_fix):
                 ema_decay[i] / 2).all()
 
 
+@pytest.mark.parametrize("window, custom_a", [(2, None), (13, None),
+                                              (27, None), (5, 0.3),
+                                              (1, None), (3, 1.5)])
+def test_ema_parity(window, custom_a):
+    """Test ``gander.indicators.calc_ema()`` against the ema loop.
+
+    :param window: Number of data points to use in average
+    :param custom_a: Custom a for the geometric series
+    """
+    df = random_test_data(500)
+    df.loc[df.index[:7], "close"] = np.nan
+    df_ema = calc_ema(df, df["close"], "ema", window=window,
+                      custom_a=custom_a)
+
+    a = custom_a if custom_a is not None else 2 / window
+    expected = _ema_loop(df["close"].dropna().values, window, a)
+    assert df_ema["ema"].isna().sum() == 7 + window - 1
+    np.testing.assert_allclose(df_ema["ema"].dropna().values, expected,
+                               rtol=1e-12)
+
+
 @pytest.fixture(scope='function')
 def macd_fix():
     """Set up macd testing using special test data frame."""
@@ -145,6 +169,24 @@ def test_impulse(impulse_fix):
     assert list(df_out["impulse"].dropna().values) == ["green", "red", "blue"]
 
 
+def test_impulse_parity():
+    """Test ``gander.indicators.calc_impulse()`` against the impulse loop."""
+    df = random_test_data(300)
+    df = calc_ema(df, df["close"], "ema13", window=13)
+    df = calc_ema(df, df["close"], "ema12", window=12)
+    df = calc_ema(df, df["close"], "ema26", window=26)
+    df = calc_macd(df, df["ema12"], df["ema26"])
+    # Round to get flat steps, which should come out blue
+    df["ema13"] = df["ema13"].round()
+    df.loc[df.index[100], "macd-h"] = np.nan
+    df_out = calc_impulse(df, "ema13", "macd-h")
+
+    expected = impulse_reference(df, "ema13", "macd-h")
+    assert df_out.index.equals(df.index)
+    assert df_out["impulse"].isna().sum() == len(df) - len(expected)
+    assert df_out["impulse"].dropna().equals(expected)
+
+
 @pytest.fixture(scope='function')
 def force_fix():
     """Set up force testing using special test data frame."""
@@ -163,3 +205,66 @@ def test_force(force_fix):
     df_out = calc_force(df, "close", "volume")
     print("\n\n", df_out)
     assert list(df_out["force"].dropna().values) == [10.0, 10.0, 10.0]
+
+
+def test_tr():
+    """Test ``gander.indicators.calc_tr()`` against the true range loop."""
+    df = random_test_data(300)
+    df.loc[df.index[50], "close"] = np.nan
+    df.loc[df.index[80], "high"] = np.nan
+    df_out = calc_tr(df, "high", "low", "close")
+    np.testing.assert_array_equal(df_out["tr"].values, tr_reference(df))
+
+
+def test_inplace():
+    """Test that ``inplace=True`` gives the same columns as the default."""
+    df = random_test_data(200)
+    expected = calc_ema(df.copy(), df["close"], "ema12", window=12)
+    expected = calc_ema(expected, expected["close"], "ema26", window=26)
+    expected = calc_macd(expected, expected["ema12"], expected["ema26"])
+    expected = calc_impulse(expected, "ema12", "macd-h")
+    expected = calc_stoch(expected)
+
+    df_in = df.copy()
+    df_out = calc_ema(df_in, df_in["close"], "ema12", window=12,
+                      inplace=True)
+    df_out = calc_ema(df_out, df_out["close"], "ema26", window=26,
+                      inplace=True)
+    df_out = calc_macd(df_out, df_out["ema12"], df_out["ema26"],
+                       inplace=True)
+    df_out = calc_impulse(df_out, "ema12", "macd-h", inplace=True)
+    df_out = calc_stoch(df_out, inplace=True)
+
+    assert df_out is df_in
+    assert df_out.equals(expected)
+
+
+def test_inplace_unsorted():
+    """Test that ``inplace=True`` keeps the order of the index."""
+    df = random_test_data(50)[::-1].copy()
+    df_out = calc_ema(df, df["close"], "ema", window=5, inplace=True)
+    assert df_out.index.equals(df.index)
+    assert df_out["ema"].isna().sum() == 4
+
+
+@pytest.mark.parametrize("backend", ["numpy", "python"])
+@pytest.mark.parametrize("columns", [None, ["close", "volume"]])
+def test_columns(columns, backend):
+    """Test multi column smas and emas against one column at a time."""
+    df = random_test_data(300)
+    df.loc[df.index[40], "close"] = np.nan
+    smas = calc_sma_columns(df, 10, columns, backend=backend)
+    emas = calc_ema_columns(df, 10, columns, backend=backend)
+    names = columns if columns is not None else \
+        ["open", "high", "low", "close", "volume"]
+    assert list(smas.columns) == ["sma_%s_10" % name for name in names]
+    assert list(emas.columns) == ["ema_%s_10" % name for name in names]
+    assert smas.index.equals(df.index) and emas.index.equals(df.index)
+    for name in names:
+        expected = calc_sma(df.copy(), 10, name, "sma",
+                            backend=backend)["sma"]
+        np.testing.assert_array_equal(smas["sma_%s_10" % name], expected)
+        expected = calc_ema(df.copy(), df[name], "ema", window=10,
+                            inplace=True, backend=backend)["ema"]
+        np.testing.assert_allclose(emas["ema_%s_10" % name], expected,
+                                   rtol=1e-12)
@@ -0,0 +1,109 @@
+"""Tests for ``gander.instrument`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import logging
+from matplotlib.figure import Figure
+from .. import indicators, plotting
+from .. indicators import calc_macd
+from .. cache import enable_cache, disable_cache
+from .. graph import compute
+from .. instrument import Aggregator, LoggingSink, \
+    enable_instrumentation, disable_instrumentation
+from .. layers import has_layer
+from . data_for_tests import random_test_data
+
+
+def test_instrumentation():
+    """Test measurements of nested indicator calls and plotting."""
+    df = random_test_data(500)
+    df = indicators.calc_ema(df, df["close"], "ema12", window=12)
+    df = indicators.calc_ema(df, df["close"], "ema26", window=26)
+    measurements = []
+    aggregator = Aggregator()
+    enable_instrumentation([measurements.append, aggregator], memory=True)
+    try:
+        out = indicators.calc_macd(df, df["ema12"], df["ema26"])
+        plotting.candles(df, Figure().add_subplot())
+    finally:
+        disable_instrumentation()
+    assert out.equals(calc_macd(df, df["ema12"], df["ema26"]))
+
+    names = [measurement.name for measurement in measurements]
+    assert names == ["gander.indicators.calc_ema",
+                     "gander.indicators.calc_macd",
+                     "gander.plotting.candles"]
+    ema, macd, _ = measurements
+    assert (ema.depth, macd.depth) == (1, 0)
+    assert ema.rows == macd.rows == 500
+    assert macd.seconds >= ema.seconds
+    assert macd.bytes >= ema.bytes > 0
+    assert macd.copies == macd.bytes / (8 * 500)
+
+    summary = aggregator.summary()
+    assert summary["gander.indicators.calc_macd"]["calls"] == 1
+    assert summary["gander.plotting.candles"]["p50_seconds"] > 0
+
+
+def test_disable_instrumentation(caplog):
+    """Test that disabling restores the original functions."""
+    original = indicators.calc_sma
+    enable_instrumentation(LoggingSink())
+    assert indicators.calc_sma is not original
+    with caplog.at_level(logging.INFO, logger="gander.instrument"):
+        indicators.calc_sma(random_test_data(50), 10, "close", "sma")
+    assert "gander.indicators.calc_sma" in caplog.text
+    # Memory is only measured on request
+    assert "None bytes" in caplog.text
+
+    disable_instrumentation()
+    assert indicators.calc_sma is original
+    assert plotting.candles.__module__ == "gander.plotting"
+    assert not hasattr(plotting.candles, "sinks")
+
+
+def test_instrumentation_and_cache():
+    """Test enabling and disabling with the cache, in any order."""
+    original = indicators.calc_ema
+    aggregator = Aggregator()
+    enable_cache()
+    enable_instrumentation(aggregator)
+    try:
+        disable_cache()
+        assert not has_layer(indicators.calc_ema, "cache")
+        assert has_layer(indicators.calc_ema, "instrument")
+        cache = enable_cache()
+        # Layers do not pass attributes on to the layers around them
+        assert not hasattr(indicators.calc_ema, "sinks")
+        enable_instrumentation(aggregator)
+        assert not hasattr(indicators.calc_ema, "cache")
+        assert indicators.calc_ema.__wrapped__.__wrapped__ is original
+
+        # Graphs look up the indicators when they are called
+        df = random_test_data(100)
+        compute(df, "ema13")
+        compute(df, "ema13")
+        assert aggregator.summary()["gander.indicators.calc_ema"][
+            "calls"] == 2
+        assert cache.stats()["hits"] == 1
+    finally:
+        disable_instrumentation()
+        assert has_layer(indicators.calc_ema, "cache")
+        disable_cache()
+    assert indicators.calc_ema is original
@@ -0,0 +1,76 @@
+"""Tests for ``gander.kernels`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. import kernels
+from . data_for_tests import random_test_data
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def kernel_fix():
+    """Set up a random walk of ohlcv data with a few NaN values."""
+    df = random_test_data(300)
+    df.iloc[[40, 41, 200], 3] = np.nan
+    return df
+
+
+def test_sma(kernel_fix):
+    """Test ``gander.kernels.sma()`` against pandas rolling mean."""
+    close = kernel_fix["close"]
+    np.testing.assert_allclose(kernels.sma(close.values, 10),
+                               close.rolling(10).mean().values, rtol=1e-12)
+
+
+def test_stoch(kernel_fix):
+    """Test ``gander.kernels.stoch()`` against pandas rolling max and min."""
+    df = kernel_fix
+    highs = df["close"].rolling(15).max()
+    lows = df.loc[:, "open":"close"].rolling(15).min().min(axis=1)
+    expected = ((df["close"] - lows) / (highs - lows)) * 100
+    k, d, dd = kernels.stoch(df["close"].values,
+                             df.loc[:, "open":"close"].values)
+    np.testing.assert_allclose(k, expected.values, rtol=1e-12)
+    assert np.isnan(d).sum() == np.isnan(k).sum() + 3
+
+
+def test_force(kernel_fix):
+    """Test ``gander.kernels.force()`` against pandas diff."""
+    df = kernel_fix
+    expected = df["close"].diff() * df["volume"]
+    np.testing.assert_array_equal(kernels.force(df["close"].values,
+                                                df["volume"].values),
+                                  expected.values)
+
+
+def test_out(kernel_fix):
+    """Test that kernels write to preallocated output arrays."""
+    close = kernel_fix["close"].values
+    out = np.zeros(len(close))
+    assert kernels.ema(close, window=13, out=out) is out
+    np.testing.assert_array_equal(out, kernels.ema(close, window=13))
+
+    buffers = tuple(np.zeros(len(close)) for _ in range(3))
+    result = kernels.macd(kernels.ema(close, 12), kernels.ema(close, 26),
+                          out=buffers)
+    assert all(a is b for a, b in zip(result, buffers))
+
+    with pytest.raises(ValueError):
+        kernels.sma(close, 10, out=np.zeros(3))
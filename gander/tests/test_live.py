@@ -0,0 +1,138 @@
+"""Tests for ``gander.live`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import matplotlib
+matplotlib.use("Agg")
+
+from .. live import LiveCandles, LiveMacd, LiveStochs  # noqa: E402
+from .. plotting import candles  # noqa: E402
+from . data_for_tests import random_test_data  # noqa: E402
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope='function')
+def ax_fix():
+    """Set up a figure and axes, and close the figure afterwards."""
+    fig, ax = plt.subplots()
+    yield ax
+    plt.close(fig)
+
+
+def feed(chart, df, start):
+    """Feed bars from ``start``, each first as a flat bar, then complete."""
+    for i in range(start, len(df)):
+        bar = df.iloc[i:i + 1]
+        forming = bar.copy()
+        forming[["high", "low", "close"]] = forming["open"].iloc[0]
+        chart.update(forming)
+        chart.update(bar)
+
+
+def vertices(collections):
+    """Get sorted vertices of all paths in collections."""
+    points = np.concatenate([path.vertices for collection in collections
+                             for path in collection.get_paths()])
+    return points[np.lexsort(points.T)]
+
+
+@pytest.mark.parametrize("blit", [False, True])
+def test_live_candles(ax_fix, blit):
+    """Test that a fed live chart draws the same candles as ``candles()``."""
+    df = random_test_data(80)
+    chart = LiveCandles(ax_fix, df.iloc[:50], blit=blit)
+    ax_fix.figure.canvas.draw()
+    feed(chart, df, 50)
+    assert len(chart) == 80
+    assert ax_fix.get_xlim()[1] >= 79.5
+    assert ax_fix.get_ylim()[1] >= df["high"].max()
+    assert ax_fix.get_ylim()[0] <= df["low"].min()
+
+    fig, ax = plt.subplots()
+    candles(df, ax)
+    np.testing.assert_array_equal(vertices(ax_fix.collections),
+                                  vertices(ax.collections))
+    plt.close(fig)
+
+
+def test_live_update_artists(ax_fix):
+    """Test that ticks on the last bar only change the live artists."""
+    df = random_test_data(60)
+    chart = LiveCandles(ax_fix, df.iloc[:50], blit=True)
+    ax_fix.figure.canvas.draw()
+    bar = df.iloc[49:50].copy()
+    bar["close"] = bar["open"]
+    changed = chart.update(bar)
+    assert changed == chart._live_artists
+    assert len(chart) == 50
+    assert len(chart.update(df.iloc[50:52])) == 4
+
+
+def test_live_macd(ax_fix):
+    """Test lines and y-limits of ``LiveMacd``."""
+    df = random_test_data(40)
+    df["fast"] = np.sin(np.arange(40) / 5) * np.arange(40)
+    df["signal"] = 0.0
+    df["macd-h"] = df["fast"]
+    chart = LiveMacd(ax_fix, df.iloc[:20], "fast", "signal", "macd-h")
+    feed(chart, df, 20)
+    settled, live = ax_fix.lines[0], ax_fix.lines[2]
+    np.testing.assert_array_equal(
+        np.r_[settled.get_ydata(), live.get_ydata()[1:]], df["fast"])
+    bottom, top = ax_fix.get_ylim()
+    assert bottom == -top
+    assert top >= np.abs(df["fast"]).max()
+
+
+def test_live_stochs(ax_fix):
+    """Test that ``LiveStochs`` keeps its y-limits."""
+    df = random_test_data(40)
+    df["%K"] = np.linspace(0, 100, 40)
+    df["%D"] = 50.0
+    chart = LiveStochs(ax_fix, df.iloc[:10], "%K", "%D")
+    chart.update(df.iloc[10:])
+    assert ax_fix.get_ylim() == (0, 100)
+    assert ax_fix.lines[2].get_xdata()[-1] == 39
+
+
+def test_live_new_bar_chunks(ax_fix):
+    """Test that a new bar does not rebuild settled paths of earlier bars."""
+    df = random_test_data(2503)
+    chart = LiveCandles(ax_fix, df.iloc[:2500], blit=True)
+    # Leave room for new bars, so they do not redraw the full figure
+    ax_fix.set_xlim(-1, 2510)
+    ax_fix.figure.canvas.draw()
+    assert len(chart._chunks) == 3
+    before = [[artist.get_paths() for artist in chunk]
+              for chunk in chart._chunks]
+    changed = chart.update(df.iloc[2500:2501])
+    assert changed == chart._chunks[2] + chart._live_artists
+    for chunk, paths in zip(chart._chunks[:2], before[:2]):
+        assert all(artist.get_paths() is path
+                   for artist, path in zip(chunk, paths))
+    assert chart._chunks[2][0].get_paths() is not before[2][0]
+
+    feed(chart, df, 2501)
+    fig, ax = plt.subplots()
+    candles(df, ax)
+    np.testing.assert_array_equal(vertices(ax_fix.collections),
+                                  vertices(ax.collections))
+    plt.close(fig)
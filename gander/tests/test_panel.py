@@ -0,0 +1,95 @@
+"""Tests for ``gander.panel`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. indicators import calc_ema, calc_macd, calc_stoch, calc_impulse, \
+    calc_force, calc_tr
+from .. panel import panel_fields, panel_sma, panel_ema, panel_macd, \
+    panel_stoch, panel_force, panel_tr, panel_impulse
+from . data_for_tests import random_test_data
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def panel_fix():
+    """Set up three symbols starting at different dates, in long format."""
+    frames = {}
+    for seed, start in enumerate([0, 17, 60]):
+        df = random_test_data(200, seed=seed)
+        frames["s" + str(seed)] = df[start:]
+    return frames, pd.concat(frames, names=["symbol", "date"])
+
+
+def symbol_columns(frames):
+    """Calculate indicators one symbol at a time, for comparison."""
+    out = {}
+    for symbol, df in frames.items():
+        df = calc_ema(df, df["close"], "ema13", window=13)
+        df = calc_ema(df, df["close"], "ema12", window=12)
+        df = calc_ema(df, df["close"], "ema26", window=26)
+        df = calc_macd(df, df["ema12"], df["ema26"])
+        df = calc_impulse(df, "ema13", "macd-h")
+        df = calc_stoch(df)
+        df = calc_force(df, "close", "volume")
+        df = calc_tr(df, "high", "low", "close")
+        out[symbol] = df
+    return out
+
+
+def test_panel(panel_fix):
+    """Test ``gander.panel`` functions against per symbol calculations."""
+    frames, df_long = panel_fix
+    fields = panel_fields(df_long)
+    expected = symbol_columns(frames)
+
+    ema13 = panel_ema(fields["close"], window=13)
+    macd = panel_macd(panel_ema(fields["close"], window=12),
+                      panel_ema(fields["close"], window=26))
+    results = {"ema13": ema13,
+               "impulse": panel_impulse(ema13, macd["macd-h"]),
+               "force": panel_force(fields["close"], fields["volume"]),
+               "tr": panel_tr(fields["high"], fields["low"], fields["close"])
+               }
+    results.update(macd)
+    results.update(panel_stoch(fields["open"], fields["high"],
+                               fields["low"], fields["close"]))
+
+    for symbol, df in expected.items():
+        for column, wide in results.items():
+            got = wide[symbol].dropna()
+            want = df[column].dropna()
+            assert got.index.equals(want.index), (symbol, column)
+            if column == "impulse":
+                assert list(got) == list(want)
+            else:
+                np.testing.assert_allclose(got.values, want.values,
+                                           rtol=1e-9)
+
+
+def test_panel_sma_and_columns(panel_fix):
+    """Test ``panel_sma()`` and MultiIndex column input."""
+    frames, df_long = panel_fix
+    df_wide = df_long.unstack("symbol")
+    fields = panel_fields(df_wide, fields=["close"])
+    sma = panel_sma(fields["close"], 10)
+    expected = frames["s1"]["close"].rolling(10).mean()
+    np.testing.assert_allclose(sma["s1"].dropna().values,
+                               expected.dropna().values)
@@ -0,0 +1,163 @@
+"""Tests for ``gander.plotting`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+import matplotlib
+matplotlib.use("Agg")
+
+from .. plotting import candles, macds, force, daily_labels, \
+    weekly_labels  # noqa: E402
+from . data_for_tests import random_test_data  # noqa: E402
+import matplotlib.colors as mcolors  # noqa: E402
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope='function')
+def ax_fix():
+    """Set up a figure and axes, and close the figure afterwards."""
+    fig, ax = plt.subplots()
+    yield ax
+    plt.close(fig)
+
+
+def test_candles(ax_fix):
+    """Test candle colors and wick extremes of ``candles()``."""
+    df = random_test_data(50)
+    candles(df, ax_fix)
+    wicks, bodies = ax_fix.collections
+    down = (df["close"] < df["open"]).values
+
+    assert len(bodies.get_paths()) == len(set(down))
+    facecolors = {tuple(color) for color in bodies.get_facecolors()}
+    assert facecolors == {mcolors.to_rgba("red"), mcolors.to_rgba("green")}
+
+    wick_ends = np.concatenate([path.vertices for path in wicks.get_paths()])
+    assert wick_ends[:, 1].max() == df["high"].max()
+    assert wick_ends[:, 1].min() == df["low"].min()
+    assert ax_fix.get_ylim()[1] >= df["high"].max()
+
+
+def test_candles_limits(ax_fix):
+    """Test that default limits of ``candles()`` are set by the wicks."""
+    df = random_test_data(80)
+    candles(df, ax_fix)
+    fig, ax = plt.subplots()
+    for i in range(len(df)):
+        ax.plot([i, i], [df["low"].iloc[i], df["high"].iloc[i]])
+    np.testing.assert_allclose(ax_fix.get_xlim(), (-3.95, 82.95))
+    np.testing.assert_allclose(ax_fix.get_ylim(), ax.get_ylim())
+    plt.close(fig)
+
+
+def test_candles_impulse(ax_fix):
+    """Test white bodies of falling candles in ``candles()`` impulse mode."""
+    df = random_test_data(50)
+    impulse = np.where(np.arange(50) % 2, "green", "blue")
+    candles(df, ax_fix, impulse=impulse)
+    _, bodies = ax_fix.collections
+    facecolors = {tuple(color) for color in bodies.get_facecolors()}
+    edgecolors = {tuple(color) for color in bodies.get_edgecolors()}
+    assert mcolors.to_rgba("white") in facecolors
+    assert edgecolors == {mcolors.to_rgba("green"), mcolors.to_rgba("blue")}
+
+
+def test_macds(ax_fix):
+    """Test histogram bins of ``macds()``."""
+    df = random_test_data(50)
+    df["fast"] = np.sin(np.arange(50) / 5)
+    df["signal"] = 0.0
+    df["macd-h"] = df["fast"]
+    df.iloc[0, -1] = np.nan
+    macds(df, ax_fix, "fast", "signal", "macd-h")
+    bins = ax_fix.collections[0]
+    facecolors = {tuple(color) for color in bins.get_facecolors()}
+    assert facecolors == {mcolors.to_rgba("white"),
+                          mcolors.to_rgba("lightblue")}
+    vertices = np.concatenate([path.vertices for path in bins.get_paths()])
+    assert len(vertices) == 49 * 5
+    assert vertices[:, 1].min() == df["macd-h"].min()
+
+
+def test_force(ax_fix):
+    """Test zero crossings in the fills of ``force()``."""
+    df = random_test_data(5)
+    df["force"] = [1.0, -1.0, -2.0, 2.0, 1.0]
+    force(df, ax_fix, "force")
+    positive, negative = ax_fix.collections
+    x = np.concatenate([path.vertices[:, 0]
+                        for path in negative.get_paths()])
+    assert x.min() == 0.5
+    assert x.max() == 2 + 2 / 4
+
+
+def test_candles_max_bars(ax_fix):
+    """Test that ``candles()`` draws buckets that keep the extremes."""
+    df = random_test_data(500)
+    candles(df, ax_fix, max_bars=40)
+    wicks, bodies = ax_fix.collections
+    vertices = np.concatenate([path.vertices for path in bodies.get_paths()])
+    assert len(vertices) == 39 * 5
+    assert vertices[:, 0].min() > -1
+    assert vertices[:, 0].max() < 500
+
+    wick_ends = np.concatenate([path.vertices for path in wicks.get_paths()])
+    assert wick_ends[:, 1].max() == df["high"].max()
+    assert wick_ends[:, 1].min() == df["low"].min()
+
+
+def test_force_max_bars(ax_fix):
+    """Test that ``force()`` draws a decimated line."""
+    df = random_test_data(500)
+    df["force"] = np.sin(np.arange(500) / 7) * np.arange(500)
+    ax_fix.figure.set_size_inches(2, 2)
+    force(df, ax_fix, "force", max_bars="auto")
+    line = ax_fix.lines[0]
+    assert len(line.get_xdata()) < 500
+    assert line.get_ydata().max() == df["force"].max()
+    assert line.get_ydata().min() == df["force"].min()
+
+
+def test_daily_labels():
+    """Test year, month and day labels of ``daily_labels()``."""
+    dates = pd.date_range("2019-12-20", "2020-03-10")
+    df = pd.DataFrame({"close": np.ones(len(dates))}, index=dates)
+    ticks, labels = daily_labels(df, dates, step=10)
+    assert ticks == list(range(9, len(dates), 10))
+    assert labels == ["29", "2020", "18", "28", "Feb", "17", "27", "Mar"]
+
+    strings = list(dates.strftime("%Y-%m-%d"))
+    df.index = strings
+    assert daily_labels(df, strings, step=10) == (ticks, labels)
+
+
+def test_weekly_labels():
+    """Test year and day/month labels of ``weekly_labels()``."""
+    dates = pd.date_range("2019-11-04", periods=12, freq="W-MON")
+    df = pd.DataFrame({"close": np.ones(len(dates))}, index=dates)
+    ticks, labels = weekly_labels(df, dates, step=3)
+    assert ticks == [2, 5, 8, 11]
+    assert labels == ["18/Nov", "09/Dec", "30/Dec", "2020"]
+
+    strings = ["%d/%d/%d" % (date.year, date.month, date.day)
+               for date in dates]
+    assert weekly_labels(df, strings, seperator="/", step=3)[1] == \
+        ["18/Nov", "9/Dec", "30/Dec", "2020"]
@@ -0,0 +1,102 @@
+"""Tests for ``gander.resample`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. indicators import calc_ema, calc_macd
+from .. resample import period_starts, resample_ohlcv, align, Resampler, \
+    HigherTimeframe
+from .. streaming import Ema, Macd
+from . data_for_tests import random_test_data
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_resample_ohlcv():
+    """Test weekly bars against pandas resample."""
+    df = random_test_data(100)
+    weekly = resample_ohlcv(df, "W")
+    expected = df.resample("W").agg({"open": "first", "high": "max",
+                                     "low": "min", "close": "last",
+                                     "volume": "sum"})
+    np.testing.assert_array_equal(weekly.to_numpy(), expected.to_numpy())
+    assert (weekly.index == expected.index - pd.Timedelta(days=6)).all()
+
+
+def test_period_starts():
+    """Test fixed and calendar periods."""
+    index = pd.DatetimeIndex(["2020-01-31 09:59", "2020-02-01 10:00"])
+    assert list(period_starts(index, "h")) == \
+        list(pd.DatetimeIndex(["2020-01-31 09:00", "2020-02-01 10:00"]))
+    assert list(period_starts(index, "M")) == \
+        list(pd.DatetimeIndex(["2020-01-01", "2020-02-01"]))
+
+
+@pytest.mark.parametrize("size", [1, 3, 10])
+def test_resampler(size):
+    """Test that incremental resampling gives the same bars as a batch."""
+    df = random_test_data(60)
+    resampler = Resampler("W")
+    for i in range(0, len(df), size):
+        changed = resampler.update(df.iloc[i:i + size])
+        assert changed.index[-1] == period_starts(df.index[i:i + size],
+                                                  "W")[-1]
+    pd.testing.assert_frame_equal(resampler.bars, resample_ohlcv(df, "W"),
+                                  check_names=False, check_freq=False)
+    with pytest.raises(ValueError):
+        resampler.update(df.iloc[:1])
+
+
+def test_align():
+    """Test that each day sees the weekly values of the week before."""
+    df = random_test_data(40)
+    weekly = resample_ohlcv(df, "W")
+    aligned = align(weekly["close"], df.index, "W")
+    assert aligned.iloc[:6].isna().all()
+    week = period_starts(df.index, "W")
+    for date, start, value in zip(df.index[6:], week[6:], aligned[6:]):
+        previous = weekly.index[weekly.index < start][-1]
+        assert value == weekly.loc[previous, "close"]
+
+
+def test_higher_timeframe():
+    """Test streaming weekly indicators against calc_ema and calc_macd."""
+    df = random_test_data(300)
+    weekly = resample_ohlcv(df, "W")
+    weekly = calc_ema(weekly, weekly["close"], "ema4", window=4)
+    weekly = calc_ema(weekly, weekly["close"], "ema3", window=3)
+    weekly = calc_ema(weekly, weekly["close"], "ema6", window=6)
+    weekly = calc_macd(weekly, weekly["ema3"], weekly["ema6"], window=3)
+    columns = ["ema4", "fast", "signal", "macd-h"]
+    expected = align(weekly[columns], df.index, "W")
+
+    indicators = {"ema4": (Ema(4), ["close"]),
+                  ("fast", "signal", "macd-h"): (Macd(3, 6, 3), ["close"])}
+    timeframe = HigherTimeframe("W", indicators)
+    out = pd.concat([timeframe.update(df.iloc[i:i + 5])
+                     for i in range(0, len(df), 5)])
+    np.testing.assert_allclose(out[columns], expected, atol=1e-10)
+
+    # The partial value on the last day of each week is the weekly value
+    partial = HigherTimeframe("W", {"ema4": (Ema(4), ["close"])},
+                              partial=True).update(df)
+    last_days = df.index.to_series().groupby(
+        period_starts(df.index, "W")).max()
+    np.testing.assert_allclose(partial.loc[last_days, "ema4"],
+                               weekly["ema4"], rtol=1e-12)
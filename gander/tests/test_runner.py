@@ -0,0 +1,56 @@
+"""Tests for ``gander.runner`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. indicators import calc_ema, calc_force, calc_impulse
+from .. runner import Column, apply_calls, run_universe
+from . data_for_tests import random_test_data
+import pytest
+
+CALLS = [(calc_ema, [Column("close"), "ema13"], {"window": 13}),
+         (calc_ema, [Column("close"), "ema3"], {"window": 3}),
+         (calc_force, ["close", "volume"], {}),
+         (calc_impulse, ["ema13", "ema3"], {})]
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_run_universe(max_workers):
+    """Test ``gander.runner.run_universe()`` against calling directly.
+
+    :param max_workers: Number of worker processes
+    """
+    frames = [("s" + str(i), random_test_data(100, seed=i))
+              for i in range(7)]
+    frames[3] = ("bad", frames[3][1].drop(columns="volume"))
+
+    results = list(run_universe(frames, CALLS, max_workers=max_workers,
+                                chunksize=2,
+                                columns=["open", "close", "volume"]))
+
+    assert [result.symbol for result in results] == \
+        [symbol for symbol, _ in frames]
+    for (symbol, df), result in zip(frames, results):
+        if symbol == "bad":
+            assert isinstance(result.error, KeyError)
+            assert result.data is None
+            continue
+        expected = apply_calls(df.copy(), CALLS)
+        assert list(result.data.columns) == \
+            ["ema13", "ema3", "force", "impulse"]
+        assert result.data.equals(expected[result.data.columns])
@@ -0,0 +1,103 @@
+"""Tests for ``gander.screener`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. indicators import calc_ema, calc_macd, calc_stoch, calc_impulse, \
+    calc_force
+from .. panel import panel_fields
+from .. screener import screen, MATCH_COLUMNS
+from . data_for_tests import random_test_data
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def screen_fix():
+    """Set up symbols starting at different dates, in long format."""
+    frames = {}
+    for seed in range(12):
+        df = random_test_data(800, seed=seed)
+        frames["s%02d" % seed] = df[seed * 30:]
+    return frames, pd.concat(frames, names=["symbol", "date"])
+
+
+def reference_matches(frames, bars):
+    """Find signals one symbol and one bar at a time, on full history."""
+    matches = []
+    for symbol, df in frames.items():
+        df = calc_ema(df, df["close"], "ema13", window=13, inplace=True)
+        df = calc_ema(df, df["close"], "ema12", window=12, inplace=True)
+        df = calc_ema(df, df["close"], "ema26", window=26, inplace=True)
+        df = calc_macd(df, df["ema12"], df["ema26"], inplace=True)
+        df = calc_impulse(df, "ema13", "macd-h", inplace=True)
+        df = calc_stoch(df, inplace=True)
+        df = calc_force(df, "close", "volume")
+        impulse = df["impulse"].to_numpy()
+        for i in range(len(df) - bars, len(df)):
+            time = df.index[i]
+            if pd.notna(impulse[i]) and pd.notna(impulse[i - 1]) and \
+                    impulse[i] != impulse[i - 1]:
+                matches.append((symbol, time, "impulse"))
+            for name, column in [("macd", "macd-h"), ("force", "force")]:
+                last, now = df[column].iloc[i - 1], df[column].iloc[i]
+                if last <= 0 < now:
+                    matches.append((symbol, time, name + "_up"))
+                if last >= 0 > now:
+                    matches.append((symbol, time, name + "_down"))
+            last, now = df["%D"].iloc[i - 1], df["%D"].iloc[i]
+            if last < 20 <= now:
+                matches.append((symbol, time, "stoch_exit_low"))
+            if last > 80 >= now:
+                matches.append((symbol, time, "stoch_exit_high"))
+    return matches
+
+
+@pytest.mark.parametrize("bars", [1, 40])
+def test_screen(screen_fix, bars):
+    """Test ``gander.screener.screen()`` against full history signals."""
+    frames, df_long = screen_fix
+    matches = screen(panel_fields(df_long), bars=bars)
+    assert list(matches.columns) == MATCH_COLUMNS
+    found = list(zip(matches["symbol"], matches["time"], matches["signal"]))
+    assert sorted(found) == sorted(reference_matches(frames, bars))
+    assert matches["time"].is_monotonic_increasing
+    assert set(matches["signal"]) <= {
+        "impulse", "macd_up", "macd_down", "force_up", "force_down",
+        "stoch_exit_low", "stoch_exit_high"}
+
+    crosses = matches[matches["signal"].str.startswith("macd")]
+    assert (np.sign(crosses["value"].astype(float)) !=
+            np.sign(crosses["previous"].astype(float))).all()
+    flips = matches[matches["signal"] == "impulse"]
+    assert (flips["value"] != flips["previous"]).all()
+
+
+def test_screen_signals(screen_fix):
+    """Test picking signals, and short or empty input."""
+    _, df_long = screen_fix
+    fields = panel_fields(df_long)
+    matches = screen(fields, bars=40, signals=["force"])
+    assert set(matches["signal"]) == {"force_up", "force_down"}
+    assert matches.equals(screen(df_long, bars=40, signals=["force"]))
+
+    short = {name: field.iloc[:1] for name, field in fields.items()}
+    assert screen(short).empty
+    with pytest.raises(ValueError):
+        screen(fields, signals=["rsi"])
@@ -0,0 +1,107 @@
+"""Tests for ``gander.store`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. graph import compute
+from .. indicators import calc_sma
+from .. store import OhlcvStore
+from . data_for_tests import random_test_data
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='function')
+def store_fix(tmp_path):
+    """Set up a store with one symbol, written in two parts."""
+    store = OhlcvStore(str(tmp_path / "store"))
+    df = random_test_data(200)
+    store.write("ABC", df.iloc[:120])
+    store.append("ABC", df.iloc[120:])
+    return store, df
+
+
+def test_read(store_fix):
+    """Test that slices read back equal the stored data."""
+    store, df = store_fix
+    assert store.symbols() == ["ABC"]
+    assert store.length("ABC") == 200
+    pd.testing.assert_frame_equal(store.read("ABC"), df, check_names=False,
+                                  check_freq=False)
+    part = store.read("ABC", "2019-09-10", "2019-10-01", lookback=3)
+    expected = df.loc["2019-09-07":"2019-10-01"]
+    np.testing.assert_array_equal(part.to_numpy(), expected.to_numpy())
+    assert (part.index == expected.index).all()
+
+
+def test_arrays_zero_copy(store_fix):
+    """Test that arrays are views of the memory mapped files."""
+    store, df = store_fix
+    index, columns = store.arrays("ABC", start="2019-10-01")
+    assert isinstance(columns["close"], np.memmap)
+    assert not columns["close"].flags.writeable
+    assert index[0] == pd.Timestamp("2019-10-01").value
+    np.testing.assert_array_equal(columns["close"],
+                                  df.loc["2019-10-01":, "close"])
+
+
+def test_append_order(store_fix):
+    """Test that bars must be appended in time order."""
+    store, df = store_fix
+    with pytest.raises(ValueError):
+        store.append("ABC", df.iloc[-5:])
+    with pytest.raises(KeyError):
+        store.read("XYZ")
+    with pytest.raises(ValueError):
+        store.write("../XYZ", df)
+
+
+def test_append_missing_column(store_fix):
+    """Test that bars missing a column leave the stored bars unchanged."""
+    store, df = store_fix
+    new = random_test_data(250).iloc[200:]
+    with pytest.raises(KeyError):
+        store.append("ABC", new.drop(columns="volume"))
+    with pytest.raises(KeyError):
+        store.write("ABC", new.drop(columns="volume"))
+    assert store.length("ABC") == 200
+    pd.testing.assert_frame_equal(store.read("ABC"), df, check_names=False,
+                                  check_freq=False)
+    store.append("ABC", new)
+    assert store.length("ABC") == 250
+    np.testing.assert_array_equal(store.read("ABC")["volume"][200:],
+                                  new["volume"])
+
+
+def test_compute(store_fix):
+    """Test that a slice with enough lookback matches the full history."""
+    store, df = store_fix
+    spec = "sma10, stoch(15, 4), tr"
+    part = store.compute("ABC", spec, "2019-10-01", "2019-11-01",
+                         lookback=14)
+    full = compute(df, spec).loc["2019-10-01":"2019-11-01"]
+    np.testing.assert_allclose(part[["sma10", "%K", "tr"]],
+                               full[["sma10", "%K", "tr"]])
+    assert part.index[0] == pd.Timestamp("2019-10-01")
+
+    calls = [(calc_sma, [10, "close", "sma10"], {})]
+    part = store.compute("ABC", calls, start="2019-08-25", lookback=100)
+    np.testing.assert_allclose(part["sma10"],
+                               calc_sma(df, 10, "close", "sma10")
+                               .loc["2019-08-25":, "sma10"])
@@ -0,0 +1,113 @@
+"""Tests for ``gander.streaming`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. indicators import calc_sma, calc_ema, calc_macd, calc_stoch, \
+    calc_impulse, calc_force, calc_tr
+from .. streaming import Sma, Ema, Macd, Stoch, Force, TrueRange, Impulse
+from . data_for_tests import random_test_data
+import math
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def stream_fix():
+    """Set up a random walk of ohlcv data."""
+    return random_test_data(400)
+
+
+def assert_stream_equal(streamed, expected):
+    """Compare streamed values with a batch calculated column."""
+    np.testing.assert_allclose(np.array(streamed, dtype=float),
+                               expected.values.astype(float), rtol=1e-9)
+
+
+def test_sma(stream_fix):
+    """Test ``gander.streaming.Sma`` against ``calc_sma()``."""
+    df = calc_sma(stream_fix.copy(), 20, "close", "sma")
+    sma = Sma(20)
+    assert_stream_equal([sma.update(p) for p in df["close"]], df["sma"])
+
+
+def test_sma_drift():
+    """Test that ``gander.streaming.Sma`` does not drift on long streams."""
+    rng = np.random.default_rng(1)
+    prices = 1e4 + np.cumsum(rng.normal(size=200000))
+    sma = Sma(20)
+    streamed = np.array([sma.update(p) for p in prices.tolist()])
+    rows = np.arange(19, len(prices), 997)
+    exact = [math.fsum(prices[i - 19:i + 1]) / 20 for i in rows]
+    np.testing.assert_allclose(streamed[rows], exact, rtol=1e-15, atol=0)
+
+
+def test_ema(stream_fix):
+    """Test ``gander.streaming.Ema`` against ``calc_ema()``."""
+    df = calc_ema(stream_fix.copy(), stream_fix["close"], "ema", window=13)
+    ema = Ema(13)
+    assert_stream_equal([ema.update(p) for p in df["close"]], df["ema"])
+
+
+def test_macd(stream_fix):
+    """Test ``gander.streaming.Macd`` against ``calc_macd()``."""
+    df = stream_fix.copy()
+    df = calc_ema(df, df["close"], "ema12", window=12)
+    df = calc_ema(df, df["close"], "ema26", window=26)
+    df = calc_macd(df, df["ema12"], df["ema26"])
+    macd = Macd(12, 26, 9)
+    streamed = np.array([macd.update(p) for p in df["close"]])
+    for i, column in enumerate(["fast", "signal", "macd-h"]):
+        assert_stream_equal(streamed[:, i], df[column])
+
+
+def test_stoch(stream_fix):
+    """Test ``gander.streaming.Stoch`` against ``calc_stoch()``."""
+    df = calc_stoch(stream_fix.copy())
+    stoch = Stoch()
+    bars = df[["open", "high", "low", "close"]].values
+    streamed = np.array([stoch.update(*bar) for bar in bars])
+    for i, column in enumerate(["%K", "%D", "%%D"]):
+        assert_stream_equal(streamed[:, i], df[column])
+
+
+def test_force_tr(stream_fix):
+    """Test ``Force`` and ``TrueRange`` against the batch functions."""
+    df = calc_force(stream_fix.copy(), "close", "volume")
+    df = calc_tr(df, "high", "low", "close")
+    force = Force()
+    tr = TrueRange()
+    assert_stream_equal([force.update(c, v) for c, v in
+                         df[["close", "volume"]].values], df["force"])
+    assert_stream_equal([tr.update(h, low, c) for h, low, c in
+                         df[["high", "low", "close"]].values], df["tr"])
+
+
+def test_impulse(stream_fix):
+    """Test ``gander.streaming.Impulse`` against ``calc_impulse()``."""
+    df = stream_fix.copy()
+    df = calc_ema(df, df["close"], "ema13", window=13)
+    df = calc_ema(df, df["close"], "ema12", window=12)
+    df = calc_ema(df, df["close"], "ema26", window=26)
+    df = calc_macd(df, df["ema12"], df["ema26"])
+    df = calc_impulse(df, "ema13", "macd-h")
+    impulse = Impulse()
+    streamed = [impulse.update(e, h) for e, h in
+                df[["ema13", "macd-h"]].values]
+    assert streamed[-len(df["impulse"].dropna()):] == \
+        list(df["impulse"].dropna())
@@ -0,0 +1,89 @@
+"""Tests for ``gander.sweep`` module.
+
+Copyright (C) 2020  Ekkobit AS
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Questions may be directed to resonate@ekkobit.com
+"""
+
+from .. import kernels
+from .. sweep import sma_sweep, ema_sweep, macd_sweep, stoch_sweep
+from . data_for_tests import random_test_data
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def sweep_fix():
+    """Set up close and ohlc prices with missing values."""
+    df = random_test_data(400)
+    close = df["close"].to_numpy(dtype=float)
+    close[[3, 50, 51, 200]] = np.nan
+    return close, df.loc[:, "open":"close"].to_numpy(dtype=float)
+
+
+def test_sma_sweep(sweep_fix):
+    """Test that each row equals the single window kernel."""
+    close, _ = sweep_fix
+    windows = [1, 2, 10, 50, 500]
+    for row, window in zip(sma_sweep(close, windows), windows):
+        np.testing.assert_allclose(row, kernels.sma(close, window),
+                                   equal_nan=True)
+
+
+@pytest.mark.parametrize("m", [5, 400])
+def test_ema_sweep(sweep_fix, m):
+    """Test that each row equals the single window kernel.
+
+    :param m: Number of data points, fewer than some windows for 5
+    """
+    close = sweep_fix[0][:m]
+    windows = list(range(1, 40)) + [100, 200]
+    for row, window in zip(ema_sweep(close, windows), windows):
+        np.testing.assert_allclose(row, kernels.ema(close, window),
+                                   rtol=1e-10, equal_nan=True)
+
+    emas = ema_sweep(close, [3, 10], custom_a=[1.0, 0.05])
+    np.testing.assert_allclose(emas[1], kernels.ema(close, 10,
+                                                    custom_a=0.05),
+                               rtol=1e-10, equal_nan=True)
+
+
+def test_macd_sweep(sweep_fix):
+    """Test that each MACD of the grid equals the kernel."""
+    close, _ = sweep_fix
+    grid = [(short, long, 9) for short in (5, 12) for long in (26, 30)]
+    grid.append((12, 26, 2))
+    out = macd_sweep(close, grid)
+    assert out[0].shape == (len(grid), len(close))
+    for i, (short, long, window) in enumerate(grid):
+        expected = kernels.macd(kernels.ema(close, short),
+                                kernels.ema(close, long), window)
+        for lines, expected_line in zip(out, expected):
+            np.testing.assert_allclose(lines[i], expected_line, rtol=1e-9,
+                                       atol=1e-12, equal_nan=True)
+
+
+def test_stoch_sweep(sweep_fix):
+    """Test that each stochastic of the grid equals the kernel."""
+    close, prices = sweep_fix
+    grid = [(stoch_window, ema_window) for stoch_window in (5, 15)
+            for ema_window in (3, 4)]
+    out = stoch_sweep(close, prices, grid)
+    for i, (stoch_window, ema_window) in enumerate(grid):
+        expected = kernels.stoch(close, prices, stoch_window, ema_window)
+        for lines, expected_line in zip(out, expected):
+            np.testing.assert_allclose(lines[i], expected_line, rtol=1e-9,
+                                       atol=1e-12, equal_nan=True)
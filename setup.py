@@ -50,7 +50,7 @@ setuptools.setup(name='gander',
                  author_email=__email__,
                  license='MIT',
                  license_file=license(),
-                 packages=setuptools.find_packages(),
+                 packages=setuptools.find_packages(exclude=['benchmarks']),
                  test_suite='nose.collector',
                  tests_require=['pytest'],
                  install_requires=[